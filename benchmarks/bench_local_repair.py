@@ -0,0 +1,129 @@
+"""
+LLM repair round trips with and without local (schema-guided) repair.
+
+    python benchmarks/bench_local_repair.py
+    python benchmarks/bench_local_repair.py --corpus raw_llm_outputs.jsonl
+
+Without --corpus, a seeded corpus of the mechanical failures seen in LLM
+output (scores as strings/floats, out-of-range scores, over-long highlight
+lists, extra keys, missing breakdown arrays, null optionals) plus some
+non-mechanical ones (missing scores, summary or item fields) is generated. With --corpus,
+each line is one raw JSON object as returned by the model.
+
+Every invalid object costs one LLM repair call today; the script counts how
+many still need it after repair_locally.
+"""
+from __future__ import annotations
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from local_repair import repair_locally  # noqa: E402
+from schema import validate_json  # noqa: E402
+
+_SCORES = ("overallScore", "technicalSkillsScore", "experienceScore", "culturalFitScore")
+
+
+def _base(rng: random.Random):
+    item = lambda req: {  # noqa: E731
+        "requirement": req, "present": True, "evidence": f"Resume mentions {req}",
+        "gapPercentage": 0, "missingDetail": "Fully met.",
+    }
+    return {
+        **{k: rng.randint(0, 100) for k in _SCORES},
+        "matchSummary": "Solid match on core tools.",
+        "strengthsHighlights": ["Lean", "Six Sigma"],
+        "improvementAreas": ["Quantify impact"],
+        "detailedBreakdown": {
+            "technicalSkills": [item("Proficiency in Lean")],
+            "experience": [item("3+ years of relevant experience")],
+            "educationAndCertifications": [],
+            "culturalFitAndSoftSkills": [],
+        },
+    }
+
+
+def _set_score(value):
+    return lambda o, rng: o.__setitem__(rng.choice(_SCORES), value(rng))
+
+
+def _set_item(section, field, value):
+    return lambda o, rng: o["detailedBreakdown"][section][0].__setitem__(field, value)
+
+
+def _drop(*path):
+    def mutate(o, rng):
+        for key in path[:-1]:
+            o = o[key]
+        o.pop(path[-1], None)
+    return mutate
+
+
+_MECHANICAL = [
+    _set_score(lambda rng: str(rng.randint(0, 100))),
+    _set_score(lambda rng: rng.randint(0, 100) + 0.5),
+    _set_score(lambda rng: f"{rng.randint(0, 100)}%"),
+    _set_score(lambda rng: rng.choice([-5, 105, 140])),
+    lambda o, rng: o.__setitem__("strengthsHighlights", [f"S{i}" for i in range(rng.randint(4, 7))]),
+    lambda o, rng: o.__setitem__(rng.choice(["reasoning", "confidence", "notes"]), "..."),
+    lambda o, rng: o.__setitem__("improvementAreas", "Quantify impact"),
+    lambda o, rng: o.__setitem__("redFlags", None),
+    _drop("detailedBreakdown", "educationAndCertifications"),
+    _set_item("technicalSkills", "gapPercentage", "20"),
+    _set_item("experience", "present", "true"),
+]
+_SEMANTIC = [
+    lambda o, rng: o.pop(rng.choice(_SCORES)),
+    _drop("matchSummary"),
+    _drop("detailedBreakdown", "technicalSkills", 0, "missingDetail"),
+]
+
+
+def generate(n: int, seed: int):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        obj = _base(rng)
+        pool = _MECHANICAL if rng.random() < 0.8 else _SEMANTIC
+        for mutate in rng.sample(pool, k=min(len(pool), rng.randint(1, 3))):
+            mutate(obj, rng)
+        corpus.append(obj)
+    return corpus
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--corpus", type=Path, help="JSONL of raw LLM outputs")
+    ap.add_argument("--n", type=int, default=1000, help="generated corpus size (default: 1000)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.corpus:
+        corpus = [json.loads(ln) for ln in args.corpus.read_text(encoding="utf-8").splitlines() if ln.strip()]
+    else:
+        corpus = generate(args.n, args.seed)
+
+    invalid = [o for o in corpus if not validate_json(o)[0]]
+    t0 = time.perf_counter()
+    still = 0
+    for obj in invalid:
+        fixed, _ = repair_locally(copy.deepcopy(obj))
+        still += not validate_json(fixed)[0]
+    dt = time.perf_counter() - t0
+    print(f"objects:                 {len(corpus)}")
+    print(f"invalid (LLM repairs):   {len(invalid)}")
+    print(f"after local repair:      {still}")
+    if invalid:
+        print(f"repair calls saved:      {len(invalid) - still} ({(len(invalid) - still) / len(invalid):.1%})")
+        print(f"local repair per object: {dt / len(invalid) * 1e6:.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+"""
+Prompt size: current layout vs. the evidence-table layout (build_prompt(evidence_table=True)).
+
+    python benchmarks/bench_prompt_size.py --requirements 10 --k 3
+
+Builds prompts for synthetic resumes of several lengths. Retrieval picks k
+lines per requirement from the resume, so hits overlap across requirements
+and with PARSED_RESUME.evidence_lines as they do in real runs. Prints prompt
+characters for each layout (schema inlined, and with --no-schema as sent in
+structured-output mode).
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from compiled_jd import compile_jd  # noqa: E402
+from parse_resume import parse_resume  # noqa: E402
+from prompt import build_prompt  # noqa: E402
+from schema import get_schema  # noqa: E402
+
+_SKILLS = ["Python", "SQL", "Lean", "Six Sigma", "SAP", "Tableau", "Excel", "Jira", "Scrum", "ERP", "Oracle", "AWS"]
+_VERBS = ["Delivered", "Led", "Built", "Improved", "Managed", "Designed"]
+
+
+def _jd(n_reqs: int):
+    reqs = [f"Proficiency in {s}" for s in _SKILLS[: max(1, n_reqs - 1)]] + ["3+ years of relevant experience"]
+    return {"title": "Program Manager", "sector": "Operations", "location": "Remote",
+            "description": "Run cross-functional programs.", "requirements": reqs[:n_reqs]}
+
+
+def _resume(lines: int, rng: random.Random) -> str:
+    out = []
+    for i in range(lines):
+        skills = ", ".join(rng.sample(_SKILLS, 3))
+        out.append(f"{rng.choice(_VERBS)} {rng.randint(2, 9)} projects using {skills} with measurable KPIs (role {i}).")
+    return "Program Manager at Crestel Systems (2016-01 to 2022-06)\n" + "\n".join(out)
+
+
+def _retrieval(cjd, text: str, k: int, rng: random.Random):
+    lines = [ln for ln in text.splitlines() if ln.strip()]
+    return {
+        req: [{"id": f"res-{i:04d}", "text": lines[i], "distance": round(rng.random(), 6), "metadata": {"index": i}}
+              for i in rng.sample(range(len(lines)), min(k, len(lines)))]
+        for req in cjd.query_requirements
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--requirements", type=int, default=10)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--lines", type=int, nargs="+", default=[5, 10, 20, 40])
+    ap.add_argument("--no-schema", action="store_true", help="omit the inlined schema (structured-output mode)")
+    args = ap.parse_args()
+
+    cjd = compile_jd(_jd(args.requirements))
+    schema = get_schema()
+    print(f"requirements={args.requirements} k={args.k} schema={'omitted' if args.no_schema else 'inlined'}")
+    print(f"{'lines':>6} {'current':>9} {'table':>9} {'saved':>7}")
+    for n in args.lines:
+        rng = random.Random(n)
+        text = _resume(n, rng)
+        parsed = parse_resume(text, cjd)
+        hits = _retrieval(cjd, text, args.k, rng)
+        kw = {"inline_schema": not args.no_schema}
+        current = len(build_prompt(cjd, parsed, hits, schema, **kw))
+        table = len(build_prompt(cjd, parsed, hits, schema, evidence_table=True, **kw))
+        print(f"{n:>6} {current:>9} {table:>9} {1 - table / current:>6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+"""
+Rules mode: full retrieval path vs. vector-store-free fast path.
+
+    python benchmarks/bench_rules_fast_path.py --n 200
+    python benchmarks/bench_rules_fast_path.py --n 200 --embedder hash   # offline
+
+Both paths score the same synthetic resumes; the script checks the outputs are
+identical and prints per-candidate latency and the speedup.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from pipeline import PipelineConfig, run_rules  # noqa: E402
+
+_SKILLS = ["Attribution", "Copywriting", "Meta Ads", "Google Ads", "CRM", "WordPress", "SEO", "HubSpot"]
+
+
+class HashEmbedding:
+    """Offline stand-in for the default embedder (no model download)."""
+
+    def __call__(self, input):
+        out = []
+        for text in input:
+            vec = [0.0] * 128
+            for tok in text.lower().split():
+                vec[int(hashlib.md5(tok.encode()).hexdigest(), 16) % 128] += 1.0
+            vec[0] += 0.5
+            out.append(vec)
+        return out
+
+    def embed_query(self, input):
+        return self(input)
+
+    @staticmethod
+    def name():
+        return "bench-hash"
+
+
+def _jd():
+    return {
+        "title": "Growth Marketer",
+        "sector": "Marketing",
+        "location": "Cairo, Egypt",
+        "description": "Growth role.",
+        "requirements": [f"Proficiency in {s}" for s in _SKILLS[:6]] + ["3+ years of relevant experience"],
+    }
+
+
+def _resume(i: int) -> str:
+    lines = []
+    for j in range(6):
+        a, b = _SKILLS[(i + j) % len(_SKILLS)], _SKILLS[(i * 3 + j) % len(_SKILLS)]
+        lines.append(f"Role {j} at Company {i} (20{10 + j}-01 to 20{11 + j}-06)")
+        lines.append(f"Delivered {j + 2} projects using {a}, {b} with measurable KPIs.")
+        lines.append(f"Collaborated with {j + 3} stakeholders to ship on schedule.")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--n", type=int, default=100, help="number of synthetic candidates")
+    p.add_argument("--embedder", choices=["default", "hash"], default="default")
+    args = p.parse_args()
+
+    jd, cfg = _jd(), PipelineConfig(k=3)
+    resumes = [_resume(i) for i in range(args.n)]
+
+    from retrieve import create_client, default_embedding_function
+    ef = HashEmbedding() if args.embedder == "hash" else default_embedding_function()
+    vs_client = create_client()
+    run_rules(jd, resumes[0], cfg=cfg, vs_client=vs_client, embedding_function=ef, fast=False)  # warm model
+
+    t0 = time.perf_counter()
+    full = [run_rules(jd, r, cfg=cfg, vs_client=vs_client, embedding_function=ef, fast=False) for r in resumes]
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = [run_rules(jd, r, cfg=cfg, fast=True) for r in resumes]
+    t_fast = time.perf_counter() - t0
+
+    assert fast == full, "fast path diverged from the full retrieval path"
+    print(f"candidates: {args.n}  embedder: {args.embedder}")
+    print(f"full path : {t_full:8.3f}s  ({1000 * t_full / args.n:7.2f} ms/candidate)")
+    print(f"fast path : {t_fast:8.3f}s  ({1000 * t_fast / args.n:7.2f} ms/candidate)")
+    print(f"speedup   : {t_full / max(t_fast, 1e-9):8.1f}x  (outputs identical)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+"""
+CLI cold start: import time and time to first result, one fresh process per run.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --modes rules llm   # llm needs the embedding model
+
+Scenarios: ``import main``, ``main.py --help`` and one single-resume run per
+``--mode`` (jd.json + resume.txt from the repo root; without OPENAI_API_KEY
+the llm run ends in its rule-based fallback, which still covers retrieval and
+prompt building). Prints the median wall time of each and the heavy modules
+the process ended up importing, so an eager import shows up as a regression.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+_HEAVY = ("chromadb", "openai", "jsonschema", "numpy", "onnxruntime", "asyncio", "multiprocessing")
+
+# Runs main.py as __main__, then reports which heavy modules got imported
+_DRIVER = """
+import contextlib, io, json, runpy, sys
+sys.argv = ["main.py"] + json.loads(sys.argv[1])
+sys.path.insert(0, "src")
+code = 0
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        {body}
+    except SystemExit as e:
+        code = e.code or 0
+print(json.dumps({{"code": code, "heavy": [m for m in {heavy!r} if m in sys.modules]}}), file=sys.stderr)
+"""
+
+
+def _scenarios(modes):
+    yield "import main", "import main", []
+    yield "--help", "runpy.run_path('main.py', run_name='__main__')", ["--help"]
+    for mode in modes:
+        argv = ["--jd", "jd.json", "--resume", "resume.txt", "--mode", mode]
+        yield f"--mode {mode}", "runpy.run_path('main.py', run_name='__main__')", argv
+
+
+def _run_once(body: str, argv) -> tuple:
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)  # never bill a benchmark
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", _DRIVER.format(body=body, heavy=_HEAVY), json.dumps(argv)],
+        cwd=_ROOT, env=env, capture_output=True, text=True,
+    )
+    ms = (time.perf_counter() - t0) * 1000
+    report = json.loads(proc.stderr.strip().splitlines()[-1])
+    return ms, report
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--modes", nargs="*", default=["rules"], choices=["rules", "llm"])
+    args = p.parse_args()
+
+    print(f"{'scenario':<14} {'median ms':>10} {'min ms':>8}  heavy modules loaded")
+    for name, body, argv in _scenarios(args.modes):
+        times, report = [], None
+        for _ in range(args.runs):
+            ms, report = _run_once(body, argv)
+            times.append(ms)
+        status = "" if report["code"] == 0 else f"  (exit {report['code']})"
+        heavy = ", ".join(report["heavy"]) or "-"
+        print(f"{name:<14} {statistics.median(times):>10.1f} {min(times):>8.1f}  {heavy}{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import argparse
 import json
 import sys
 from pathlib import Path
-from uuid import uuid4
+from typing import TYPE_CHECKING
 
 # --- Ensure local 'src/' imports work even when running `python -m main` ---
 _PROJECT_ROOT = Path(__file__).resolve().parent
@@ -12,11 +12,13 @@ if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 # ---------------------------------------------------------------------------
 
-from schema import validate_json, assert_valid
-from parse_resume import parse_resume
-from retrieve import build_resume_collection, retrieve_for_requirements
-from scorer import score_rule_based
-from pipeline import run_pipeline, PipelineConfig
+# pipeline/batch (and through them retrieval, the LLM client and jsonschema) are
+# imported where used, so --help and argument errors return without loading them
+from compiled_jd import compile_jd
+from tracing import Trace, TraceWriter
+
+if TYPE_CHECKING:  # annotations only; pipeline is imported lazily at run time
+    from pipeline import PipelineConfig
 
 # Optional (only if you added plain-text JD support)
 try:
@@ -51,22 +53,271 @@ def _read_resume(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def _run_rules(jd: dict, resume_text: str, k: int = 3, debug: bool = False) -> dict:
-    # 1) Parse
-    parsed = parse_resume(resume_text, jd.get("requirements", []))
-    # 2) Build collection
-    lines = parsed.get("evidence_lines", [])
-    if len(lines) < 2:
-        lines = [ln.strip() for ln in resume_text.splitlines() if ln.strip()]
-    name = f"resume_v0_{uuid4().hex[:8]}"
-    _, coll = build_resume_collection(lines, collection_name=name)
-    # 3) Retrieve (only "Proficiency in ..." requirements)
-    raw_reqs = [r for r in jd.get("requirements", []) if r.lower().startswith("proficiency in ")]
-    hits = retrieve_for_requirements(coll, raw_reqs, k=k, debug=debug)
-    # 4) Score (rule-based)
-    out = score_rule_based(jd, parsed, hits)
-    assert_valid(out)
-    return out
+def _run_rules(
+    jd: dict,
+    resume_text: str,
+    k: int = 3,
+    debug: bool = False,
+    backend: str = "chroma",
+    embedding_function=None,
+    trace=None,
+) -> dict:
+    # parse → rule-based score; the vector store only runs when the scorer reads
+    # retrieval hits (or --debug wants them printed)
+    from pipeline import PipelineConfig, run_rules
+
+    return run_rules(
+        jd, resume_text, cfg=PipelineConfig(k=k, backend=backend), embedding_function=embedding_function,
+        trace=trace, debug=debug,
+    )
+
+
+def _open_embedding_function(args: argparse.Namespace):
+    """Default embedder wrapped in the embedding cache when --embed-cache is set."""
+    if not args.embed_cache:
+        return None
+    from retrieve import default_embedding_function
+    from embed_cache import CachedEmbeddingFunction
+    return CachedEmbeddingFunction(default_embedding_function(), path=args.embed_cache)
+
+
+def _open_llm_cache(args: argparse.Namespace):
+    if not args.llm_cache or args.mode == "rules":
+        return None
+    from llm_cache import LLMCache
+    return LLMCache(
+        args.llm_cache,
+        max_bytes=int(args.llm_cache_max_mb * 1024 * 1024) if args.llm_cache_max_mb else None,
+        max_age_s=args.llm_cache_max_age_days * 86400 if args.llm_cache_max_age_days else None,
+    )
+
+
+def _open_result_store(args: argparse.Namespace):
+    if not args.result_store:
+        return None
+    from result_store import ResultStore
+    return ResultStore(
+        args.result_store,
+        max_entries=args.result_store_max_entries,
+        max_age_s=args.result_store_max_age_days * 86400 if args.result_store_max_age_days else None,
+    )
+
+
+def _with_result_store(args: argparse.Namespace, score, cfg, embedding_function, result_store, *, is_async: bool = False):
+    # Unchanged (JD, resume, config) → stored result; only new/edited candidates run
+    if result_store is None:
+        return score
+    from embed_cache import embedding_model_id
+    from result_store import cached_ascore, cached_score
+    wrap = cached_ascore if is_async else cached_score
+    embedder = embedding_model_id(embedding_function) if embedding_function is not None else "default"
+    return wrap(result_store, score, mode=args.mode, cfg=cfg, embedder=embedder)
+
+
+def _llm_pipeline_config(args: argparse.Namespace) -> PipelineConfig:
+    from pipeline import PipelineConfig
+
+    return PipelineConfig(
+        k=args.k, model=args.model, seed=args.seed, backend=args.backend, deadline_s=args.deadline,
+        structured_output=args.structured_output, evidence_table=args.evidence_table, token_budget=args.token_budget,
+        candidates_per_request=args.candidates_per_request, request_token_budget=args.request_token_budget,
+    )
+
+
+def _score_fn(args: argparse.Namespace, llm_cache=None, embedding_function=None, result_store=None):
+    from pipeline import PipelineConfig, run_pipeline
+
+    if args.mode == "rules":
+        cfg = PipelineConfig(k=args.k, backend=args.backend)
+        score = lambda jd, text, trace=None: _run_rules(
+            jd, text, k=args.k, debug=args.debug, backend=args.backend, embedding_function=embedding_function,
+            trace=trace,
+        )
+    else:
+        cfg = _llm_pipeline_config(args)
+        score = lambda jd, text, trace=None: run_pipeline(
+            jd, text, cfg=cfg, llm_cache=llm_cache, embedding_function=embedding_function, trace=trace,
+            debug=args.debug, print_prompt=args.print_prompt,
+        )
+    return _with_result_store(args, score, cfg, embedding_function, result_store)
+
+
+def _multi_score_fn(args: argparse.Namespace, llm_cache=None, embedding_function=None):
+    from pipeline import run_pipeline_multi
+
+    cfg = _llm_pipeline_config(args)
+    return lambda jd, cands, traces: run_pipeline_multi(
+        jd, cands, cfg=cfg, llm_cache=llm_cache, embedding_function=embedding_function, traces=traces,
+        debug=args.debug,
+    )
+
+
+def _async_score_fn(args: argparse.Namespace, llm_cache=None, embedding_function=None, result_store=None):
+    import asyncio
+    from llm_evaluator import _create_async_openai_client
+    from pipeline import run_pipeline_async
+
+    cfg = _llm_pipeline_config(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    try:
+        client = _create_async_openai_client()
+    except Exception:
+        client = None  # every candidate then falls back to rules, same as the sync path
+    score = lambda jd, text, trace=None: run_pipeline_async(
+        jd, text, cfg=cfg, client=client, semaphore=semaphore, llm_cache=llm_cache,
+        embedding_function=embedding_function, trace=trace, debug=args.debug, print_prompt=args.print_prompt,
+    )
+    return _with_result_store(args, score, cfg, embedding_function, result_store, is_async=True)
+
+
+def _chain_sinks(*sinks):
+    active = [s for s in sinks if s is not None]
+
+    def sink(record) -> None:
+        for s in active:
+            s(record)
+    return sink
+
+
+def _shortlisted(args: argparse.Namespace, jd, candidates, embedding_function):
+    # Only the top candidates of the corpus index for this JD are scored (input order kept)
+    from corpus_index import CandidateIndex
+    index = CandidateIndex(args.shortlist, embedding_function=embedding_function)
+    top = {row["id"] for row in index.search(jd, top_n=args.shortlist_top)}
+    print(f"[batch] shortlist: {len(top)} candidates from {args.shortlist}", file=sys.stderr)
+    return (c for c in candidates if c[0] in top)
+
+
+def _main_batch(
+    args: argparse.Namespace, jd: dict, llm_cache=None, embedding_function=None, trace_sink=None, result_store=None
+) -> int:
+    from batch import iter_candidates, run_batch, run_batch_async, run_batch_multi, run_batch_parallel
+    from pipeline import PipelineConfig
+
+    try:
+        candidates = iter_candidates(args.resumes)
+    except FileNotFoundError as e:
+        raise SystemExit(str(e))
+    if args.shortlist:
+        candidates = _shortlisted(args, jd, candidates, embedding_function)
+    if args.workers > 1 and args.mode != "rules":
+        raise SystemExit("--workers > 1 is only supported with --mode rules")
+    if args.workers > 1 and embedding_function is not None:
+        # the on-disk tier is append-only and single-writer; workers use their own embedders
+        print("[batch] --embed-cache is not shared with worker processes", file=sys.stderr)
+    if args.workers > 1 and result_store is not None:
+        print("[batch] --result-store is not used with worker processes", file=sys.stderr)
+    if args.candidates_per_request > 1 and (args.mode != "llm" or args.concurrency > 1):
+        raise SystemExit("--candidates-per-request > 1 needs --mode llm and --concurrency 1")
+    if args.mode == "cascade" and args.concurrency > 1:
+        raise SystemExit("--mode cascade runs its LLM stage sequentially (--concurrency 1)")
+    if args.candidates_per_request > 1 and result_store is not None:
+        print("[batch] --result-store is not used with multi-candidate requests", file=sys.stderr)
+    tally = None
+    if args.mode in ("llm", "cascade"):
+        # token/cost totals come from the per-candidate trace counters
+        from tokens import TokenTally
+        tally = TokenTally(args.model, tuple(args.token_prices) if args.token_prices else None)
+        trace_sink = _chain_sinks(tally.add, trace_sink)
+    out = args.out.open("w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        if args.workers > 1:
+            stats = run_batch_parallel(
+                jd,
+                candidates,
+                out,
+                workers=args.workers,
+                chunk_size=args.chunk_size,
+                cfg=PipelineConfig(k=args.k, backend=args.backend),
+                trace_sink=trace_sink,
+                debug=args.debug,
+            )
+        elif args.mode == "llm" and args.candidates_per_request > 1:
+            stats = run_batch_multi(
+                jd, candidates, _multi_score_fn(args, llm_cache, embedding_function), out,
+                window=4 * args.candidates_per_request, trace_sink=trace_sink, debug=args.debug,
+            )
+        elif args.mode == "llm" and args.concurrency > 1:
+            stats = run_batch_async(
+                jd, candidates, _async_score_fn(args, llm_cache, embedding_function, result_store), out,
+                concurrency=args.concurrency, trace_sink=trace_sink, debug=args.debug,
+            )
+        elif args.mode == "cascade":
+            from cascade import run_cascade
+            # the LLM stage is plain LLM mode (same result-store entries as --mode llm)
+            llm_args = argparse.Namespace(**{**vars(args), "mode": "llm"})
+            stats = run_cascade(
+                jd, candidates, _score_fn(llm_args, llm_cache, embedding_function, result_store), out,
+                top_n=args.cascade_top, min_score=args.cascade_min_score,
+                rules_cfg=PipelineConfig(k=args.k, backend=args.backend), trace_sink=trace_sink, debug=args.debug,
+            )
+        else:
+            stats = run_batch(
+                jd, candidates, _score_fn(args, llm_cache, embedding_function, result_store), out,
+                trace_sink=trace_sink, debug=args.debug,
+            )
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if args.out:
+            out.close()
+    print(stats.summary(), file=sys.stderr)
+    for cid, err in stats.failures[:10]:
+        print(f"[batch]   failed {cid}: {err}", file=sys.stderr)
+    if tally is not None:
+        print(tally.summary(), file=sys.stderr)
+    if llm_cache is not None:
+        print(llm_cache.summary(), file=sys.stderr)
+    if embedding_function is not None:
+        print(embedding_function.cache.summary(), file=sys.stderr)
+    if result_store is not None:
+        print(result_store.summary(), file=sys.stderr)
+    return 0 if stats.failed == 0 else 1
+
+
+def _manifest_path(args: argparse.Namespace) -> Path:
+    if args.batch_manifest:
+        return args.batch_manifest
+    if args.batch_export:
+        return args.batch_export.with_suffix(".manifest.jsonl")
+    raise SystemExit("--batch-import needs --batch-manifest (written by --batch-export)")
+
+
+def _main_batch_api(args: argparse.Namespace, jd: dict, llm_cache, embedding_function, trace_sink) -> int:
+    # Provider batch API: export request JSONL + manifest, or ingest the results JSONL
+    from batch import iter_candidates
+    from batch_api import export_requests, import_results
+
+    manifest = _manifest_path(args)
+    if args.batch_export:
+        if not args.resumes:
+            raise SystemExit("--batch-export needs --resumes")
+        try:
+            candidates = iter_candidates(args.resumes)
+        except FileNotFoundError as e:
+            raise SystemExit(str(e))
+        with args.batch_export.open("w", encoding="utf-8") as req, manifest.open("w", encoding="utf-8") as man:
+            stats = export_requests(
+                jd, candidates, req, man, cfg=_llm_pipeline_config(args), embedding_function=embedding_function,
+                llm_cache=llm_cache, debug=args.debug,
+            )
+        print(f"[batch-api] wrote {stats.ok} requests to {args.batch_export} (manifest: {manifest})", file=sys.stderr)
+    else:
+        out = args.out.open("w", encoding="utf-8") if args.out else sys.stdout
+        try:
+            stats = import_results(
+                jd, manifest, args.batch_import, out, repair=not args.no_repair, llm_cache=llm_cache,
+                trace_sink=trace_sink, debug=args.debug,
+            )
+        except ValueError as e:
+            raise SystemExit(str(e))
+        finally:
+            if args.out:
+                out.close()
+        print(stats.summary(), file=sys.stderr)
+    for cid, err in stats.failures[:10]:
+        print(f"[batch-api]   failed {cid}: {err}", file=sys.stderr)
+    return 0 if stats.failed == 0 else 1
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -76,38 +327,94 @@ def main(argv: list[str] | None = None) -> int:
     src.add_argument("--jd", type=Path, help="Path to job JSON (either full record with 'job' or just the job object)")
     src.add_argument("--jd-txt", dest="jd_txt", type=Path, help="Path to job description as plain text")
 
-    p.add_argument("--resume", required=True, type=Path, help="Path to resume text file")
-    p.add_argument("--out", type=Path, default=None, help="Optional path to write the result JSON; stdout if omitted")
-    p.add_argument("--mode", choices=["llm", "rules"], default="llm", help="Use LLM (default) or rule-based only")
+    cand = p.add_mutually_exclusive_group(required=True)
+    cand.add_argument("--resume", type=Path, help="Path to resume text file")
+    cand.add_argument("--resumes", type=Path, help="Batch mode: directory of *.txt resumes or a JSONL file (one candidate per line)")
+    cand.add_argument("--batch-import", dest="batch_import", type=Path, help="Score a provider batch-API results JSONL (see --batch-export); needs --batch-manifest")
+
+    p.add_argument("--out", type=Path, default=None, help="Optional path to write the result JSON (NDJSON in batch mode); stdout if omitted")
+    p.add_argument("--mode", choices=["llm", "rules", "cascade"], default="llm", help="Use LLM (default), rule-based only, or (batch) cascade: rules for every candidate, LLM for the top of the pool")
     p.add_argument("--k", type=int, default=3, help="Top-k evidence per requirement (default: 3)")
+    p.add_argument("--backend", choices=["chroma", "numpy"], default="chroma", help="Retrieval backend: Chroma collection (default) or in-process exact NumPy search")
     p.add_argument("--model", type=str, default="gpt-4o-mini", help="LLM model name (LLM mode only)")
     p.add_argument("--seed", type=int, default=42, help="Seed for determinism if provider supports it (LLM mode)")
+    p.add_argument("--deadline", type=float, default=None, help="LLM mode latency SLA in seconds: score rules alongside the LLM and return them if no valid LLM result by then")
+    p.add_argument("--structured-output", dest="structured_output", action="store_true", help="LLM mode: send the schema as a strict JSON-schema response format instead of inlining it in the prompt")
+    p.add_argument("--evidence-table", dest="evidence_table", action="store_true", help="LLM mode: compact prompt listing each resume line once, referenced by id from PARSED_RESUME and RETRIEVAL")
+    p.add_argument("--token-budget", dest="token_budget", type=int, default=None, help="LLM mode: max estimated prompt tokens per candidate; lowest-ranked hits and longest evidence lines are trimmed to fit")
+    p.add_argument("--token-prices", dest="token_prices", type=float, nargs=2, metavar=("IN", "OUT"), default=None, help="USD per 1M input/output tokens for the batch cost estimate (default: built-in list price for known models)")
+    p.add_argument("--candidates-per-request", dest="candidates_per_request", type=int, default=1, help="Batch LLM mode: pack up to N candidates into one LLM request (shared schema/JOB sections; default: 1)")
+    p.add_argument("--request-token-budget", dest="request_token_budget", type=int, default=8000, help="Batch LLM mode: max estimated tokens of a multi-candidate request; fewer candidates are packed to fit (default: 8000)")
+    p.add_argument("--batch-export", dest="batch_export", type=Path, default=None, help="With --resumes: write provider batch-API requests (JSONL) here instead of calling the LLM")
+    p.add_argument("--batch-manifest", dest="batch_manifest", type=Path, default=None, help="Manifest written by --batch-export, read by --batch-import (default: <export>.manifest.jsonl)")
+    p.add_argument("--no-repair", dest="no_repair", action="store_true", help="--batch-import: skip the LLM repair call; unfixable outputs fall back to rules")
+    p.add_argument("--shortlist", type=Path, default=None, help="Batch mode: score only the top candidates for this JD in a corpus index directory (see src/corpus_index.py)")
+    p.add_argument("--shortlist-top", dest="shortlist_top", type=int, default=50, help="Size of the --shortlist (default: 50)")
+    p.add_argument("--cascade-top", dest="cascade_top", type=int, default=None, help="Cascade mode: send the N best candidates by rules score to the LLM")
+    p.add_argument("--cascade-min-score", dest="cascade_min_score", type=float, default=None, help="Cascade mode: send candidates with rules overallScore >= S to the LLM (with --cascade-top: the top N of those)")
+    p.add_argument("--workers", type=int, default=1, help="Batch rules mode: number of worker processes (default: 1 = in-process)")
+    p.add_argument("--chunk-size", dest="chunk_size", type=int, default=16, help="Batch rules mode: candidates per worker task (default: 16)")
+    p.add_argument("--concurrency", type=int, default=1, help="Batch LLM mode: max in-flight LLM requests via the async client (default: 1 = sequential)")
+    p.add_argument("--llm-cache", dest="llm_cache", type=Path, default=None, help="LLM mode: directory for the on-disk LLM response cache (off if omitted)")
+    p.add_argument("--llm-cache-max-mb", dest="llm_cache_max_mb", type=float, default=None, help="Evict oldest LLM cache entries beyond this many MB")
+    p.add_argument("--llm-cache-max-age-days", dest="llm_cache_max_age_days", type=float, default=None, help="Evict LLM cache entries older than this many days")
+    p.add_argument("--embed-cache", dest="embed_cache", type=Path, default=None, help="Directory for the persistent embedding cache (resume lines and requirement queries)")
+    p.add_argument("--result-store", dest="result_store", type=Path, default=None, help="sqlite file of finished results; unchanged (JD, resume, config) candidates are not re-scored")
+    p.add_argument("--result-store-max-entries", dest="result_store_max_entries", type=int, default=None, help="Evict least recently used stored results beyond this many")
+    p.add_argument("--result-store-max-age-days", dest="result_store_max_age_days", type=float, default=None, help="Evict stored results older than this many days")
+    p.add_argument("--trace", type=Path, default=None, help="Write per-candidate stage timings, counters and outcome as JSONL to this file")
     p.add_argument("--print-prompt", action="store_true", help="Echo the assembled prompt to stderr (LLM mode)")
     p.add_argument("--debug", action="store_true", help="Verbose debug logs to stderr (retrieval hits, LLM calls, fallbacks)")
 
     args = p.parse_args(argv)
 
-    jd = _read_jd(args.jd) if args.jd else _read_jd_txt(args.jd_txt)
+    # everything derived from the JD alone is computed once, not per candidate
+    jd = compile_jd(_read_jd(args.jd) if args.jd else _read_jd_txt(args.jd_txt))
+    llm_cache = _open_llm_cache(args)
+    embedding_function = _open_embedding_function(args)
+    result_store = _open_result_store(args)
+    trace_file = args.trace.open("w", encoding="utf-8") if args.trace else None
+    try:
+        return _main_run(
+            args, jd, llm_cache, embedding_function, TraceWriter(trace_file) if trace_file else None, result_store
+        )
+    finally:
+        if trace_file is not None:
+            trace_file.close()
+        if result_store is not None:
+            result_store.close()
+
+
+def _main_run(args: argparse.Namespace, jd: dict, llm_cache, embedding_function, trace_writer, result_store) -> int:
+    if args.batch_export or args.batch_import:
+        if args.mode != "llm":
+            raise SystemExit("--batch-export/--batch-import need --mode llm")
+        return _main_batch_api(args, jd, llm_cache, embedding_function, trace_writer.write if trace_writer else None)
+    if args.mode == "cascade" and not args.resumes:
+        raise SystemExit("--mode cascade needs --resumes (it ranks a pool of candidates)")
+    if args.mode == "cascade" and args.cascade_top is None and args.cascade_min_score is None:
+        raise SystemExit("--mode cascade needs --cascade-top and/or --cascade-min-score")
+    if args.resumes:
+        return _main_batch(
+            args, jd, llm_cache, embedding_function, trace_writer.write if trace_writer else None, result_store
+        )
     resume_text = _read_resume(args.resume)
+    trace = Trace(args.resume.stem) if trace_writer else None
 
     try:
-        if args.mode == "rules":
-            result = _run_rules(jd, resume_text, k=args.k, debug=args.debug)
-        else:
-            # Delegate to pipeline (parse → retrieve → prompt → LLM → validate/repair → fallback)
-            result = run_pipeline(
-                jd,
-                resume_text,
-                cfg=PipelineConfig(k=args.k, model=args.model, seed=args.seed),
-                debug=args.debug,
-                print_prompt=args.print_prompt,
-            )
-
-        ok, errs = validate_json(result)
-        if not ok:
-            print("Result failed schema validation: ", errs, file=sys.stderr)
-            return 2
+        # rules: parse → score; llm: delegate to pipeline (parse → retrieve → prompt → LLM → validate/repair → fallback)
+        result = _score_fn(args, llm_cache, embedding_function, result_store)(jd, resume_text, trace=trace)
+        if llm_cache is not None and args.debug:
+            print(llm_cache.summary(), file=sys.stderr)
+        if embedding_function is not None and args.debug:
+            print(embedding_function.cache.summary(), file=sys.stderr)
+        if result_store is not None and args.debug:
+            print(result_store.summary(), file=sys.stderr)
+        if trace is not None:
+            trace_writer.write(trace.to_record())
 
+        # Both paths return schema-validated results (LLM output is validated in
+        # run_pipeline, score_rule_based validates its own output).
         text = json.dumps(result, ensure_ascii=False, indent=2)
         if args.out:
             args.out.write_text(text + "\n", encoding="utf-8")
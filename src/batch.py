@@ -0,0 +1,435 @@
+"""
+Batch scoring: one JD against a whole corpus of resumes in a single warm process.
+- Candidates come from a directory of *.txt resumes or a JSONL file.
+- Results are streamed as NDJSON (one line per candidate, input order).
+- Per-candidate failures are recorded and never stop the run.
+- Rules mode can fan out over a process pool (run_batch_parallel); LLM mode
+  can overlap network waits on one event loop (run_batch_async) or send
+  several candidates per request (run_batch_multi).
+- Optional per-candidate traces (tracing.Trace records) go to ``trace_sink``.
+"""
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+import json
+import sys
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+from tracing import Trace
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future
+
+__all__ = [
+    "iter_candidates", "run_batch", "run_batch_async", "run_batch_multi", "run_batch_parallel", "BatchStats",
+    "write_outcomes", "failed_trace",
+]
+
+# (candidate_id, resume_text or None, error or None)
+Candidate = Tuple[str, Optional[str], Optional[str]]
+# (candidate_id, result or None, error or None)
+Outcome = Tuple[str, Optional[Dict[str, Any]], Optional[str]]
+# Receives one trace record (Trace.to_record()) per scored candidate
+TraceSink = Callable[[Dict[str, Any]], None]
+
+_ID_KEYS = ("id", "candidate_id")
+_TEXT_KEYS = ("resume", "resume_text", "text")
+
+
+def _first_key(obj: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        if k in obj:
+            return obj[k]
+    return None
+
+
+def _iter_dir(path: Path) -> Iterator[Candidate]:
+    # Sorted for a deterministic candidate order
+    for fp in sorted(path.glob("*.txt")):
+        try:
+            yield fp.stem, fp.read_text(encoding="utf-8"), None
+        except Exception as e:
+            yield fp.stem, None, f"unreadable resume file: {e}"
+
+
+def _iter_jsonl(path: Path) -> Iterator[Candidate]:
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, raw in enumerate(f, start=1):
+            if not raw.strip():
+                continue
+            fallback_id = f"line-{lineno}"
+            try:
+                obj = json.loads(raw)
+            except Exception as e:
+                yield fallback_id, None, f"invalid JSON record: {e}"
+                continue
+            if not isinstance(obj, dict):
+                yield fallback_id, None, "JSONL record must be an object"
+                continue
+            cid = _first_key(obj, _ID_KEYS)
+            text = _first_key(obj, _TEXT_KEYS)
+            cid = str(cid) if cid is not None else fallback_id
+            if not isinstance(text, str):
+                yield cid, None, f"record has no resume text (expected one of {list(_TEXT_KEYS)})"
+                continue
+            yield cid, text, None
+
+
+def iter_candidates(path: Path) -> Iterator[Candidate]:
+    """Yield (candidate_id, resume_text, error) from a directory or a JSONL file.
+
+    Directory: every ``*.txt`` file (sorted by name); the file stem is the id.
+    JSONL: one object per line with an id (``id``/``candidate_id``, default
+    ``line-N``) and the resume text (``resume``/``resume_text``/``text``).
+    Unreadable records are yielded with ``text=None`` and an error message.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return _iter_dir(path)
+    if path.is_file():
+        return _iter_jsonl(path)
+    raise FileNotFoundError(f"resume corpus not found: {path}")
+
+
+class BatchStats:
+    def __init__(self) -> None:
+        self.total = 0
+        self.ok = 0
+        self.failed = 0
+        self.failures: List[Tuple[str, str]] = []
+        self.elapsed_s = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.total / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"[batch] {self.total} candidates: ok={self.ok} failed={self.failed} "
+            f"in {self.elapsed_s:.2f}s ({self.throughput:.1f} candidates/s)"
+        )
+
+
+def _record(cid: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+    if error is not None:
+        return {"id": cid, "ok": False, "error": error}
+    return {"id": cid, "ok": True, "result": result}
+
+
+def failed_trace(trace: Optional[Trace], error: str) -> None:
+    """Record a candidate that raised instead of producing a result (outcome ``error``)."""
+    if trace is not None:
+        trace.set("error", error)
+        trace.finish("error")
+
+
+def _score_one(
+    score: Callable[..., Dict[str, Any]],
+    jd: Dict[str, Any],
+    cand: Candidate,
+    trace_sink: Optional[TraceSink] = None,
+) -> Outcome:
+    cid, text, error = cand
+    result = None
+    if error is None:
+        trace = Trace(cid) if trace_sink is not None else None
+        try:
+            result = score(jd, text) if trace is None else score(jd, text, trace=trace)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            failed_trace(trace, error)
+        if trace is not None:
+            trace_sink(trace.to_record())
+    return cid, result, error
+
+
+class _Sink:
+    """Writes one NDJSON record per outcome (flushed) and keeps the stats."""
+
+    def __init__(self, out: TextIO, *, debug: bool) -> None:
+        self.out = out
+        self.debug = debug
+        self.stats = BatchStats()
+        self._t0 = time.perf_counter()
+
+    def write(self, outcome: Outcome) -> None:
+        cid, result, error = outcome
+        stats = self.stats
+        stats.total += 1
+        if error is not None:
+            stats.failed += 1
+            stats.failures.append((cid, error))
+            if self.debug:
+                print(f"[batch] candidate {cid!r} failed: {error}", file=sys.stderr)
+        else:
+            stats.ok += 1
+        self.out.write(json.dumps(_record(cid, result, error), ensure_ascii=False) + "\n")
+        self.out.flush()
+
+    def close(self) -> BatchStats:
+        self.stats.elapsed_s = time.perf_counter() - self._t0
+        return self.stats
+
+
+def write_outcomes(outcomes: Iterable[Outcome], out: TextIO, *, debug: bool) -> BatchStats:
+    """Write ``(candidate id, result, error)`` outcomes as NDJSON records (see run_batch)."""
+    sink = _Sink(out, debug=debug)
+    for outcome in outcomes:
+        sink.write(outcome)
+    return sink.close()
+
+
+def run_batch(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    score: Callable[[Dict[str, Any], str], Dict[str, Any]],
+    out: TextIO,
+    *,
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> BatchStats:
+    """Score every candidate against one (already parsed) JD.
+
+    ``score(jd, resume_text)`` is the per-candidate entry point
+    (``run_pipeline`` or the rules path). One NDJSON line is written and flushed
+    per candidate; exceptions are caught and recorded as failures.
+    With ``trace_sink``, ``score`` is called as ``score(jd, text, trace=Trace)``
+    and every candidate's trace record is passed to ``trace_sink``.
+    """
+    return write_outcomes((_score_one(score, jd, c, trace_sink) for c in candidates), out, debug=debug)
+
+
+# ---- Asyncio (LLM mode) ------------------------------------------------------
+
+async def _ascore_one(ascore, jd: Dict[str, Any], cand: Candidate, trace_sink: Optional[TraceSink] = None) -> Outcome:
+    cid, text, error = cand
+    result = None
+    if error is None:
+        trace = Trace(cid) if trace_sink is not None else None
+        try:
+            result = await (ascore(jd, text) if trace is None else ascore(jd, text, trace=trace))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            failed_trace(trace, error)
+        if trace is not None:
+            trace_sink(trace.to_record())
+    return cid, result, error
+
+
+async def _run_batch_async(jd, candidates, ascore, out, *, window: int, trace_sink, debug: bool) -> BatchStats:
+    import asyncio
+
+    sink = _Sink(out, debug=debug)
+    pending: Deque[asyncio.Task] = deque()
+    for cand in candidates:
+        pending.append(asyncio.ensure_future(_ascore_one(ascore, jd, cand, trace_sink)))
+        if len(pending) >= window:
+            sink.write(await pending.popleft())
+    while pending:
+        sink.write(await pending.popleft())
+    return sink.close()
+
+
+def run_batch_async(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    ascore: Callable[[Dict[str, Any], str], Awaitable[Dict[str, Any]]],
+    out: TextIO,
+    *,
+    concurrency: int,
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> BatchStats:
+    """Like ``run_batch`` but ``ascore`` is a coroutine (e.g. ``run_pipeline_async``).
+
+    Up to ``2 * concurrency`` candidates are in progress at once so their LLM
+    waits overlap (the LLM calls themselves should share a semaphore of size
+    ``concurrency``). Records are still written in input order; trace records
+    (see ``run_batch``) are emitted as candidates finish.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    import asyncio
+
+    return asyncio.run(
+        _run_batch_async(jd, candidates, ascore, out, window=2 * concurrency, trace_sink=trace_sink, debug=debug)
+    )
+
+
+# ---- Multi-candidate requests (LLM mode) ----------------------------------------
+
+# score_many(jd, [(candidate_id, resume_text)], traces) -> {candidate_id: result}
+ScoreMany = Callable[[Dict[str, Any], List[Tuple[str, str]], Dict[str, Trace]], Dict[str, Dict[str, Any]]]
+
+
+def _score_window(score_many: ScoreMany, jd: Dict[str, Any], window: List[Candidate], trace_sink) -> List[Outcome]:
+    readable = [(cid, text) for cid, text, error in window if error is None]
+    traces = {cid: Trace(cid) for cid, _ in readable} if trace_sink is not None else {}
+    try:
+        results = score_many(jd, readable, traces) if readable else {}
+        failure = None
+    except Exception as e:
+        results, failure = {}, f"{type(e).__name__}: {e}"
+    outcomes: List[Outcome] = []
+    for cid, _, error in window:
+        if error is None and cid not in results:
+            error = failure or "no result returned"
+            failed_trace(traces.get(cid), error)
+        if cid in traces:
+            trace_sink(traces[cid].to_record())
+        outcomes.append((cid, results.get(cid), error))
+    return outcomes
+
+
+def run_batch_multi(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    score_many: ScoreMany,
+    out: TextIO,
+    *,
+    window: int,
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> BatchStats:
+    """Like ``run_batch`` but candidates are handed to ``score_many`` (e.g.
+    ``run_pipeline_multi``) ``window`` at a time, so several can share one LLM
+    request. Records are written in input order; an exception fails the whole
+    window.
+    """
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    outcomes = (o for chunk in _chunked(candidates, window) for o in _score_window(score_many, jd, chunk, trace_sink))
+    return write_outcomes(outcomes, out, debug=debug)
+
+
+# ---- Process pool (rules mode) ----------------------------------------------
+
+# Per-worker state, filled once by _init_worker in each child process
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(jd: Dict[str, Any], cfg, embedding_factory, trace: bool = False) -> None:
+    from pipeline import rules_need_retrieval
+
+    _WORKER["jd"] = jd
+    _WORKER["cfg"] = cfg
+    _WORKER["trace"] = trace
+    _WORKER["vs_client"] = None
+    _WORKER["embedding_function"] = None
+    if rules_need_retrieval():
+        from retrieve import create_client, default_embedding_function
+
+        if getattr(cfg, "backend", "chroma") == "chroma":
+            _WORKER["vs_client"] = create_client()
+        _WORKER["embedding_function"] = (embedding_factory or default_embedding_function)()
+
+
+def _worker_score(jd: Dict[str, Any], text: str, trace=None) -> Dict[str, Any]:
+    from pipeline import run_rules
+
+    return run_rules(
+        jd,
+        text,
+        cfg=_WORKER["cfg"],
+        vs_client=_WORKER["vs_client"],
+        embedding_function=_WORKER["embedding_function"],
+        trace=trace,
+    )
+
+
+def _score_chunk(chunk: List[Candidate]) -> Tuple[List[Outcome], List[Dict[str, Any]]]:
+    # Trace records are collected in the worker and written by the parent
+    records: List[Dict[str, Any]] = []
+    sink = records.append if _WORKER["trace"] else None
+    return [_score_one(_worker_score, _WORKER["jd"], c, sink) for c in chunk], records
+
+
+def _chunked(items: Iterable[Candidate], size: int) -> Iterator[List[Candidate]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pool_outcomes(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    *,
+    workers: int,
+    chunk_size: int,
+    cfg,
+    embedding_factory,
+    mp_context: str,
+    trace_sink: Optional[TraceSink],
+) -> Iterator[Outcome]:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    ctx = multiprocessing.get_context(mp_context)
+
+    def collect(fut: Future) -> List[Outcome]:
+        outcomes, records = fut.result()
+        for record in records:
+            trace_sink(record)
+        return outcomes
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(jd, cfg, embedding_factory, trace_sink is not None),
+    ) as pool:
+        # Bounded window of in-flight chunks, drained in submission order so the
+        # output is identical to a serial run regardless of completion order.
+        pending: Deque[Future] = deque()
+        for chunk in _chunked(candidates, chunk_size):
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
+
+
+def run_batch_parallel(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    out: TextIO,
+    *,
+    workers: int,
+    chunk_size: int = 16,
+    cfg=None,
+    embedding_factory: Optional[Callable[[], Any]] = None,
+    mp_context: str = "spawn",
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> BatchStats:
+    """Rules-mode batch over a pool of ``workers`` processes.
+
+    Workers score candidates in chunks of ``chunk_size``. When the rules scorer
+    needs retrieval, each worker builds its Chroma client and embedding function
+    once (``embedding_factory()``, default: Chroma's default embedder); otherwise
+    workers run the vector-store-free fast path. Records are written in input order,
+    so the NDJSON output is byte-identical to ``run_batch`` with ``run_rules``.
+    Trace records (see ``run_batch``) are built in the workers and handed to
+    ``trace_sink`` in the parent, in input order.
+    """
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+    outcomes = _pool_outcomes(
+        jd,
+        candidates,
+        workers=workers,
+        chunk_size=chunk_size,
+        cfg=cfg,
+        embedding_factory=embedding_factory,
+        mp_context=mp_context,
+        trace_sink=trace_sink,
+    )
+    return write_outcomes(outcomes, out, debug=debug)
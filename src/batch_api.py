@@ -0,0 +1,186 @@
+"""
+Two-phase scoring through a provider's asynchronous batch API (overnight runs).
+1) export_requests: parse + retrieve + build_prompt for every candidate and
+   write one chat-completions request per line (``custom_id``, ``method``,
+   ``url``, ``body``) for upload, plus a manifest holding what phase 2 needs
+   (candidate id, parsed resume, retrieval hits). custom_id is a hash of
+   (JD, candidate id, resume text), so it is stable across exports.
+2) import_results: read the provider's output JSONL and, per candidate,
+   validate → local repair → (optional) one LLM repair → rule-based fallback,
+   writing NDJSON records like run_batch. No retrieval or embedding runs in
+   this phase; candidates missing from the output fall back to rules.
+
+Both phases work on local files only; nothing here talks to the batch service.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+import hashlib
+import json
+import sys
+
+from batch import BatchStats, Candidate, TraceSink, failed_trace, write_outcomes
+from compiled_jd import compile_jd
+from llm_evaluator import LLMConfig, score_request
+from pipeline import PipelineConfig, fallback_result, prepare_request, score_response
+from result_store import jd_hash
+from schema import schema_version
+from tracing import NULL_TRACE, Trace
+
+__all__ = ["export_requests", "import_results", "custom_id"]
+
+_URL = "/v1/chat/completions"
+
+
+def custom_id(jd, candidate_id: str, resume_text: str) -> str:
+    material = f"{jd_hash(jd)}\0{candidate_id}\0{hashlib.sha256(resume_text.encode('utf-8')).hexdigest()}"
+    return "cand-" + hashlib.sha256(material.encode("utf-8")).hexdigest()[:24]
+
+
+def _llm_cfg(cfg: PipelineConfig) -> LLMConfig:
+    return LLMConfig(model=cfg.model, seed=cfg.seed, structured_output=cfg.structured_output)
+
+
+def export_requests(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    requests_out: TextIO,
+    manifest_out: TextIO,
+    *,
+    cfg: Optional[PipelineConfig] = None,
+    vs_client=None,
+    embedding_function=None,
+    llm_cache=None,
+    debug: bool = False,
+) -> BatchStats:
+    """Phase 1: one batch request per readable candidate; unreadable ones are
+    counted as failures and left out. The manifest starts with a header line
+    (model, JD hash, schema version) checked by import_results."""
+    cfg = cfg or PipelineConfig()
+    cjd = compile_jd(jd)
+    llm_cfg = _llm_cfg(cfg)
+    header = {
+        "kind": "header", "model": cfg.model, "seed": cfg.seed, "structured_output": cfg.structured_output,
+        "jd_hash": jd_hash(cjd), "schema_version": schema_version(),
+    }
+    manifest_out.write(json.dumps(header, ensure_ascii=False) + "\n")
+    stats = BatchStats()
+    seen = set()
+    for cid, text, error in candidates:
+        stats.total += 1
+        if error is not None:
+            stats.failed += 1
+            stats.failures.append((cid, error))
+            continue
+        rid = custom_id(cjd, cid, text)
+        if rid in seen:  # before any parsing or retrieval work
+            stats.failed += 1
+            stats.failures.append((cid, "duplicate candidate (same id and resume)"))
+            continue
+        seen.add(rid)
+        parsed, hits, prompt = prepare_request(
+            cjd, text, cfg=cfg, vs_client=vs_client, embedding_function=embedding_function, debug=debug
+        )
+        messages, kwargs = score_request(prompt, llm_cfg)
+        requests_out.write(json.dumps(
+            {"custom_id": rid, "method": "POST", "url": _URL, "body": {"messages": messages, **kwargs}},
+            ensure_ascii=False,
+        ) + "\n")
+        entry = {"kind": "candidate", "custom_id": rid, "id": cid, "parsed": parsed, "hits": hits}
+        if llm_cache is not None:
+            entry["cache_key"] = llm_cache.key("score", messages, kwargs)
+        manifest_out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        stats.ok += 1
+    return stats
+
+
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{lineno}: invalid JSON ({e})") from e
+
+
+def _response_content(row: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(message content, error) of one batch output line."""
+    if row.get("error"):
+        return None, f"batch error: {row['error']}"
+    resp = row.get("response") or {}
+    if resp.get("status_code") != 200:
+        return None, f"batch request failed with status {resp.get('status_code')}"
+    try:
+        return resp["body"]["choices"][0]["message"]["content"], None
+    except (KeyError, IndexError, TypeError):
+        return None, "batch response has no message content"
+
+
+def import_results(
+    jd: Dict[str, Any],
+    manifest: Path,
+    results: Path,
+    out: TextIO,
+    *,
+    client=None,
+    repair: bool = True,
+    llm_cache=None,
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> BatchStats:
+    """Phase 2: final NDJSON records in manifest order.
+
+    ``repair=False`` skips the LLM repair round trip: output that local repair
+    can't fix falls back to rules (fallback_invalid). With ``llm_cache``, usable responses
+    are stored under the same key a synchronous run would use.
+    """
+    rows = _read_jsonl(manifest)
+    header = next(rows, None)
+    if not header or header.get("kind") != "header":
+        raise ValueError(f"{manifest}: missing manifest header")
+    cjd = compile_jd(jd)
+    if header["jd_hash"] != jd_hash(cjd):
+        raise ValueError("manifest was exported for a different JD")
+    if header["schema_version"] != schema_version():
+        raise ValueError("manifest was exported with a different schema version")
+    llm_cfg = LLMConfig(model=header["model"], seed=header["seed"], structured_output=header["structured_output"])
+
+    answers: Dict[str, Dict[str, Any]] = {}
+    for row in _read_jsonl(results):
+        if "custom_id" in row:
+            answers[row["custom_id"]] = row
+
+    def outcomes():
+        for entry in rows:
+            cid = entry["id"]
+            trace = Trace(cid) if trace_sink is not None else NULL_TRACE
+            try:
+                result = _score_entry(cjd, entry, answers.get(entry["custom_id"]), llm_cfg,
+                                      client=client, repair=repair, llm_cache=llm_cache, trace=trace, debug=debug)
+                error = None
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+                failed_trace(trace if trace_sink is not None else None, error)
+            if trace_sink is not None:
+                trace_sink(trace.to_record())
+            yield cid, result, error
+
+    return write_outcomes(outcomes(), out, debug=debug)
+
+
+def _score_entry(cjd, entry, row, llm_cfg: LLMConfig, *, client, repair: bool, llm_cache, trace, debug: bool):
+    parsed, hits = entry["parsed"], entry["hits"]
+    trace.set("repair_attempted", False)
+    trace.set("fallback", False)
+    if row is None:
+        return fallback_result(cjd, parsed, hits, "fallback_missing", error="no result in batch output", trace=trace)
+    content, error = _response_content(row)
+    if error is not None:
+        return fallback_result(cjd, parsed, hits, "fallback_error", error=error, trace=trace)
+    if debug:
+        print(f"[batch-api] {entry['id']}: scoring batch response", file=sys.stderr)
+    return score_response(
+        cjd, parsed, hits, content, llm_cfg, client=client, repair=repair, llm_cache=llm_cache,
+        cache_key=entry.get("cache_key"), trace=trace, debug=debug,
+    )
@@ -0,0 +1,173 @@
+"""
+Cascade ranking: a cheap rules screen over the whole pool, the LLM only for the top.
+1) Every readable candidate is scored by run_rules (fast path: parse +
+   score_rule_based, no vector store).
+2) Candidates are ranked by rules overallScore (ties: input order). The top
+   ``top_n`` and/or those with overallScore >= ``min_score`` are promoted and
+   scored again with ``llm_score`` (run_pipeline).
+3) One NDJSON record per candidate in final ranking order: promoted candidates
+   first, by their LLM-stage overallScore, then the screened-out ones by rules
+   score. Each record carries its provenance:
+     {"id", "ok", "rank", "stage": "llm" | "rules", "rules_score", "outcome", "result"}
+   ``outcome`` is the pipeline outcome (``llm``, ``llm_repaired``,
+   ``fallback_*``, ...) for promoted candidates and ``rules`` otherwise. If the
+   LLM stage raises, the rules result is kept (stage "rules", ``llm_error``).
+CascadeStats.summary() reports LLM calls avoided versus a full-LLM run.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import json
+import sys
+import time
+
+from batch import BatchStats, Candidate, TraceSink, failed_trace
+from compiled_jd import compile_jd
+from pipeline import PipelineConfig, run_rules
+from tracing import NULL_TRACE, Trace
+
+__all__ = ["run_cascade", "promote", "CascadeStats"]
+
+
+class CascadeStats(BatchStats):
+    def __init__(self) -> None:
+        super().__init__()
+        self.screened = 0  # scored by the rules stage
+        self.promoted = 0  # sent to the LLM stage
+        self.llm_requests = 0  # LLM-stage requests incl. repairs (LLM cache hits count too)
+        self.llm_errors = 0
+        self.rules_s = 0.0
+        self.llm_s = 0.0
+        self.prompt_tokens = 0
+
+    @property
+    def avoided(self) -> int:
+        """LLM requests a full-LLM run would have made that the cascade skipped (at least one each)."""
+        return self.screened - self.promoted
+
+    def summary(self) -> str:
+        share = f" ({self.avoided / self.screened:.0%})" if self.screened else ""
+        tokens = ""
+        if self.promoted and self.prompt_tokens:
+            tokens = f", ~{self.prompt_tokens // self.promoted * self.avoided} prompt tokens"
+        return (
+            super().summary() + "\n"
+            f"[cascade] rules stage {self.screened} candidates in {self.rules_s:.2f}s; "
+            f"LLM stage {self.promoted} candidates ({self.llm_requests} requests) in {self.llm_s:.2f}s; "
+            f"avoided {self.avoided} LLM calls{share}{tokens} vs. a full-LLM run"
+        )
+
+
+def promote(scores: List[float], *, top_n: Optional[int] = None, min_score: Optional[float] = None) -> List[int]:
+    """Indexes (into ``scores``) to send to the LLM stage, best first.
+
+    With both limits, the top ``top_n`` of those scoring at least ``min_score``.
+    """
+    if top_n is None and min_score is None:
+        raise ValueError("cascade needs top_n and/or min_score")
+    if top_n is not None and top_n < 0:
+        raise ValueError("top_n must be >= 0")
+    order = sorted(range(len(scores)), key=lambda i: (-scores[i], i))
+    if min_score is not None:
+        order = [i for i in order if scores[i] >= min_score]
+    return order if top_n is None else order[:top_n]
+
+
+def run_cascade(
+    jd: Dict[str, Any],
+    candidates: Iterable[Candidate],
+    llm_score: Callable[..., Dict[str, Any]],
+    out,
+    *,
+    top_n: Optional[int] = None,
+    min_score: Optional[float] = None,
+    rules_cfg: Optional[PipelineConfig] = None,
+    trace_sink: Optional[TraceSink] = None,
+    debug: bool = False,
+) -> CascadeStats:
+    """Rules screen → LLM for the promoted candidates → ranked NDJSON (see module doc).
+
+    ``llm_score(jd, resume_text, trace=Trace)`` is the LLM-stage entry point
+    (``run_pipeline``); it always gets a trace, for the outcome and request
+    counts. ``trace_sink`` receives each candidate's final-stage trace record,
+    with ``cascade_stage`` and ``rules_score`` counters.
+    """
+    # validate the limits before any scoring
+    promote([], top_n=top_n, min_score=min_score)
+    cjd = compile_jd(jd)
+    stats = CascadeStats()
+    t0 = time.perf_counter()
+
+    # 1) rules screen over the whole pool
+    pool: List[Dict[str, Any]] = []
+    failed: List[tuple] = []
+    for cid, text, error in candidates:
+        stats.total += 1
+        if error is None:
+            trace = Trace(cid) if trace_sink is not None else NULL_TRACE
+            try:
+                result = run_rules(cjd, text, cfg=rules_cfg, trace=trace, debug=debug)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                failed_trace(trace if trace_sink is not None else None, error)
+            if trace_sink is not None and error is not None:
+                trace_sink(trace.to_record())
+        if error is not None:
+            failed.append((cid, error))
+            continue
+        pool.append({"id": cid, "text": text, "rules": result, "trace": trace})
+    stats.screened = len(pool)
+    stats.rules_s = time.perf_counter() - t0
+
+    # 2) LLM stage for the promoted candidates
+    t1 = time.perf_counter()
+    rules_scores = [c["rules"]["overallScore"] for c in pool]
+    promoted = promote(rules_scores, top_n=top_n, min_score=min_score)
+    stats.promoted = len(promoted)
+    for i in promoted:
+        cand = pool[i]
+        trace = Trace(cand["id"])
+        trace.set("cascade_stage", "llm")
+        trace.set("rules_score", rules_scores[i])
+        try:
+            cand["llm"] = llm_score(cjd, cand["text"], trace=trace)
+        except Exception as e:
+            cand["llm_error"] = f"{type(e).__name__}: {e}"
+            stats.llm_errors += 1
+            if debug:
+                print(f"[cascade] LLM stage failed for {cand['id']!r}: {cand['llm_error']}", file=sys.stderr)
+            failed_trace(trace, cand["llm_error"])
+        cand["outcome"] = trace.outcome
+        if trace.counters.get("prompt_tokens") is not None:  # a prompt was built
+            stats.llm_requests += 1 + bool(trace.counters.get("repair_attempted"))
+            stats.prompt_tokens += trace.counters["prompt_tokens"]
+        cand["trace"] = trace
+    stats.llm_s = time.perf_counter() - t1
+
+    # 3) merged ranking: promoted by final score, then the rest by rules score
+    top = sorted((pool[i] for i in promoted if "llm" in pool[i]), key=lambda c: -c["llm"]["overallScore"])
+    done = {id(c) for c in top}
+    rest = [pool[i] for i in promote(rules_scores, top_n=None, min_score=float("-inf")) if id(pool[i]) not in done]
+    for rank, cand in enumerate(top + rest, 1):
+        llm = "llm" in cand
+        record = {
+            "id": cand["id"], "ok": True, "rank": rank, "stage": "llm" if llm else "rules",
+            "rules_score": cand["rules"]["overallScore"],
+            "outcome": cand["outcome"] if llm else "rules",
+        }
+        if "llm_error" in cand:
+            record["llm_error"] = cand["llm_error"]
+        record["result"] = cand["llm"] if llm else cand["rules"]
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stats.ok += 1
+        if trace_sink is not None:
+            if not llm and "llm_error" not in cand:
+                cand["trace"].set("cascade_stage", "rules")
+                cand["trace"].set("rules_score", cand["rules"]["overallScore"])
+            trace_sink(cand["trace"].to_record())
+    for cid, error in failed:
+        out.write(json.dumps({"id": cid, "ok": False, "error": error}, ensure_ascii=False) + "\n")
+        stats.failed += 1
+        stats.failures.append((cid, error))
+    out.flush()
+    stats.elapsed_s = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,100 @@
+"""
+CompiledJD: everything the pipeline derives from the JD alone, computed once.
+- Required skills + the compiled skill matcher (parse_resume).
+- Technical requirements and the years requirement (scorer).
+- "Proficiency in" requirements and their normalized retrieval queries
+  (retrieve), plus query embeddings cached per embedding function.
+- Sorted requirements and the pre-serialized JOB prompt block (prompt).
+
+parse_resume, retrieve_for_requirements, score_rule_based and build_prompt
+accept a CompiledJD wherever they take the JD (or its requirements), and
+produce exactly the same output as with the plain dict. Build it once per JD
+with compile_jd(...) and reuse it across candidates.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+
+__all__ = ["CompiledJD", "compile_jd"]
+
+
+class CompiledJD:
+    def __init__(self, jd: Dict[str, Any]) -> None:
+        # helpers live next to their consumers; imported here to avoid import cycles
+        from parse_resume import _norm, extract_required_skills_from_jd
+        from prompt import _stable_sorted_strs
+        from retrieve import _normalize_requirement_to_query
+        from scorer import _extract_years_req, _tech_requirements
+        from skill_matcher import compile_skill_matcher
+
+        self.jd = jd
+        self._content_hash: Optional[str] = None
+        self.requirements: List[str] = list(jd.get("requirements", []) or [])
+
+        # parse_resume
+        self.required_skills: List[str] = extract_required_skills_from_jd(self.requirements)
+        self.skill_by_norm: Dict[str, str] = {_norm(s): s for s in self.required_skills}
+        self.skill_targets: Tuple[str, ...] = tuple(self.skill_by_norm)  # sorted by normalized name
+        self.skill_matcher = compile_skill_matcher(self.skill_targets)
+
+        # scorer
+        self.tech_requirements: List[str] = _tech_requirements(self.requirements)
+        self.years_required: int = _extract_years_req(self.requirements)
+
+        # retrieve
+        self.query_requirements: List[str] = [
+            r for r in self.requirements if r.lower().startswith("proficiency in ")
+        ]
+        self.queries: List[str] = [_normalize_requirement_to_query(r) for r in self.query_requirements]
+        self.unique_queries: List[str] = list(dict.fromkeys(self.queries))
+        self._query_embeddings: Dict[int, Tuple[Any, Any]] = {}
+
+        # prompt
+        self.prompt_requirements: List[str] = _stable_sorted_strs(self.requirements)
+        job_obj = {
+            "title": jd.get("title", ""),
+            "sector": jd.get("sector", ""),
+            "location": jd.get("location", ""),
+            "description": jd.get("description", ""),
+            "requirements": self.prompt_requirements,
+        }
+        self.job_block: str = "JOB:\n" + json.dumps(job_obj, ensure_ascii=False, sort_keys=True)
+
+    @classmethod
+    def from_text(cls, text: str) -> "CompiledJD":
+        """Compile a plain-text JD (via jd_text.parse_job_text)."""
+        from jd_text import parse_job_text
+        return cls(parse_job_text(text))
+
+    @property
+    def content_hash(self) -> str:
+        """sha256 of the canonical JD JSON (identifies the JD in the result store)."""
+        if self._content_hash is None:
+            canon = json.dumps(self.jd, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+            self._content_hash = hashlib.sha256(canon.encode("utf-8")).hexdigest()
+        return self._content_hash
+
+    def query_embeddings(self, embedding_function) -> Any:
+        """Embeddings of ``unique_queries`` under ``embedding_function``, computed once per embedder."""
+        cached = self._query_embeddings.get(id(embedding_function))
+        if cached is not None and cached[0] is embedding_function:
+            return cached[1]
+        embed = getattr(embedding_function, "embed_query", None) or embedding_function
+        vectors = embed(self.unique_queries) if self.unique_queries else []
+        self._query_embeddings[id(embedding_function)] = (embedding_function, vectors)
+        return vectors
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # embedders may not pickle (process-pool workers); they recompute on demand
+        state = dict(self.__dict__)
+        state["_query_embeddings"] = {}
+        return state
+
+    def __repr__(self) -> str:
+        return f"CompiledJD(title={self.jd.get('title', '')!r}, requirements={len(self.requirements)})"
+
+
+def compile_jd(jd: Union[Dict[str, Any], CompiledJD]) -> CompiledJD:
+    """Return ``jd`` compiled (a CompiledJD is returned unchanged)."""
+    return jd if isinstance(jd, CompiledJD) else CompiledJD(jd)
@@ -0,0 +1,219 @@
+"""
+Persistent cross-candidate resume index ("which stored candidates fit this JD?").
+- One Chroma collection holds every indexed candidate's resume lines, using
+  build_resume_collection's document model (one document per line, metadata
+  ``idx``/``id`` = ``res-0000``...) plus ``candidate`` (candidate id) and
+  ``resume_hash``. Document ids are ``<candidate id>#res-0000``.
+- add / add_many are incremental: a candidate whose resume is unchanged is
+  skipped, an edited one is replaced; remove drops a candidate's lines.
+- search(jd) runs retrieve_for_requirements over the whole corpus and ranks
+  candidates by their best line per requirement: score = mean over the JD's
+  requirements of (1 - best cosine distance), 0 for requirements without a hit.
+  The top candidates are a shortlist for score_rule_based / LLM scoring
+  (``main.py --shortlist INDEX``).
+
+Lines are the resume's non-empty lines (not the JD-specific evidence lines),
+so one index serves every JD.
+
+    python src/corpus_index.py add --index .index/ --resumes resumes/
+    python src/corpus_index.py search --index .index/ --jd jd.json --top 20
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import argparse
+import hashlib
+import json
+import sys
+
+from compiled_jd import CompiledJD, compile_jd
+from retrieve import retrieve_for_requirements
+
+__all__ = ["CandidateIndex", "resume_lines"]
+
+_SEP = "#"
+
+
+def resume_lines(resume_text: str) -> List[str]:
+    """Indexed lines of a resume: stripped, non-empty, first occurrence of each."""
+    return list(dict.fromkeys(ln.strip() for ln in (resume_text or "").splitlines() if ln.strip()))
+
+
+def _resume_hash(resume_text: str) -> str:
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()[:16]
+
+
+class CandidateIndex:
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        *,
+        client=None,
+        embedding_function=None,
+        name: str = "candidate_corpus",
+    ) -> None:
+        """Open (or create) the index at ``path`` (a Chroma persistent directory),
+        or in ``client`` when given. Always use the embedder the index was built with."""
+        if client is None:
+            import chromadb
+            from chromadb.config import Settings
+            if path is None:
+                raise ValueError("CandidateIndex needs a path or a client")
+            client = chromadb.PersistentClient(path=str(path), settings=Settings(anonymized_telemetry=False))
+        if embedding_function is None:
+            from retrieve import default_embedding_function
+            embedding_function = default_embedding_function()
+        self.client = client
+        self.embedding_function = embedding_function
+        self._coll = client.get_or_create_collection(
+            name=name, metadata={"hnsw:space": "cosine"}, embedding_function=embedding_function
+        )
+
+    # ---- maintenance -----------------------------------------------------------
+
+    def _stored_hash(self, candidate_id: str) -> Optional[str]:
+        got = self._coll.get(where={"candidate": candidate_id}, limit=1, include=["metadatas"])
+        return got["metadatas"][0].get("resume_hash") if got["ids"] else None
+
+    def __contains__(self, candidate_id: str) -> bool:
+        return self._stored_hash(candidate_id) is not None
+
+    def remove(self, candidate_id: str) -> bool:
+        """Drop a candidate's lines; False if it was not indexed."""
+        if candidate_id not in self:
+            return False
+        self._coll.delete(where={"candidate": candidate_id})
+        return True
+
+    def add(self, candidate_id: str, resume_text: str) -> bool:
+        """Index (or re-index an edited) resume; False if it is already indexed unchanged."""
+        return self.add_many([(candidate_id, resume_text)]) == 1
+
+    def add_many(self, candidates: Iterable[Tuple[str, str]], *, batch_lines: int = 2000) -> int:
+        """Index many (candidate_id, resume_text) pairs, embedding in batches; returns how many changed."""
+        if batch_lines < 1:
+            raise ValueError("batch_lines must be >= 1")
+        changed = 0
+        docs: List[str] = []
+        ids: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        pending = set()
+
+        def flush() -> None:
+            if docs:
+                self._coll.add(documents=docs, ids=ids, metadatas=metas)
+                docs.clear(), ids.clear(), metas.clear()
+            pending.clear()
+
+        for cid, text in candidates:
+            cid = str(cid)
+            if _SEP in cid:
+                raise ValueError(f"candidate id may not contain {_SEP!r}: {cid!r}")
+            if cid in pending:  # listed twice: the later resume wins
+                flush()
+            h = _resume_hash(text)
+            stored = self._stored_hash(cid)
+            if stored == h:
+                continue
+            if stored is not None:
+                flush()  # the replaced lines may still be pending
+                self._coll.delete(where={"candidate": cid})
+            for i, line in enumerate(resume_lines(text)):
+                docs.append(line)
+                ids.append(f"{cid}{_SEP}res-{i:04d}")
+                metas.append({"idx": i, "id": f"res-{i:04d}", "candidate": cid, "resume_hash": h})
+            pending.add(cid)
+            changed += 1
+            if len(docs) >= batch_lines:
+                flush()
+        flush()
+        return changed
+
+    def candidate_ids(self) -> List[str]:
+        """Every indexed candidate id, sorted (reads all line metadata)."""
+        got = self._coll.get(include=["metadatas"])
+        return sorted({m["candidate"] for m in got["metadatas"]})
+
+    def line_count(self) -> int:
+        return self._coll.count()
+
+    # ---- search ---------------------------------------------------------------
+
+    def search(
+        self,
+        jd: Union[Dict[str, Any], CompiledJD],
+        *,
+        top_n: int = 20,
+        line_hits: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-``top_n`` candidates for the JD's "Proficiency in" requirements.
+
+        Each requirement retrieves its ``line_hits`` nearest lines across the
+        corpus (default ``10 * top_n``, at least 50); a candidate's score is the
+        mean over requirements of 1 - its best line's distance. Returns
+        [{"id", "score", "evidence": {requirement: {"line", "distance"}}}],
+        best first, ties by id.
+        """
+        cjd = compile_jd(jd)
+        n_lines = self.line_count()
+        if not n_lines or not cjd.query_requirements:
+            return []
+        k = min(n_lines, line_hits or max(50, 10 * top_n))
+        hits = retrieve_for_requirements(self._coll, cjd, k=k, embedding_function=self.embedding_function)
+        best: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for req, items in hits.items():
+            for h in items:  # ordered by (distance, id): the first hit per candidate is its best
+                cid = h["meta"]["candidate"]
+                best.setdefault(cid, {}).setdefault(req, {"line": h["text"], "distance": round(h["distance"], 6)})
+        n_reqs = len(cjd.query_requirements)
+        ranked = [
+            {
+                "id": cid,
+                "score": round(sum(max(0.0, 1.0 - e["distance"]) for e in ev.values()) / n_reqs, 6),
+                "evidence": ev,
+            }
+            for cid, ev in best.items()
+        ]
+        ranked.sort(key=lambda r: (-r["score"], r["id"]))
+        return ranked[:top_n]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Cross-candidate resume index")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    add = sub.add_parser("add", help="Index (or re-index edited) resumes")
+    add.add_argument("--resumes", type=Path, required=True, help="Directory of *.txt resumes or a JSONL file")
+    rm = sub.add_parser("remove", help="Drop candidates from the index")
+    rm.add_argument("ids", nargs="+")
+    search = sub.add_parser("search", help="Top candidates for a JD (JSON lines)")
+    search.add_argument("--jd", type=Path, required=True, help="Job JSON (full record with 'job' or the job object)")
+    search.add_argument("--top", type=int, default=20)
+    for sp in (add, rm, search):
+        sp.add_argument("--index", type=Path, required=True, help="Index directory (created on first add)")
+    args = p.parse_args(argv)
+
+    index = CandidateIndex(args.index)
+    if args.cmd == "add":
+        from batch import iter_candidates
+        readable = []
+        for cid, text, error in iter_candidates(args.resumes):
+            if error is not None:
+                print(f"[index] skipped {cid}: {error}", file=sys.stderr)
+            else:
+                readable.append((cid, text))
+        changed = index.add_many(readable)
+        print(f"[index] {changed} of {len(readable)} candidates added or updated", file=sys.stderr)
+    elif args.cmd == "remove":
+        for cid in args.ids:
+            if not index.remove(cid):
+                print(f"[index] not indexed: {cid}", file=sys.stderr)
+    else:
+        obj = json.loads(args.jd.read_text(encoding="utf-8"))
+        jd = obj.get("job", obj)
+        for row in index.search(jd, top_n=args.top):
+            print(json.dumps(row, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
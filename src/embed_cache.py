@@ -0,0 +1,209 @@
+"""
+Embedding cache shared by collection builds and requirement queries.
+- Key = (embedding model id, sha256 of the text).
+- Tier 1: in-memory LRU of float32 vectors.
+- Tier 2 (optional): on-disk, per model id: an append-only float32 matrix
+  (``vectors.f32``, read through np.memmap) plus an append-only ``index.tsv``
+  of ``<text hash>\\t<row>`` lines. Rows are written before their index lines,
+  so a crash can only leave unindexed rows behind, never dangling indexes.
+- CachedEmbeddingFunction wraps any embedder (Chroma-style callable) so the
+  wrapped model only ever sees texts it has not embedded before.
+
+Query and document texts share one cache, which assumes a symmetric embedder
+(true for Chroma's default MiniLM model).
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import hashlib
+import json
+import re
+import threading
+
+import numpy as np
+
+__all__ = ["EmbeddingCache", "CachedEmbeddingFunction", "embedding_model_id"]
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embedding_model_id(embedding_function) -> str:
+    """Best-effort stable id for an embedder: its name() plus model name if exposed."""
+    name = ""
+    fn = getattr(embedding_function, "name", None)
+    if callable(fn):
+        try:
+            name = str(fn())
+        except Exception:
+            name = ""
+    name = name or type(embedding_function).__name__
+    model = getattr(embedding_function, "model_name", None) or getattr(embedding_function, "MODEL_NAME", None)
+    return f"{name}:{model}" if model else name
+
+
+class EmbeddingCache:
+    def __init__(self, model_id: str, path: Optional[Path] = None, *, memory_entries: int = 8192) -> None:
+        self.model_id = model_id
+        self.memory_entries = memory_entries
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._dir: Optional[Path] = None
+        self._rows: Dict[str, int] = {}
+        self._dim: Optional[int] = None
+        self._mmap: Optional[np.memmap] = None
+        if path is not None:
+            slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_id).strip("_") or "model"
+            self._dir = Path(path) / slug
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    # ---- disk tier ----------------------------------------------------------
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self._dir / "vectors.f32"
+
+    @property
+    def _index_path(self) -> Path:
+        return self._dir / "index.tsv"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self._dir / "meta.json"
+
+    def _load(self) -> None:
+        if not self._meta_path.exists():
+            return
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        self._dim = int(meta["dim"])
+        nrows = self._vectors_path.stat().st_size // (4 * self._dim) if self._vectors_path.exists() else 0
+        if self._index_path.exists():
+            for line in self._index_path.read_text(encoding="utf-8").splitlines():
+                key, _, row = line.partition("\t")
+                if row.isdigit() and int(row) < nrows:
+                    self._rows[key] = int(row)
+
+    def _matrix(self) -> Optional[np.memmap]:
+        if self._mmap is None and self._rows:
+            nrows = self._vectors_path.stat().st_size // (4 * self._dim)
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(nrows, self._dim))
+        return self._mmap
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        if self._dim is None:
+            self._dim = int(vectors.shape[1])
+            self._meta_path.write_text(json.dumps({"model_id": self.model_id, "dim": self._dim}), encoding="utf-8")
+        start = self._vectors_path.stat().st_size // (4 * self._dim) if self._vectors_path.exists() else 0
+        with self._vectors_path.open("ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with self._index_path.open("a", encoding="utf-8") as f:
+            f.write("".join(f"{k}\t{start + i}\n" for i, k in enumerate(keys)))
+        for i, k in enumerate(keys):
+            self._rows[k] = start + i
+        self._mmap = None  # re-map lazily to include the new rows
+
+    # ---- lookups ------------------------------------------------------------
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        # caller holds the lock
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = _text_key(text)
+                vec = self._mem.get(key)
+                if vec is not None:
+                    self._mem.move_to_end(key)
+                    self.memory_hits += 1
+                elif key in self._rows:
+                    vec = np.array(self._matrix()[self._rows[key]], dtype=np.float32)
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                out.append(vec)
+        return out
+
+    def put_many(self, texts: Sequence[str], vectors: Any) -> None:
+        mat = np.asarray(vectors, dtype=np.float32)
+        if mat.ndim == 1:
+            mat = mat.reshape(1, -1)
+        with self._lock:
+            new_keys: List[str] = []
+            new_rows: List[int] = []
+            for i, text in enumerate(texts):
+                key = _text_key(text)
+                self._remember(key, mat[i].copy())
+                if self._dir is not None and key not in self._rows and key not in new_keys:
+                    new_keys.append(key)
+                    new_rows.append(i)
+            if new_keys:
+                self._append(new_keys, mat[new_rows])
+
+    # ---- stats --------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+                "disk_entries": len(self._rows),
+            }
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (
+            f"[embed-cache] hits={st['memory_hits'] + st['disk_hits']} "
+            f"(memory={st['memory_hits']} disk={st['disk_hits']}) misses={st['misses']} "
+            f"hit_rate={st['hit_rate']:.1%}"
+        )
+
+
+class CachedEmbeddingFunction:
+    """Embedder wrapper: cached texts are served from the cache, the rest are
+    embedded in one call to the wrapped function (duplicates embedded once).
+    Usable anywhere an embedding function is accepted (Chroma or NumPy backend).
+    """
+
+    def __init__(self, inner, cache: Optional[EmbeddingCache] = None, *, path: Optional[Path] = None) -> None:
+        self.inner = inner
+        self.cache = cache or EmbeddingCache(embedding_model_id(inner), path)
+
+    def _embed(self, texts: Sequence[str], fn) -> List[np.ndarray]:
+        texts = list(texts)
+        found = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+        if missing:
+            vecs = np.asarray(fn(missing), dtype=np.float32)
+            self.cache.put_many(missing, vecs)
+            fresh = {t: vecs[i] for i, t in enumerate(missing)}
+            found = [v if v is not None else fresh[t] for t, v in zip(texts, found)]
+        return found
+
+    def __call__(self, input: Sequence[str]) -> List[np.ndarray]:
+        return self._embed(input, self.inner)
+
+    def embed_query(self, input: Sequence[str]) -> List[np.ndarray]:
+        return self._embed(input, getattr(self.inner, "embed_query", self.inner))
+
+    def name(self) -> str:
+        return embedding_model_id(self.inner)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
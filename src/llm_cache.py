@@ -0,0 +1,186 @@
+"""
+Content-addressed cache for LLM responses.
+- Key = sha256 of (request kind, messages, model, temperature, top_p, seed,
+  response format, schema version). The prompt is deterministic, so an
+  unchanged JD/resume maps to the same key on every run.
+- Two tiers: in-memory LRU in front of one JSON file per entry on disk.
+- Disk tier is bounded by entry count, total bytes and age since the entry was
+  written (oldest evicted first). The age limit applies to memory hits too, so a
+  long-running process stops serving an entry once it expires.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+from schema import schema_version
+
+__all__ = ["LLMCache"]
+
+_EVICT_EVERY = 100  # writes between automatic eviction passes
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        memory_entries: int = 256,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age_s: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._mem: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (created, content)
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.evict()
+
+    # ---- keys -----------------------------------------------------------------
+
+    @staticmethod
+    def key(kind: str, messages: List[Dict[str, str]], request_kwargs: Dict[str, Any]) -> str:
+        """Hash of everything that determines the provider's answer."""
+        material = {
+            "kind": kind,
+            "messages": messages,
+            "request": request_kwargs,  # model, temperature, top_p, seed, response_format
+            "schema_version": schema_version(),
+        }
+        canon = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.json"
+
+    # ---- lookups ----------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response content for ``key`` or None."""
+        with self._lock:
+            if key in self._mem:
+                created, content = self._mem[key]
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self.memory_hits += 1
+                    return content
+                del self._mem[key]
+        fp = self._file(key)
+        try:
+            entry = json.loads(fp.read_text(encoding="utf-8"))
+            if self._expired(entry["created"]):
+                raise KeyError(key)
+            content = entry["content"]
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, entry["created"], content)
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        fp = self._file(key)
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp = fp.parent / f".{fp.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        created = time.time()
+        tmp.write_text(json.dumps({"key": key, "created": created, "content": content}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, fp)
+        with self._lock:
+            self._remember(key, created, content)
+            self.writes += 1
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= _EVICT_EVERY
+        if due:
+            self.evict()
+
+    def _expired(self, created: float) -> bool:
+        return self.max_age_s is not None and time.time() - created > self.max_age_s
+
+    def _remember(self, key: str, created: float, content: str) -> None:
+        # caller holds the lock
+        self._mem[key] = (created, content)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    # ---- eviction -----------------------------------------------------------
+
+    def evict(self) -> int:
+        """Apply the age/count/size limits to the disk tier; return entries removed."""
+        entries: List[Tuple[float, int, Path]] = []
+        for fp in self.path.glob("*/*.json"):
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fp))
+        entries.sort(key=lambda e: (e[0], e[2].name))  # oldest first
+
+        now = time.time()
+        doomed: List[Path] = []
+        keep: List[Tuple[float, int, Path]] = []
+        for mtime, size, fp in entries:
+            if self.max_age_s is not None and now - mtime > self.max_age_s:
+                doomed.append(fp)
+            else:
+                keep.append((mtime, size, fp))
+        total = sum(size for _, size, _ in keep)
+        while keep and (
+            (self.max_entries is not None and len(keep) > self.max_entries)
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            _, size, fp = keep.pop(0)
+            total -= size
+            doomed.append(fp)
+
+        for fp in doomed:
+            try:
+                fp.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            for fp in doomed:
+                self._mem.pop(fp.stem, None)
+            self.evictions += len(doomed)
+            self._writes_since_evict = 0
+        return len(doomed)
+
+    # ---- stats --------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+            }
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (
+            f"[llm-cache] hits={st['memory_hits'] + st['disk_hits']} "
+            f"(memory={st['memory_hits']} disk={st['disk_hits']}) misses={st['misses']} "
+            f"hit_rate={st['hit_rate']:.1%} evictions={st['evictions']}"
+        )
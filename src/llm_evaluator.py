@@ -3,12 +3,26 @@ LLM evaluator (Step 6)
 - Uses environment variable OPENAI_API_KEY (do NOT hardcode keys).
 - JSON mode call, temperature=0, top_p=1, optional seed for determinism.
 - One repair attempt helper.
+- ``structured_output=True`` passes the schema as a strict JSON-schema
+  response format (schema.get_strict_schema) instead of generic JSON mode;
+  the prompt then no longer needs to carry the schema text.
+- Optional LLMCache (llm_cache.py) in front of both calls: cache hits skip the
+  API call (and client creation) entirely, and are flagged on the caller's
+  trace (``llm_cache_hit`` / ``repair_cache_hit``) so cost estimates skip them.
+- generate_multi_scores: one request for several candidates of one JD
+  (prompt.build_multi_prompt); answers {"results": {candidate_id: object}}.
+- Async twins (agenerate_scores / arepair_json) for overlapping many calls;
+  an optional asyncio.Semaphore bounds the number of in-flight requests.
 """
 from __future__ import annotations
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Sequence, Tuple, TYPE_CHECKING
 import json
 import os
 import sys
+from contextlib import nullcontext
+
+if TYPE_CHECKING:
+    import asyncio
 
 
 class LLMConfig:
@@ -18,11 +32,15 @@ class LLMConfig:
         temperature: float = 0.0,
         top_p: float = 1.0,
         seed: Optional[int] = 42,
+        timeout_s: Optional[float] = None,
+        structured_output: bool = False,
     ) -> None:
         self.model = model
         self.temperature = temperature
         self.top_p = top_p
         self.seed = seed
+        self.timeout_s = timeout_s  # per-request HTTP timeout (not part of the cache key)
+        self.structured_output = structured_output  # strict json_schema response format
 
 
 def _create_openai_client():
@@ -34,67 +52,256 @@ def _create_openai_client():
     return OpenAI(api_key=api_key)
 
 
+def _create_async_openai_client():
+    from openai import AsyncOpenAI
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY is not set in environment")
+    return AsyncOpenAI(api_key=api_key)
+
+
+def _response_format(cfg: LLMConfig) -> Dict[str, Any]:
+    if not cfg.structured_output:
+        return {"type": "json_object"}
+    from schema import get_strict_schema
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "AssignmentOutput", "strict": True, "schema": get_strict_schema()},
+    }
+
+
 def _json_mode_kwargs(cfg: LLMConfig) -> Dict[str, Any]:
     kwargs: Dict[str, Any] = {
         "model": cfg.model,
         "temperature": cfg.temperature,
         "top_p": cfg.top_p,
-        "response_format": {"type": "json_object"},
+        "response_format": _response_format(cfg),
     }
     if cfg.seed is not None:
         kwargs["seed"] = cfg.seed
     return kwargs
 
 
-def generate_scores(prompt: str, cfg: Optional[LLMConfig] = None, client=None) -> Dict[str, Any]:
+def _timeout_kwargs(cfg: LLMConfig) -> Dict[str, Any]:
+    return {"timeout": cfg.timeout_s} if cfg.timeout_s is not None else {}
+
+
+def _score_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You return one JSON object that validates against the given schema. No extra text."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _repair_messages(bad_json_text: str, schema_errors: List[str]) -> List[Dict[str, str]]:
+    repair_prompt = (
+        "Your previous JSON did not validate against the schema.\n"
+        "Here is your last JSON:\n" + bad_json_text + "\n\n"
+        "Here are validation errors (bulleted):\n- " + "\n- ".join(schema_errors[:10]) + "\n\n"
+        "Return a corrected JSON object ONLY that fixes these issues."
+    )
+    return [
+        {"role": "system", "content": "You return one corrected JSON object. No extra text."},
+        {"role": "user", "content": repair_prompt},
+    ]
+
+
+def score_request(prompt: str, cfg: Optional[LLMConfig] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """(messages, request parameters) of the generate_scores call for ``prompt``,
+    e.g. to send it through the provider's batch API."""
+    cfg = cfg or LLMConfig()
+    return _score_messages(prompt), _json_mode_kwargs(cfg)
+
+
+def parse_scores(content: Optional[str], cfg: LLMConfig) -> Dict[str, Any]:
+    """Decode a scoring response's message content (RuntimeError if it is not JSON)."""
+    try:
+        return _decode(content, cfg)
+    except Exception as e:
+        raise RuntimeError(f"LLM returned non-JSON content: {str(content)[:200]}...") from e
+
+
+def _decode(content: Optional[str], cfg: LLMConfig) -> Dict[str, Any]:
+    out = json.loads(content or "{}")
+    if cfg.structured_output and isinstance(out, dict):
+        # strict mode answers optional keys with null; the output schema omits them
+        out = {k: v for k, v in out.items() if v is not None}
+    return out
+
+
+def _cached(
+    cache, kind: str, messages: List[Dict[str, str]], kwargs: Dict[str, Any], traces: Sequence[Any] = ()
+) -> Tuple[Optional[str], Optional[str]]:
+    """Return (cache_key, cached_content); both None when caching is off.
+    A hit is recorded on each of ``traces``."""
+    if cache is None:
+        return None, None
+    key = cache.key(kind, messages, kwargs)
+    content = cache.get(key)
+    if content is not None:
+        for trace in traces:
+            trace.set("repair_cache_hit" if kind == "repair" else "llm_cache_hit", True)
+    return key, content
+
+
+def generate_scores(prompt: str, cfg: Optional[LLMConfig] = None, client=None, cache=None, trace=None) -> Dict[str, Any]:
     """
     Call the LLM in JSON-mode and parse the JSON into a dict.
     Raises RuntimeError on provider/parse issues (so caller can decide to repair/fallback).
+    With an ``LLMCache``, a previously seen request is answered without any API call
+    (and ``trace``, if given, gets ``llm_cache_hit``).
     """
     cfg = cfg or LLMConfig()
-    client = client or _create_openai_client()
 
-    kwargs = _json_mode_kwargs(cfg)
-    messages = [
-        {"role": "system", "content": "You return one JSON object that validates against the given schema. No extra text."},
-        {"role": "user", "content": prompt},
-    ]
+    messages, kwargs = score_request(prompt, cfg)
+    key, content = _cached(cache, "score", messages, kwargs, () if trace is None else (trace,))
+    if content is not None:
+        return parse_scores(content, cfg)
 
+    client = client or _create_openai_client()
     try:
         # proof-of-call debug
         print("[llm] chat.completions.create(...) called", file=sys.stderr)
-        resp = client.chat.completions.create(messages=messages, **kwargs)
+        resp = client.chat.completions.create(messages=messages, **kwargs, **_timeout_kwargs(cfg))
         content = resp.choices[0].message.content
     except Exception as e:
         raise RuntimeError(f"LLM call failed: {e}") from e
 
-    try:
-        return json.loads(content or "{}")
-    except Exception as e:
-        raise RuntimeError(f"LLM returned non-JSON content: {str(content)[:200]}...") from e
+    out = parse_scores(content, cfg)
+    if key is not None:
+        cache.put(key, content)
+    return out
+
+
+def _multi_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You return one JSON object with a result per candidate, each validating against the given schema. No extra text."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def generate_multi_scores(
+    prompt: str, cfg: Optional[LLMConfig] = None, client=None, cache=None, traces: Sequence[Any] = ()
+) -> Dict[str, Any]:
+    """
+    One request for a multi-candidate prompt (prompt.build_multi_prompt).
+    Returns the ``results`` mapping {candidate_id: object}; elements are not
+    validated here. Always JSON mode: the strict response format describes a
+    single AssignmentOutput. Raises RuntimeError on provider/parse issues or a
+    response without a ``results`` object.
+    """
+    cfg = cfg or LLMConfig()
+
+    kwargs = _json_mode_kwargs(LLMConfig(model=cfg.model, temperature=cfg.temperature, top_p=cfg.top_p, seed=cfg.seed))
+    messages = _multi_messages(prompt)
+    key, content = _cached(cache, "multi", messages, kwargs, traces)
+    if content is None:
+        client = client or _create_openai_client()
+        try:
+            print("[llm] chat.completions.create(...) called (multi)", file=sys.stderr)
+            resp = client.chat.completions.create(messages=messages, **kwargs, **_timeout_kwargs(cfg))
+            content = resp.choices[0].message.content
+        except Exception as e:
+            raise RuntimeError(f"LLM call failed: {e}") from e
+        fresh = True
+    else:
+        fresh = False
+
+    out = parse_scores(content, cfg)
+    results = out.get("results") if isinstance(out, dict) else None
+    if not isinstance(results, dict):
+        raise RuntimeError(f"LLM multi-candidate response has no results object: {str(content)[:200]}...")
+    if fresh and key is not None:
+        cache.put(key, content)
+    return results
 
 
-def repair_json(bad_json_text: str, schema_errors: List[str], cfg: Optional[LLMConfig] = None, client=None) -> Dict[str, Any]:
+def repair_json(
+    bad_json_text: str, schema_errors: List[str], cfg: Optional[LLMConfig] = None, client=None, cache=None, trace=None
+) -> Dict[str, Any]:
     """One-shot repair request: provide previous JSON and schema errors, ask for corrected JSON-only output."""
     cfg = cfg or LLMConfig()
-    client = client or _create_openai_client()
 
     kwargs = _json_mode_kwargs(cfg)
-    repair_prompt = (
-        "Your previous JSON did not validate against the schema.\n"
-        "Here is your last JSON:\n" + bad_json_text + "\n\n"
-        "Here are validation errors (bulleted):\n- " + "\n- ".join(schema_errors[:10]) + "\n\n"
-        "Return a corrected JSON object ONLY that fixes these issues."
-    )
-    messages = [
-        {"role": "system", "content": "You return one corrected JSON object. No extra text."},
-        {"role": "user", "content": repair_prompt},
-    ]
+    messages = _repair_messages(bad_json_text, schema_errors)
+    key, content = _cached(cache, "repair", messages, kwargs, () if trace is None else (trace,))
+
+    try:
+        if content is None:
+            client = client or _create_openai_client()
+            print("[llm] chat.completions.create(...) called (repair)", file=sys.stderr)
+            resp = client.chat.completions.create(messages=messages, **kwargs, **_timeout_kwargs(cfg))
+            content = resp.choices[0].message.content
+            out = _decode(content, cfg)
+            if key is not None:
+                cache.put(key, content)
+            return out
+        return _decode(content, cfg)
+    except Exception as e:
+        raise RuntimeError(f"Repair attempt failed: {e}") from e
+
+
+async def agenerate_scores(
+    prompt: str,
+    cfg: Optional[LLMConfig] = None,
+    client=None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache=None,
+    trace=None,
+) -> Dict[str, Any]:
+    """Async ``generate_scores`` for an async client (``AsyncOpenAI``-compatible).
+
+    ``semaphore`` (shared across calls) bounds the number of in-flight requests.
+    """
+    cfg = cfg or LLMConfig()
 
+    messages, kwargs = score_request(prompt, cfg)
+    key, content = _cached(cache, "score", messages, kwargs, () if trace is None else (trace,))
+    if content is not None:
+        return parse_scores(content, cfg)
+
+    client = client or _create_async_openai_client()
     try:
-        print("[llm] chat.completions.create(...) called (repair)", file=sys.stderr)
-        resp = client.chat.completions.create(messages=messages, **kwargs)
+        async with semaphore or nullcontext():
+            print("[llm] chat.completions.create(...) called (async)", file=sys.stderr)
+            resp = await client.chat.completions.create(messages=messages, **kwargs, **_timeout_kwargs(cfg))
         content = resp.choices[0].message.content
-        return json.loads(content or "{}")
+    except Exception as e:
+        raise RuntimeError(f"LLM call failed: {e}") from e
+
+    out = parse_scores(content, cfg)
+    if key is not None:
+        cache.put(key, content)
+    return out
+
+
+async def arepair_json(
+    bad_json_text: str,
+    schema_errors: List[str],
+    cfg: Optional[LLMConfig] = None,
+    client=None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache=None,
+    trace=None,
+) -> Dict[str, Any]:
+    """Async ``repair_json``; same prompt and error semantics."""
+    cfg = cfg or LLMConfig()
+
+    kwargs = _json_mode_kwargs(cfg)
+    messages = _repair_messages(bad_json_text, schema_errors)
+    key, content = _cached(cache, "repair", messages, kwargs, () if trace is None else (trace,))
+
+    try:
+        if content is None:
+            client = client or _create_async_openai_client()
+            async with semaphore or nullcontext():
+                print("[llm] chat.completions.create(...) called (async repair)", file=sys.stderr)
+                resp = await client.chat.completions.create(messages=messages, **kwargs, **_timeout_kwargs(cfg))
+            content = resp.choices[0].message.content
+            out = _decode(content, cfg)
+            if key is not None:
+                cache.put(key, content)
+            return out
+        return _decode(content, cfg)
     except Exception as e:
         raise RuntimeError(f"Repair attempt failed: {e}") from e
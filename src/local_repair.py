@@ -0,0 +1,158 @@
+"""
+Deterministic, schema-guided repair of near-miss LLM output (no LLM call).
+Walks schema.get_schema() alongside the payload and fixes mechanical problems:
+- integers given as floats or numeric strings ("85", "85.0", "85%") are
+  rounded; values are clamped into [minimum, maximum]
+- numbers where a string is expected become strings; "true"/"false" (and 0/1)
+  where a boolean is expected become booleans
+- arrays longer than maxItems are truncated; a lone string where an array of
+  strings is expected is wrapped; null items are dropped
+- unknown keys are dropped (additionalProperties: false); optional keys set to
+  null are dropped
+- missing required arrays/objects are filled with empty structure
+
+It never invents scalars: a missing score or summary stays missing, the result
+stays invalid and the caller falls through to the LLM repair round trip.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import math
+import re
+
+from schema import get_schema
+
+__all__ = ["repair_locally"]
+
+_NUMBER = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*%?\s*$")
+_MISSING = object()
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, bool):
+        return _MISSING  # ambiguous; leave it to the validator
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(round(value)) if math.isfinite(value) else _MISSING
+    if isinstance(value, str):
+        m = _NUMBER.match(value)
+        if m:
+            return int(round(float(m.group(1))))
+    return _MISSING
+
+
+def _to_bool(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return _MISSING
+
+
+def _empty(node: Dict[str, Any]) -> Any:
+    # Structural default for a missing required value; _MISSING for scalars
+    kind = node.get("type")
+    if kind == "array":
+        return []
+    if kind == "object":
+        return {}
+    return _MISSING
+
+
+class _Repairer:
+    def __init__(self) -> None:
+        self.fixes: List[str] = []
+
+    def fix(self, path: str, what: str) -> None:
+        self.fixes.append(f"{path or '$'}: {what}")
+
+    def walk(self, node: Dict[str, Any], value: Any, path: str) -> Any:
+        kind = node.get("type")
+        if kind == "object":
+            return self._object(node, value, path)
+        if kind == "array":
+            return self._array(node, value, path)
+        if kind == "integer":
+            out = _to_int(value)
+            if out is _MISSING:
+                return value
+            if out != value or type(out) is not type(value):
+                self.fix(path, f"coerced {value!r} to integer")
+            lo, hi = node.get("minimum"), node.get("maximum")
+            clamped = min(max(out, lo if lo is not None else out), hi if hi is not None else out)
+            if clamped != out:
+                self.fix(path, f"clamped {out} to {clamped}")
+            return clamped
+        if kind == "boolean":
+            out = _to_bool(value)
+            if out is _MISSING:
+                return value
+            if out is not value:
+                self.fix(path, f"coerced {value!r} to boolean")
+            return out
+        if kind == "string":
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.fix(path, "coerced number to string")
+                return str(value)
+            return value
+        return value
+
+    def _object(self, node: Dict[str, Any], value: Any, path: str) -> Any:
+        if not isinstance(value, dict):
+            return value
+        props: Dict[str, Any] = node.get("properties", {})
+        required = node.get("required", [])
+        out: Dict[str, Any] = {}
+        for key, item in value.items():
+            sub = f"{path}.{key}" if path else key
+            if key not in props:
+                if node.get("additionalProperties", True) is False:
+                    self.fix(sub, "dropped unknown key")
+                    continue
+                out[key] = item
+                continue
+            if item is None and key not in required:
+                self.fix(sub, "dropped null optional key")
+                continue
+            out[key] = self.walk(props[key], item, sub)
+        for key in required:
+            if key not in out and key in props:
+                filler = _empty(props[key])
+                if filler is not _MISSING:
+                    sub = f"{path}.{key}" if path else key
+                    self.fix(sub, "filled missing required structure")
+                    out[key] = self.walk(props[key], filler, sub)
+        return out
+
+    def _array(self, node: Dict[str, Any], value: Any, path: str) -> Any:
+        items = node.get("items", {})
+        if isinstance(value, str) and items.get("type") == "string":
+            self.fix(path, "wrapped string in array")
+            value = [value]
+        if not isinstance(value, list):
+            return value
+        out = []
+        for i, item in enumerate(value):
+            if item is None:
+                self.fix(f"{path}[{i}]", "dropped null item")
+                continue
+            out.append(self.walk(items, item, f"{path}[{i}]"))
+        limit = node.get("maxItems")
+        if limit is not None and len(out) > limit:
+            self.fix(path, f"truncated {len(out)} items to {limit}")
+            out = out[:limit]
+        return out
+
+
+def repair_locally(payload: Any, schema: Optional[Dict[str, Any]] = None) -> Tuple[Any, List[str]]:
+    """Return (repaired copy of ``payload``, list of applied fixes).
+
+    The input is never modified. The result is not guaranteed valid; run
+    validate_json on it.
+    """
+    r = _Repairer()
+    out = r.walk(schema or get_schema(), copy.deepcopy(payload), "")
+    return out, r.fixes
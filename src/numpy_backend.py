@@ -0,0 +1,98 @@
+"""
+In-process exact-search retrieval backend (NumPy).
+
+A resume has 10–40 lines, so an exact cosine top-k over a tiny matrix beats a
+Chroma client + sqlite collection + HNSW index by a wide margin. NumpyCollection
+mirrors the slice of the Chroma collection API the pipeline uses
+(``name``, ``count()``, ``query(...)``), so retrieve_for_requirements works
+unchanged on either backend.
+
+- Documents are embedded once into an L2-normalized float32 matrix.
+- All queries are embedded together and scored with one matmul.
+- np.partition finds the k-th distance; survivors are ordered by
+  (distance, line index), so boundary ties resolve deterministically.
+- Distances are cosine distances (1 - cos), the same metric as the Chroma
+  collections built with {"hnsw:space": "cosine"}.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+__all__ = ["NumpyCollection"]
+
+
+def _normalized(vectors: Any) -> np.ndarray:
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0  # leave all-zero rows as zeros
+    return mat / norms
+
+
+class NumpyCollection:
+    def __init__(
+        self,
+        name: str,
+        documents: Sequence[str],
+        ids: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+        embedding_function,
+    ) -> None:
+        self.name = name
+        self._documents = list(documents)
+        self._ids = list(ids)
+        self._metadatas = list(metadatas)
+        self._embed = embedding_function
+        if self._documents:
+            self._matrix = _normalized(embedding_function(self._documents))
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def count(self) -> int:
+        return len(self._documents)
+
+    def _embed_queries(self, texts: List[str]) -> np.ndarray:
+        embed_query = getattr(self._embed, "embed_query", None)
+        return _normalized(embed_query(texts) if embed_query else self._embed(texts))
+
+    def query(
+        self,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 10,
+        include: Sequence[str] = ("documents", "distances", "metadatas"),
+        query_embeddings: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        """Exact cosine top-k for every query at once; Chroma-shaped result dict."""
+        if query_embeddings is not None:
+            q = _normalized(query_embeddings)
+        else:
+            q = self._embed_queries(list(query_texts or []))
+        nq, n = q.shape[0], len(self._documents)
+        k = max(0, min(int(n_results), n))
+
+        if k == 0:
+            rows: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(nq)]
+            dist = np.zeros((nq, 0), dtype=np.float32)
+        else:
+            dist = 1.0 - q @ self._matrix.T  # (nq, n) cosine distances
+            if k < n:
+                kth = np.partition(dist, k - 1, axis=1)[:, k - 1]
+            else:
+                kth = dist.max(axis=1)
+            rows = []
+            for r in range(nq):
+                # everything up to the k-th distance (ties at the boundary included),
+                # ordered by (distance, line index), then cut to k
+                c = np.flatnonzero(dist[r] <= kth[r])
+                rows.append(c[np.lexsort((c, dist[r, c]))][:k])
+
+        out: Dict[str, Any] = {"ids": [[self._ids[i] for i in row] for row in rows]}
+        if "documents" in include:
+            out["documents"] = [[self._documents[i] for i in row] for row in rows]
+        if "distances" in include:
+            out["distances"] = [[float(dist[r, i]) for i in row] for r, row in enumerate(rows)]
+        if "metadatas" in include:
+            out["metadatas"] = [[self._metadatas[i] for i in row] for row in rows]
+        return out
@@ -3,14 +3,18 @@ Minimal, deterministic resume parser (v0).
 - Extract required skills by exact normalized match from JD requirements of the form
   "Proficiency in X".
 - Compute experience years from date ranges like "YYYY-MM to YYYY-MM".
-- Collect evidence lines that mention matched skills.
+- Collect evidence lines that mention matched skills (one Aho-Corasick pass
+  per line, see skill_matcher.py).
 
 Favor simplicity and determinism.
 """
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import re
 
+from compiled_jd import CompiledJD
+from skill_matcher import compile_skill_matcher
+
 __all__ = ["extract_required_skills_from_jd", "parse_resume"]
 
 def _norm(s: str) -> str:
@@ -51,30 +55,36 @@ def _collect_experience_months(text: str) -> int:
         total += _months_between(s, e)
     return total
 
-def parse_resume(text: str, jd_requirements: List[str]) -> Dict[str, Any]:
-    """Parse resume text against JD requirements.
+def parse_resume(text: str, jd_requirements: Union[List[str], CompiledJD]) -> Dict[str, Any]:
+    """Parse resume text against JD requirements (or a CompiledJD, which
+    carries the already-extracted skills and compiled matcher).
 
     Returns dict with keys:
       - skills: sorted list of matched skills (strings)
       - experience_years: float (months / 12, rounded to 1 decimal)
       - evidence_lines: list[str] of lines that mention matched skills
     """
-    required_skills = extract_required_skills_from_jd(jd_requirements)
-    # Build normalized set for matching
-    norm_targets = { _norm(s): s for s in required_skills }
+    if isinstance(jd_requirements, CompiledJD):
+        norm_targets = jd_requirements.skill_by_norm
+        targets = jd_requirements.skill_targets
+        matcher = jd_requirements.skill_matcher
+    else:
+        required_skills = extract_required_skills_from_jd(jd_requirements)
+        # Build normalized set for matching
+        norm_targets = { _norm(s): s for s in required_skills }
+        targets = tuple(norm_targets)  # sorted by normalized name
+        matcher = compile_skill_matcher(targets)
 
     # Evidence lines: any line that includes a required skill token (case-insensitive)
     lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
     evidence_lines: List[str] = []
     present_norms = set()
     for ln in lines:
-        ln_norm = _norm(ln)
-        for t_norm, orig in norm_targets.items():
-            # word-boundary-ish match (simple contains to keep it minimal)
-            if t_norm in ln_norm:
-                evidence_lines.append(ln)
-                present_norms.add(t_norm)
-                break  # avoid duplicating same line for multiple skills
+        # simple contains; credit the first skill in sorted order, one per line
+        hit = matcher.first(_norm(ln))
+        if hit is not None:
+            evidence_lines.append(ln)
+            present_norms.add(targets[hit])
 
     matched_skills = sorted([norm_targets[n] for n in present_norms], key=_norm)
 
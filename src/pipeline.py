@@ -1,97 +1,763 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, TYPE_CHECKING
 import json
 import sys
-from uuid import uuid4
+import threading
+import time
+from contextlib import ExitStack
 
-from parse_resume import parse_resume, extract_required_skills_from_jd
-from retrieve import build_resume_collection, retrieve_for_requirements
-from prompt import build_prompt
-from schema import get_schema, validate_json, assert_valid
+from compiled_jd import CompiledJD, compile_jd
+from parse_resume import parse_resume
+from retrieve import resume_collection, retrieve_for_requirements
+from prompt import build_prompt, candidate_block, multi_prompt_parts
+from schema import get_schema, validate_json
 from scorer import score_rule_based
-from llm_evaluator import LLMConfig, generate_scores, repair_json
+from llm_evaluator import (
+    LLMConfig, generate_scores, generate_multi_scores, repair_json, agenerate_scores, arepair_json, parse_scores,
+)
+from local_repair import repair_locally
+from tokens import estimate_tokens, fit_to_budget, section_tokens
+from tracing import NULL_TRACE
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import Future
 
 
 class PipelineConfig:
-    def __init__(self, *, k: int = 3, model: str = "gpt-4o-mini", seed: Optional[int] = 42):
+    def __init__(
+        self,
+        *,
+        k: int = 3,
+        model: str = "gpt-4o-mini",
+        seed: Optional[int] = 42,
+        backend: str = "chroma",
+        deadline_s: Optional[float] = None,
+        structured_output: bool = False,
+        evidence_table: bool = False,
+        token_budget: Optional[int] = None,
+        candidates_per_request: int = 1,
+        request_token_budget: int = 8000,
+    ):
         self.k = k
         self.model = model
         self.seed = seed
+        self.backend = backend  # retrieval backend: "chroma" or "numpy" (see retrieve.BACKENDS)
+        self.deadline_s = deadline_s  # latency SLA for the LLM path (None = wait for it)
+        self.structured_output = structured_output  # schema as strict response format, not prompt text
+        self.evidence_table = evidence_table  # prompt lists each resume line once, referenced by id
+        self.token_budget = token_budget  # max estimated prompt tokens; inputs are trimmed to fit
+        # run_pipeline_multi: up to N candidates per LLM request, as many as fit the request budget
+        self.candidates_per_request = candidates_per_request
+        self.request_token_budget = request_token_budget
 
 
-def run_pipeline(
-    jd: Dict[str, Any],
+def _collection_lines(parsed: Dict[str, Any], resume_text: str) -> List[str]:
+    # Use parsed evidence lines; fall back to raw lines for sparse resumes
+    lines = parsed.get("evidence_lines", [])
+    if len(lines) < 2:
+        lines = [ln.strip() for ln in resume_text.splitlines() if ln.strip()]
+    return lines
+
+
+def rules_need_retrieval(debug: bool = False) -> bool:
+    """True when the rules path must run the vector store (scorer reads hits, or debug wants them shown)."""
+    return debug or getattr(score_rule_based, "uses_retrieval", True)
+
+
+def run_rules(
+    jd: Union[Dict[str, Any], CompiledJD],
     resume_text: str,
     *,
     cfg: Optional[PipelineConfig] = None,
-    client=None,
+    vs_client=None,
+    embedding_function=None,
+    fast: Optional[bool] = None,
+    trace=None,
     debug: bool = False,
-    print_prompt: bool = False,
 ) -> Dict[str, Any]:
+    """Rule-based path: parse → collection → retrieve → score_rule_based (no LLM).
+
+    ``score_rule_based`` never reads its retrieval hits, so by default (``fast=None``)
+    the embedding/indexing/query stages are skipped and chromadb is never
+    imported; the result is identical. ``fast=False`` forces the full path.
+    ``vs_client``/``embedding_function`` let long-lived callers (batch workers)
+    reuse one Chroma client and embedder across candidates.
+    ``trace`` (a ``tracing.Trace``) receives per-stage timings and the outcome.
+    Pass a ``CompiledJD`` to skip re-deriving the JD for every candidate.
+    """
     cfg = cfg or PipelineConfig()
+    trace = trace or NULL_TRACE
+    cjd = compile_jd(jd)
+    with trace.span("parse"):
+        parsed = parse_resume(resume_text, cjd)
+    if fast is None:
+        fast = not rules_need_retrieval(debug)
+    hits: Dict[str, Any] = {}
+    if not fast:
+        lines = _collection_lines(parsed, resume_text)
+        with ExitStack() as scope:  # the collection goes back to its pool after retrieval
+            with trace.span("collection"):
+                coll = scope.enter_context(resume_collection(
+                    lines,
+                    backend=cfg.backend,
+                    client=vs_client,
+                    embedding_function=embedding_function,
+                ))
+            trace.set("vectors", len(lines))
+            with trace.span("retrieve"):
+                hits = retrieve_for_requirements(coll, cjd, k=cfg.k, debug=debug, embedding_function=embedding_function)
+    with trace.span("score"):
+        out = score_rule_based(cjd, parsed, hits)  # score_rule_based validates its own output
+    trace.finish("rules_fast" if fast else "rules")
+    return out
+
 
+def _gather(
+    cjd: CompiledJD, resume_text: str, cfg: PipelineConfig, *, vs_client, embedding_function, trace, debug: bool
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Steps 1–2: parse, then collection + retrieve."""
     # 1) Parse
-    parsed = parse_resume(resume_text, jd.get("requirements", []))
+    with trace.span("parse"):
+        parsed = parse_resume(resume_text, cjd)
 
     # 2) Build collection & retrieve (use parsed evidence lines; fallback to raw lines)
-    all_lines = parsed.get("evidence_lines", [])
-    if len(all_lines) < 2:
-        all_lines = [ln.strip() for ln in resume_text.splitlines() if ln.strip()]
+    all_lines = _collection_lines(parsed, resume_text)
+
+    with ExitStack() as scope:  # the collection goes back to its pool after retrieval
+        with trace.span("collection"):
+            coll = scope.enter_context(resume_collection(
+                all_lines,
+                backend=cfg.backend,
+                client=vs_client,
+                embedding_function=embedding_function,
+            ))
+        trace.set("vectors", len(all_lines))
+        if debug:
+            try:
+                nvec = coll.count()
+            except Exception:
+                nvec = len(all_lines)
+            print(f"[pipeline] collection built: name={coll.name!r} vectors={nvec}", file=sys.stderr)
+
+        with trace.span("retrieve"):
+            hits = retrieve_for_requirements(coll, cjd, k=cfg.k, debug=debug, embedding_function=embedding_function)
+    return parsed, hits
 
-    unique_name = f"resume_v0_{uuid4().hex[:8]}"
-    client_vs, coll = build_resume_collection(all_lines, collection_name=unique_name)
-    if debug:
-        try:
-            nvec = coll.count()
-        except Exception:
-            nvec = len(all_lines)
-        print(f"[pipeline] collection built: name={coll.name!r} vectors={nvec}", file=sys.stderr)
 
-    # Requirements to query = keep the original phrasing that starts with "Proficiency in "
-    raw_reqs = [r for r in jd.get("requirements", []) if r.lower().startswith("proficiency in ")]
-    hits = retrieve_for_requirements(coll, raw_reqs, k=cfg.k, debug=debug)
+def _prepare(
+    cjd: CompiledJD,
+    resume_text: str,
+    cfg: PipelineConfig,
+    *,
+    vs_client,
+    embedding_function,
+    trace,
+    debug: bool,
+    print_prompt: bool,
+) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+    """Steps 1–3 (parse, collection + retrieve, prompt); shared by the sync and async paths."""
+    parsed, hits = _gather(cjd, resume_text, cfg, vs_client=vs_client, embedding_function=embedding_function,
+                           trace=trace, debug=debug)
+    prompt = _prompt_stage(cjd, parsed, hits, cfg, trace=trace, debug=debug, print_prompt=print_prompt)
+    return parsed, hits, prompt
+
 
+def _prompt_stage(
+    cjd: CompiledJD, parsed: Dict[str, Any], hits: Dict[str, Any], cfg: PipelineConfig, *, trace, debug: bool,
+    print_prompt: bool,
+) -> str:
     # 3) Prompt
-    prompt = build_prompt(jd, parsed, hits, get_schema())
+    def build(p: Dict[str, Any], h: Dict[str, Any]) -> str:
+        return build_prompt(
+            cjd, p, h, get_schema(), inline_schema=not cfg.structured_output, evidence_table=cfg.evidence_table
+        )
+
+    with trace.span("prompt"):
+        if cfg.token_budget is not None:
+            # trimming only shortens the prompt; the fallback scorer still sees every hit
+            prompt, budget = fit_to_budget(build, parsed, hits, cfg.token_budget)
+            for name in ("trimmed_hits", "trimmed_lines", "over_budget"):
+                trace.set(name, budget[name])
+        else:
+            prompt = build(parsed, hits)
+    trace.set("prompt_chars", len(prompt))
+    if trace.enabled or debug:
+        sections = section_tokens(prompt)
+        trace.set("prompt_tokens", sum(sections.values()))
+        trace.set("prompt_sections", sections)
     if print_prompt or debug:
         print(f"[pipeline] prompt length: {len(prompt)} chars", file=sys.stderr)
+        if debug:
+            print(f"[pipeline] prompt tokens (est.): {sum(sections.values())} {sections}", file=sys.stderr)
         if print_prompt:
             print("----- BEGIN PROMPT -----", file=sys.stderr)
             print(prompt, file=sys.stderr)
             print("----- END PROMPT -----", file=sys.stderr)
+    return prompt
 
-    # 4) LLM evaluate → JSON
-    llm_cfg = LLMConfig(model=cfg.model, seed=cfg.seed)
-    try:
-        if debug:
-            print(f"[pipeline] LLM call: model={cfg.model} seed={cfg.seed}", file=sys.stderr)
-        result = generate_scores(prompt, cfg=llm_cfg, client=client)
+
+def _fallback(cjd: CompiledJD, parsed: Dict[str, Any], hits: Dict[str, Any], trace, outcome: str) -> Dict[str, Any]:
+    # 6) Fallback to rule-based (score_rule_based validates its own output)
+    trace.set("fallback", True)
+    with trace.span("fallback"):
+        rb = score_rule_based(cjd, parsed, hits)
+    trace.finish(outcome)
+    return rb
+
+
+def _within(llm_cfg: LLMConfig, deadline: Optional[float]) -> LLMConfig:
+    # Bound each request by the time left before the deadline (None = no deadline)
+    if deadline is None:
+        return llm_cfg
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline passed before the LLM request was sent")
+    return LLMConfig(
+        model=llm_cfg.model, temperature=llm_cfg.temperature, top_p=llm_cfg.top_p, seed=llm_cfg.seed,
+        timeout_s=remaining, structured_output=llm_cfg.structured_output,
+    )
+
+
+def _count_output(trace, name: str, obj: Any) -> None:
+    # Estimated output tokens of an LLM response (tracing only)
+    if trace.enabled:
+        trace.set(name, estimate_tokens(json.dumps(obj)))
+
+
+def _count_repair_input(trace, bad_json: str, errs) -> None:
+    if trace.enabled:
+        trace.set("repair_input_tokens", estimate_tokens(bad_json) + sum(estimate_tokens(e) for e in errs[:10]))
+
+
+def _local_repair(result: Any, errs, trace, debug: bool) -> Tuple[Any, bool, Any]:
+    """Schema-guided local repair before any LLM repair round trip.
+
+    Returns (payload, valid, errors); when still invalid, payload is the locally
+    improved object and errors its remaining validation errors.
+    """
+    with trace.span("local_repair"):
+        fixed, fixes = repair_locally(result)
+        ok, errs2 = validate_json(fixed) if fixes else (False, errs)
+    trace.set("local_fixes", len(fixes))
+    if debug:
+        state = "valid" if ok else f"still invalid (errors={len(errs2)})"
+        print(f"[pipeline] local repair applied {len(fixes)} fix(es); {state}", file=sys.stderr)
+    return (fixed if fixes else result), ok, errs2
+
+
+def _llm_attempt(
+    prompt: str, llm_cfg: LLMConfig, *, client, llm_cache, trace, debug: bool, deadline: Optional[float] = None
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Steps 4–5: LLM call → validate → local repair → one LLM repair attempt.
+
+    Returns (result, outcome); result is None when the output is still invalid
+    after the LLM repair. Provider/parse errors propagate to the caller.
+    """
+    with trace.span("llm"):
+        result = generate_scores(
+            prompt, cfg=_within(llm_cfg, deadline), client=client, cache=llm_cache, trace=trace
+        )
+    _count_output(trace, "completion_tokens", result)
+    return _validate_or_repair(
+        result, llm_cfg, client=client, llm_cache=llm_cache, trace=trace, debug=debug, deadline=deadline
+    )
+
+
+# Step 5 is split around its one I/O call (the LLM repair request) so the sync
+# and async paths share every validation, repair and outcome rule.
+
+def _check_output(result: Any, trace, debug: bool) -> Tuple[Any, Optional[str], List[str]]:
+    """Validate → local repair. Returns (payload, outcome, errors): outcome is
+    ``llm`` / ``llm_local_repaired`` when payload is valid, None when it still
+    needs the LLM repair (payload is then the locally improved object)."""
+    with trace.span("validate"):
         ok, errs = validate_json(result)
-        if not ok:
-            if debug:
-                print(f"[pipeline] schema invalid; attempting repair (errors={len(errs)})", file=sys.stderr)
-            # 5) One repair attempt
-            repaired = repair_json(json.dumps(result), errs, cfg=llm_cfg, client=client)
-            ok2, errs2 = validate_json(repaired)
-            if ok2:
-                if debug:
-                    print("[pipeline] repair succeeded; returning LLM(repaired) result", file=sys.stderr)
-                assert_valid(repaired)
-                return repaired
-            if debug:
-                print("[pipeline] repair failed; falling back to rule-based scorer", file=sys.stderr)
-            # 6) Fallback to rule-based
-            rb = score_rule_based(jd, parsed, hits)
-            assert_valid(rb)
-            return rb
+    if ok:
         if debug:
             print("[pipeline] LLM result valid; returning LLM output", file=sys.stderr)
-        assert_valid(result)
+        return result, "llm", []
+    trace.set("schema_errors", len(errs))
+    result, ok, errs = _local_repair(result, errs, trace, debug)
+    if ok:
+        return result, "llm_local_repaired", []
+    return result, None, errs
+
+
+def _repair_input(payload: Any, errs: List[str], trace, debug: bool) -> str:
+    # 5) One repair attempt: the JSON text sent back to the LLM
+    if debug:
+        print(f"[pipeline] schema invalid; attempting repair (errors={len(errs)})", file=sys.stderr)
+    trace.set("repair_attempted", True)
+    bad = json.dumps(payload)
+    _count_repair_input(trace, bad, errs)
+    return bad
+
+
+def _check_repaired(repaired: Any, trace, debug: bool) -> Tuple[Optional[Dict[str, Any]], str]:
+    _count_output(trace, "repair_output_tokens", repaired)
+    with trace.span("validate"):
+        ok, _ = validate_json(repaired)
+    if ok:
+        if debug:
+            print("[pipeline] repair succeeded; returning LLM(repaired) result", file=sys.stderr)
+        return repaired, "llm_repaired"
+    if debug:
+        print("[pipeline] repair failed; falling back to rule-based scorer", file=sys.stderr)
+    return None, "fallback_invalid"
+
+
+def _validate_or_repair(
+    result: Any,
+    llm_cfg: LLMConfig,
+    *,
+    client,
+    llm_cache,
+    trace,
+    debug: bool,
+    deadline: Optional[float] = None,
+    repair: bool = True,
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Step 5 for one LLM output (also each element of a multi-candidate answer).
+    ``repair=False`` skips the LLM repair call (outcome fallback_invalid)."""
+    payload, outcome, errs = _check_output(result, trace, debug)
+    if outcome is not None:
+        return payload, outcome
+    if not repair:
+        return None, "fallback_invalid"
+    bad = _repair_input(payload, errs, trace, debug)
+    with trace.span("repair"):
+        repaired = repair_json(
+            bad, errs, cfg=_within(llm_cfg, deadline), client=client, cache=llm_cache, trace=trace
+        )
+    return _check_repaired(repaired, trace, debug)
+
+
+async def _allm_attempt(
+    prompt: str, llm_cfg: LLMConfig, *, client, semaphore, llm_cache, trace, debug: bool, deadline: Optional[float] = None
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Async ``_llm_attempt``."""
+    with trace.span("llm"):
+        result = await agenerate_scores(
+            prompt, cfg=_within(llm_cfg, deadline), client=client, semaphore=semaphore, cache=llm_cache, trace=trace
+        )
+    _count_output(trace, "completion_tokens", result)
+    payload, outcome, errs = _check_output(result, trace, debug)
+    if outcome is not None:
+        return payload, outcome
+    bad = _repair_input(payload, errs, trace, debug)
+    with trace.span("repair"):
+        repaired = await arepair_json(
+            bad, errs, cfg=_within(llm_cfg, deadline), client=client, semaphore=semaphore, cache=llm_cache,
+            trace=trace,
+        )
+    return _check_repaired(repaired, trace, debug)
+
+
+# ---- Latency-SLA (hedged) mode ------------------------------------------------
+# With cfg.deadline_s set, the rule-based result is computed while the LLM flow
+# runs; whichever valid result exists at the deadline is returned. Which path
+# won is recorded on the trace (hedge_winner, outcome "deadline_rules").
+
+def _in_daemon_thread(fn) -> Future:
+    # Daemon thread, not an executor: an abandoned request must never delay exit
+    from concurrent.futures import Future
+
+    fut: Future = Future()
+
+    def run() -> None:
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+    return fut
+
+
+def _settle_hedge(
+    rules: Dict[str, Any],
+    trace,
+    llm_trace,
+    cfg: PipelineConfig,
+    *,
+    outcome: str,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[BaseException] = None,
+    debug: bool = False,
+) -> Dict[str, Any]:
+    trace.absorb(llm_trace)
+    trace.set("deadline_s", cfg.deadline_s)
+    if result is not None:
+        trace.set("hedge_winner", "llm")
+        trace.finish(outcome)
         return result
+    trace.set("hedge_winner", "rules")
+    trace.set("fallback", True)
+    if outcome == "deadline_rules":
+        trace.set("llm_abandoned", True)
+        if debug:
+            print(f"[pipeline] no valid LLM result within {cfg.deadline_s}s; returning rule-based result", file=sys.stderr)
+    if error is not None:
+        if debug:
+            print(f"[pipeline] exception during LLM flow: {error}; returning rule-based result", file=sys.stderr)
+        trace.set("error", f"{type(error).__name__}: {error}")
+    trace.finish(outcome)
+    return rules
+
+
+def _run_hedged(cjd, parsed, hits, prompt, cfg, llm_cfg, *, client, llm_cache, trace, debug) -> Dict[str, Any]:
+    deadline = time.monotonic() + cfg.deadline_s
+    llm_trace = trace.child()  # the LLM thread records into its own buffer
+    fut = _in_daemon_thread(lambda: _llm_attempt(
+        prompt, llm_cfg, client=client, llm_cache=llm_cache, trace=llm_trace, debug=debug, deadline=deadline
+    ))
+    with trace.span("rules"):
+        rules = score_rule_based(cjd, parsed, hits)
+    try:
+        result, outcome = fut.result(timeout=max(0.0, deadline - time.monotonic()))
+    except TimeoutError:
+        # A sync request can't be interrupted; it is abandoned and ends at its own
+        # HTTP timeout (the time that was left before the deadline).
+        return _settle_hedge(rules, trace, llm_trace, cfg, outcome="deadline_rules", debug=debug)
+    except Exception as e:
+        return _settle_hedge(rules, trace, llm_trace, cfg, outcome="fallback_error", error=e, debug=debug)
+    return _settle_hedge(rules, trace, llm_trace, cfg, outcome=outcome, result=result, debug=debug)
+
+
+async def _arun_hedged(cjd, parsed, hits, prompt, cfg, llm_cfg, *, client, semaphore, llm_cache, trace, debug) -> Dict[str, Any]:
+    import asyncio
+
+    deadline = time.monotonic() + cfg.deadline_s
+    llm_trace = trace.child()
+    task = asyncio.ensure_future(_allm_attempt(
+        prompt, llm_cfg, client=client, semaphore=semaphore, llm_cache=llm_cache, trace=llm_trace, debug=debug,
+        deadline=deadline,
+    ))
+    await asyncio.sleep(0)  # let the request go out before scoring rules
+    with trace.span("rules"):
+        rules = score_rule_based(cjd, parsed, hits)
+    try:
+        result, outcome = await asyncio.wait_for(task, timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        # wait_for has cancelled the in-flight request
+        return _settle_hedge(rules, trace, llm_trace, cfg, outcome="deadline_rules", debug=debug)
+    except Exception as e:
+        return _settle_hedge(rules, trace, llm_trace, cfg, outcome="fallback_error", error=e, debug=debug)
+    return _settle_hedge(rules, trace, llm_trace, cfg, outcome=outcome, result=result, debug=debug)
+
+
+def run_pipeline(
+    jd: Union[Dict[str, Any], CompiledJD],
+    resume_text: str,
+    *,
+    cfg: Optional[PipelineConfig] = None,
+    client=None,
+    vs_client=None,
+    embedding_function=None,
+    llm_cache=None,
+    trace=None,
+    debug: bool = False,
+    print_prompt: bool = False,
+) -> Dict[str, Any]:
+    """Parse → retrieve → prompt → LLM → validate/repair → rule-based fallback.
+
+    ``trace`` (a ``tracing.Trace``) receives per-stage timings, counters and the
+    outcome (``llm``, ``llm_local_repaired``, ``llm_repaired``, ``fallback_invalid``,
+    ``fallback_error``, ``deadline_rules``).
+    ``jd`` may be a ``CompiledJD`` (compile once, reuse across candidates).
+    With ``cfg.deadline_s`` the rule-based result is computed alongside the LLM
+    flow and returned if no valid LLM result exists by the deadline.
+    """
+    cfg = cfg or PipelineConfig()
+    trace = trace or NULL_TRACE
+    cjd = compile_jd(jd)
+    parsed, hits, prompt = _prepare(
+        cjd, resume_text, cfg,
+        vs_client=vs_client, embedding_function=embedding_function, trace=trace,
+        debug=debug, print_prompt=print_prompt,
+    )
+
+    # 4) LLM evaluate → JSON
+    llm_cfg = _llm_start(cfg, trace, debug, "LLM call")
+    if cfg.deadline_s is not None:
+        return _run_hedged(
+            cjd, parsed, hits, prompt, cfg, llm_cfg, client=client, llm_cache=llm_cache, trace=trace, debug=debug
+        )
+    return _settle(
+        cjd, parsed, hits, trace, debug,
+        lambda: _llm_attempt(prompt, llm_cfg, client=client, llm_cache=llm_cache, trace=trace, debug=debug),
+    )
+
+
+def _llm_start(cfg: PipelineConfig, trace, debug: bool, label: str) -> LLMConfig:
+    trace.set("repair_attempted", False)
+    trace.set("fallback", False)
+    if debug:
+        print(f"[pipeline] {label}: model={cfg.model} seed={cfg.seed} deadline={cfg.deadline_s}", file=sys.stderr)
+    return LLMConfig(model=cfg.model, seed=cfg.seed, structured_output=cfg.structured_output)
+
+
+def _settle(cjd: CompiledJD, parsed, hits, trace, debug: bool, attempt) -> Dict[str, Any]:
+    # Run the LLM flow ``attempt() -> (result | None, outcome)``; fall back to rules on error/invalid
+    try:
+        result, outcome = attempt()
     except Exception as e:
+        return _settle_error(cjd, parsed, hits, trace, debug, e)
+    return _settle_result(cjd, parsed, hits, trace, result, outcome)
+
+
+def _settle_error(cjd: CompiledJD, parsed, hits, trace, debug: bool, error: Exception) -> Dict[str, Any]:
+    # On any error, fallback to rule-based
+    if debug:
+        print(f"[pipeline] exception during LLM flow: {error}; falling back to rule-based scorer", file=sys.stderr)
+    trace.set("error", f"{type(error).__name__}: {error}")
+    return _fallback(cjd, parsed, hits, trace, "fallback_error")
+
+
+def _settle_result(cjd: CompiledJD, parsed, hits, trace, result: Optional[Dict[str, Any]], outcome: str) -> Dict[str, Any]:
+    if result is None:
+        return _fallback(cjd, parsed, hits, trace, outcome)
+    trace.finish(outcome)
+    return result
+
+
+async def run_pipeline_async(
+    jd: Union[Dict[str, Any], CompiledJD],
+    resume_text: str,
+    *,
+    cfg: Optional[PipelineConfig] = None,
+    client=None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    vs_client=None,
+    embedding_function=None,
+    llm_cache=None,
+    trace=None,
+    debug: bool = False,
+    print_prompt: bool = False,
+) -> Dict[str, Any]:
+    """Async ``run_pipeline``: identical parse/retrieve/prompt and repair/fallback
+    semantics, but the LLM calls await an async client so many candidates can
+    overlap their network waits. ``semaphore`` bounds in-flight LLM requests.
+    ``llm_cache`` (an ``LLMCache``) answers repeated requests without API calls.
+    ``trace`` is filled exactly as in ``run_pipeline``. With ``cfg.deadline_s``
+    the in-flight LLM request is cancelled at the deadline.
+    """
+    cfg = cfg or PipelineConfig()
+    trace = trace or NULL_TRACE
+    cjd = compile_jd(jd)
+    parsed, hits, prompt = _prepare(
+        cjd, resume_text, cfg,
+        vs_client=vs_client, embedding_function=embedding_function, trace=trace,
+        debug=debug, print_prompt=print_prompt,
+    )
+
+    llm_cfg = _llm_start(cfg, trace, debug, "async LLM call")
+    if cfg.deadline_s is not None:
+        return await _arun_hedged(
+            cjd, parsed, hits, prompt, cfg, llm_cfg,
+            client=client, semaphore=semaphore, llm_cache=llm_cache, trace=trace, debug=debug,
+        )
+    try:
+        result, outcome = await _allm_attempt(
+            prompt, llm_cfg, client=client, semaphore=semaphore, llm_cache=llm_cache, trace=trace, debug=debug
+        )
+    except Exception as e:
+        return _settle_error(cjd, parsed, hits, trace, debug, e)
+    return _settle_result(cjd, parsed, hits, trace, result, outcome)
+
+
+# ---- LLM responses obtained elsewhere -----------------------------------------
+# For prompts sent outside the pipeline (batch_api: the provider's batch
+# endpoint): steps 1–3 up to the prompt, then steps 5–6 on the returned content.
+
+def prepare_request(
+    jd: Union[Dict[str, Any], CompiledJD],
+    resume_text: str,
+    *,
+    cfg: Optional[PipelineConfig] = None,
+    vs_client=None,
+    embedding_function=None,
+    debug: bool = False,
+) -> Tuple[Dict[str, Any], Dict[str, Any], str]:
+    """Parse → retrieve → prompt without the LLM call; returns (parsed, hits, prompt)."""
+    return _prepare(
+        compile_jd(jd), resume_text, cfg or PipelineConfig(),
+        vs_client=vs_client, embedding_function=embedding_function, trace=NULL_TRACE, debug=debug, print_prompt=False,
+    )
+
+
+def score_response(
+    jd: Union[Dict[str, Any], CompiledJD],
+    parsed: Dict[str, Any],
+    hits: Dict[str, Any],
+    content: Optional[str],
+    llm_cfg: LLMConfig,
+    *,
+    client=None,
+    repair: bool = True,
+    llm_cache=None,
+    cache_key: Optional[str] = None,
+    trace=None,
+    debug: bool = False,
+) -> Dict[str, Any]:
+    """Decode → validate → local repair → (``repair``) LLM repair → rule-based fallback
+    for a scoring response's message content. Decodable content is stored in
+    ``llm_cache`` under ``cache_key``. Outcomes as in run_pipeline."""
+    cjd = compile_jd(jd)
+    trace = trace or NULL_TRACE
+
+    def attempt():
+        result = parse_scores(content, llm_cfg)
+        if llm_cache is not None and cache_key:
+            llm_cache.put(cache_key, content)
+        return _validate_or_repair(
+            result, llm_cfg, client=client, llm_cache=llm_cache, trace=trace, debug=debug, repair=repair
+        )
+
+    return _settle(cjd, parsed, hits, trace, debug, attempt)
+
+
+def fallback_result(
+    jd: Union[Dict[str, Any], CompiledJD],
+    parsed: Dict[str, Any],
+    hits: Dict[str, Any],
+    outcome: str,
+    *,
+    error: Optional[str] = None,
+    trace=None,
+) -> Dict[str, Any]:
+    """Rule-based result for a candidate without a usable LLM response (``error`` goes to the trace)."""
+    trace = trace or NULL_TRACE
+    if error is not None:
+        trace.set("error", error)
+    return _fallback(compile_jd(jd), parsed, hits, trace, outcome)
+
+
+# ---- Multi-candidate requests -------------------------------------------------
+# SYSTEM, JSON_SCHEMA and JOB are sent once per request instead of once per
+# candidate. Each element of the answer goes through the single-candidate
+# validate → local repair → LLM repair → fallback steps on its own.
+
+def pack_candidates(head_tokens: int, block_tokens: Sequence[int], *, max_n: int, budget: int) -> List[List[int]]:
+    """Split candidates (in order) into requests of at most ``max_n`` whose
+    estimated size (shared sections + candidate blocks) stays within ``budget``.
+    A candidate too large to share a request goes alone."""
+    packs: List[List[int]] = []
+    cur: List[int] = []
+    used = head_tokens
+    for i, n in enumerate(block_tokens):
+        if cur and (len(cur) >= max_n or used + n > budget):
+            packs.append(cur)
+            cur, used = [], head_tokens
+        cur.append(i)
+        used += n
+    if cur:
+        packs.append(cur)
+    return packs
+
+
+def run_pipeline_multi(
+    jd: Union[Dict[str, Any], CompiledJD],
+    candidates: Sequence[Tuple[str, str]],
+    *,
+    cfg: Optional[PipelineConfig] = None,
+    client=None,
+    vs_client=None,
+    embedding_function=None,
+    llm_cache=None,
+    traces: Optional[Dict[str, Any]] = None,
+    debug: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """Score ``(candidate_id, resume_text)`` pairs of one JD with multi-candidate requests.
+
+    Candidates are packed into requests of up to ``cfg.candidates_per_request``
+    (fewer when ``cfg.request_token_budget`` is reached). Each returned element
+    is validated on its own; only invalid or missing ones go through
+    single-candidate repair, a single-candidate request, or the rule-based
+    fallback. A failed request falls back for all its candidates.
+    ``traces`` maps candidate ids to their Trace (outcomes as in run_pipeline).
+    Returns {candidate_id: result}.
+    """
+    cfg = cfg or PipelineConfig()
+    cjd = compile_jd(jd)
+    traces = traces or {}
+    llm_cfg = LLMConfig(model=cfg.model, seed=cfg.seed, structured_output=cfg.structured_output)
+    if len({cid for cid, _ in candidates}) != len(candidates):
+        raise ValueError("candidate ids must be unique within a multi-candidate run")
+
+    prepared = []
+    for cid, text in candidates:
+        tr = traces.get(cid) or NULL_TRACE
+        tr.set("repair_attempted", False)
+        tr.set("fallback", False)
+        parsed, hits = _gather(cjd, text, cfg, vs_client=vs_client, embedding_function=embedding_function,
+                               trace=tr, debug=debug)
+        with tr.span("prompt"):
+            block = candidate_block(cjd, cid, parsed, hits)
+        prepared.append((cid, parsed, hits, block, tr))
+
+    head, task = multi_prompt_parts(cjd, get_schema())
+    head_tokens = estimate_tokens("\n\n".join(head + [task]))
+    block_tokens = [estimate_tokens(block) for _, _, _, block, _ in prepared]
+    packs = pack_candidates(
+        head_tokens, block_tokens, max_n=max(1, cfg.candidates_per_request), budget=cfg.request_token_budget
+    )
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for pack in packs:
+        members = [prepared[i] for i in pack]
+        if len(members) == 1:
+            cid, parsed, hits, _, tr = members[0]
+            out[cid] = _single(cjd, parsed, hits, cfg, llm_cfg, client=client, llm_cache=llm_cache, trace=tr, debug=debug)
+            continue
+
+        prompt = "\n\n".join(head + [m[3] for m in members] + [task])
+        for i, (_, _, _, _, tr) in zip(pack, members):
+            tr.set("batch_size", len(members))
+            tr.set("prompt_chars", len(prompt))
+            tr.set("prompt_tokens", head_tokens // len(members) + block_tokens[i])  # shared part split evenly
         if debug:
-            print(f"[pipeline] exception during LLM flow: {e}; falling back to rule-based scorer", file=sys.stderr)
-        # On any error, fallback to rule-based
-        rb = score_rule_based(jd, parsed, hits)
-        assert_valid(rb)
-        return rb
+            print(f"[pipeline] multi-candidate request: {len(members)} candidates, prompt {len(prompt)} chars", file=sys.stderr)
+        try:
+            with ExitStack() as stack:
+                for m in members:
+                    stack.enter_context(m[4].span("llm"))
+                results = generate_multi_scores(
+                    prompt, cfg=llm_cfg, client=client, cache=llm_cache, traces=[m[4] for m in members]
+                )
+        except Exception as e:
+            if debug:
+                print(f"[pipeline] multi-candidate request failed: {e}; falling back to rule-based scorer", file=sys.stderr)
+            for cid, parsed, hits, _, tr in members:
+                tr.set("error", f"{type(e).__name__}: {e}")
+                out[cid] = _fallback(cjd, parsed, hits, tr, "fallback_error")
+            continue
+
+        for cid, parsed, hits, _, tr in members:
+            element = results.get(cid)
+            if element is None:
+                # left out of the answer: ask for this candidate alone
+                tr.set("batch_missing", True)
+                out[cid] = _single(cjd, parsed, hits, cfg, llm_cfg, client=client, llm_cache=llm_cache, trace=tr, debug=debug)
+                continue
+            _count_output(tr, "completion_tokens", element)
+            out[cid] = _settle(
+                cjd, parsed, hits, tr, debug,
+                lambda element=element, tr=tr: _validate_or_repair(
+                    element, llm_cfg, client=client, llm_cache=llm_cache, trace=tr, debug=debug
+                ),
+            )
+    return out
+
+
+def _single(cjd: CompiledJD, parsed, hits, cfg: PipelineConfig, llm_cfg: LLMConfig, *, client, llm_cache, trace,
+            debug: bool) -> Dict[str, Any]:
+    # One candidate on its own: the run_pipeline prompt and LLM flow
+    prompt = _prompt_stage(cjd, parsed, hits, cfg, trace=trace, debug=debug, print_prompt=False)
+    return _settle(
+        cjd, parsed, hits, trace, debug,
+        lambda: _llm_attempt(prompt, llm_cfg, client=client, llm_cache=llm_cache, trace=trace, debug=debug),
+    )
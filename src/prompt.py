@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence, Tuple, Union
 import json
 
+from compiled_jd import CompiledJD
+
 
 def _stable_sorted_strs(items: List[str]) -> List[str]:
     return sorted([s for s in (items or []) if isinstance(s, str) and s.strip()], key=lambda x: x.lower())
@@ -24,11 +26,46 @@ def _stable_hits(retrieval: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[D
     return out
 
 
+def _evidence_table(lines: List[str], retrieval_obj: Dict[str, List[Dict[str, Any]]]) -> Dict[str, str]:
+    # Every unique resume line once, ids assigned in case-insensitive text order
+    texts = set(lines)
+    for hits in retrieval_obj.values():
+        texts.update(h["text"] for h in hits)
+    ordered = sorted(texts, key=lambda x: (x.lower(), x))
+    return {text: f"E{i}" for i, text in enumerate(ordered, 1)}
+
+
+def _job(jd: Union[Dict[str, Any], CompiledJD]) -> Tuple[List[str], str]:
+    # (sorted requirements, serialized JOB block)
+    if isinstance(jd, CompiledJD):
+        return jd.prompt_requirements, jd.job_block
+    reqs = _stable_sorted_strs(jd.get("requirements", []))
+    job_obj = {
+        "title": jd.get("title", ""),
+        "sector": jd.get("sector", ""),
+        "location": jd.get("location", ""),
+        "description": jd.get("description", ""),
+        "requirements": reqs,
+    }
+    return reqs, "JOB:\n" + json.dumps(job_obj, ensure_ascii=False, sort_keys=True)
+
+
+def _parsed_obj(parsed_resume: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "skills": _stable_sorted_strs(parsed_resume.get("skills", [])),
+        "experience_years": float(parsed_resume.get("experience_years", 0.0)),
+        "evidence_lines": _stable_sorted_strs(parsed_resume.get("evidence_lines", [])),
+    }
+
+
 def build_prompt(
-    jd: Dict[str, Any],
+    jd: Union[Dict[str, Any], CompiledJD],
     parsed_resume: Dict[str, Any],
     retrieval_hits: Dict[str, List[Dict[str, Any]]],
     schema_dict: Dict[str, Any],
+    *,
+    inline_schema: bool = True,
+    evidence_table: bool = False,
 ) -> str:
     """Return a deterministic prompt string.
 
@@ -36,50 +73,126 @@ def build_prompt(
       - SYSTEM (JSON-only guardrails)
       - JSON_SCHEMA (strict Draft-07 schema)
       - JOB (title, sector, requirements, description)
+      - EVIDENCE (only with ``evidence_table=True``)
       - PARSED_RESUME (skills, experience_years, evidence_lines)
       - RETRIEVAL (top-k hits per requirement)
       - TASK (clear instruction to output a single JSON object only)
-    """
-    reqs = _stable_sorted_strs(jd.get("requirements", []))
-    job_obj = {
-        "title": jd.get("title", ""),
-        "sector": jd.get("sector", ""),
-        "location": jd.get("location", ""),
-        "description": jd.get("description", ""),
-        "requirements": reqs,
-    }
 
-    parsed_obj = {
-        "skills": _stable_sorted_strs(parsed_resume.get("skills", [])),
-        "experience_years": float(parsed_resume.get("experience_years", 0.0)),
-        "evidence_lines": _stable_sorted_strs(parsed_resume.get("evidence_lines", [])),
-    }
+    A CompiledJD supplies the sorted requirements and the serialized JOB block.
+    With ``inline_schema=False`` (structured-output mode: the schema travels as
+    the response format) the JSON_SCHEMA section is left out.
+    With ``evidence_table=True`` each unique resume line is listed once in
+    EVIDENCE under a short id (E1, E2, ... in text order); PARSED_RESUME and
+    RETRIEVAL then refer to lines by id, and hits carry only id and distance.
+    """
+    reqs, job_block = _job(jd)
+    parsed_obj = _parsed_obj(parsed_resume)
 
     retrieval_obj = _stable_hits({k: retrieval_hits.get(k, []) for k in reqs})
 
+    schema_ref = "JSON_SCHEMA" if inline_schema else "the response schema"
+    schema_src = "the provided JSON_SCHEMA" if inline_schema else "the response schema"
     system_block = (
         "You are an evaluation service.\n"
-        "Return a SINGLE JSON object ONLY that strictly validates against the provided JSON_SCHEMA.\n"
+        f"Return a SINGLE JSON object ONLY that strictly validates against {schema_src}.\n"
         "Do not include explanations, markdown, or any extra text before or after the JSON.\n"
         "If uncertain, make the best deterministic judgment using only the provided evidence."
     )
 
-    task_block = (
-        "Using JOB, PARSED_RESUME, and RETRIEVAL, produce scores and explanations that match JSON_SCHEMA.\n"
-        "- Be faithful to the evidence.\n"
-        "- Scores are integers 0..100.\n"
-        "- All arrays and fields required by the schema must be present.\n"
-        "- If an item is missing, explain the gap in missingDetail.\n"
-        "- No extra keys."
-    )
+    sources = "JOB, EVIDENCE, PARSED_RESUME, and RETRIEVAL" if evidence_table else "JOB, PARSED_RESUME, and RETRIEVAL"
+    task_lines = [
+        f"Using {sources}, produce scores and explanations that match {schema_ref}.",
+        "- Be faithful to the evidence.",
+        "- Scores are integers 0..100.",
+        "- All arrays and fields required by the schema must be present.",
+        "- If an item is missing, explain the gap in missingDetail.",
+        "- No extra keys.",
+    ]
+    if evidence_table:
+        task_lines.insert(1, "- PARSED_RESUME and RETRIEVAL refer to EVIDENCE lines by id; quote the line text, not the id.")
+    task_block = "\n".join(task_lines)
 
-    parts = [
-        "SYSTEM:\n" + system_block,
-        "JSON_SCHEMA:\n" + json.dumps(schema_dict, ensure_ascii=False, sort_keys=True),
-        "JOB:\n" + json.dumps(job_obj, ensure_ascii=False, sort_keys=True),
+    parts = ["SYSTEM:\n" + system_block]
+    if inline_schema:
+        parts.append("JSON_SCHEMA:\n" + json.dumps(schema_dict, ensure_ascii=False, sort_keys=True))
+    parts.append(job_block)
+    if evidence_table:
+        ids = _evidence_table(parsed_obj["evidence_lines"], retrieval_obj)
+        table = {eid: text for text, eid in ids.items()}  # insertion order = id order
+        parsed_obj["evidence_lines"] = [ids[ln] for ln in parsed_obj["evidence_lines"]]
+        retrieval_obj = {
+            req: [{"line": ids[h["text"]], "distance": round(h["distance"], 4)} for h in hits]
+            for req, hits in retrieval_obj.items()
+        }
+        parts.append("EVIDENCE:\n" + json.dumps(table, ensure_ascii=False))
+    parts += [
         "PARSED_RESUME:\n" + json.dumps(parsed_obj, ensure_ascii=False, sort_keys=True),
         "RETRIEVAL:\n" + json.dumps(retrieval_obj, ensure_ascii=False, sort_keys=True),
         "TASK:\n" + task_block,
     ]
 
     return "\n\n".join(parts)
+
+
+_MULTI_SYSTEM = (
+    "You are an evaluation service.\n"
+    "Return a SINGLE JSON object ONLY of the form {\"results\": {\"<candidate id>\": <object>, ...}} with one entry "
+    "per CANDIDATE, each object strictly validating against the provided JSON_SCHEMA.\n"
+    "Do not include explanations, markdown, or any extra text before or after the JSON.\n"
+    "If uncertain, make the best deterministic judgment using only the provided evidence."
+)
+
+_MULTI_TASK = (
+    "Evaluate every CANDIDATE independently against JOB using only that candidate's PARSED_RESUME and RETRIEVAL.\n"
+    "- Key each result by its candidate id, exactly as given.\n"
+    "- Be faithful to the evidence.\n"
+    "- Scores are integers 0..100.\n"
+    "- All arrays and fields required by the schema must be present.\n"
+    "- If an item is missing, explain the gap in missingDetail.\n"
+    "- No extra keys."
+)
+
+
+def multi_prompt_parts(
+    jd: Union[Dict[str, Any], CompiledJD], schema_dict: Dict[str, Any]
+) -> Tuple[List[str], str]:
+    """(leading sections, TASK section) shared by every multi-candidate prompt of one JD."""
+    _, job_block = _job(jd)
+    head = [
+        "SYSTEM:\n" + _MULTI_SYSTEM,
+        "JSON_SCHEMA:\n" + json.dumps(schema_dict, ensure_ascii=False, sort_keys=True),
+        job_block,
+    ]
+    return head, "TASK:\n" + _MULTI_TASK
+
+
+def candidate_block(
+    jd: Union[Dict[str, Any], CompiledJD],
+    candidate_id: str,
+    parsed_resume: Dict[str, Any],
+    retrieval_hits: Dict[str, List[Dict[str, Any]]],
+) -> str:
+    """One CANDIDATE section: the PARSED_RESUME and RETRIEVAL of ``build_prompt``."""
+    reqs, _ = _job(jd)
+    retrieval_obj = _stable_hits({k: retrieval_hits.get(k, []) for k in reqs})
+    return (
+        f"CANDIDATE {candidate_id}:\n"
+        "PARSED_RESUME: " + json.dumps(_parsed_obj(parsed_resume), ensure_ascii=False, sort_keys=True) + "\n"
+        "RETRIEVAL: " + json.dumps(retrieval_obj, ensure_ascii=False, sort_keys=True)
+    )
+
+
+def build_multi_prompt(
+    jd: Union[Dict[str, Any], CompiledJD],
+    candidates: Sequence[Tuple[str, Dict[str, Any], Dict[str, List[Dict[str, Any]]]]],
+    schema_dict: Dict[str, Any],
+) -> str:
+    """One prompt scoring several candidates of the same JD.
+
+    SYSTEM, JSON_SCHEMA and JOB appear once, then one CANDIDATE section per
+    ``(candidate_id, parsed_resume, retrieval_hits)`` in the given order, then
+    TASK. The model answers {"results": {candidate_id: AssignmentOutput}}.
+    """
+    head, task = multi_prompt_parts(jd, schema_dict)
+    blocks = [candidate_block(jd, cid, parsed, hits) for cid, parsed, hits in candidates]
+    return "\n\n".join(head + blocks + [task])
@@ -0,0 +1,236 @@
+"""
+Durable store of finished pipeline results (one sqlite file).
+- Key = sha256 of (JD content hash, resume text hash, mode, PipelineConfig
+  fields, embedder id, schema version, code version). Re-running a
+  requisition only recomputes new/edited resumes or candidates of an edited
+  JD; everything else is answered from the store.
+- Code version hashes the source of the modules that shape a result, so a
+  scorer/prompt/parser change invalidates old entries automatically.
+- Results that came from the error fallback (LLM unreachable, ...) or lost
+  the latency deadline are not stored, so they are retried on the next run.
+- Eviction: entries older than ``max_age_s`` (since written) and the least
+  recently used beyond ``max_entries``. compact() also drops entries from
+  other schema/code versions and vacuums the file.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from schema import schema_version
+from tracing import Trace
+
+__all__ = ["ResultStore", "cached_score", "cached_ascore", "code_version", "jd_hash"]
+
+# Modules whose code determines a result for a given (JD, resume, config)
+_RESULT_MODULES = (
+    "compiled_jd", "llm_evaluator", "local_repair", "numpy_backend", "parse_resume", "pipeline",
+    "prompt", "retrieve", "schema", "scorer", "skill_matcher", "tokens",
+)
+# Outcomes (tracing) that must not be persisted
+_TRANSIENT_OUTCOMES = {"fallback_error", "deadline_rules", "error"}
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    import importlib
+
+    h = hashlib.sha256()
+    for name in _RESULT_MODULES:
+        mod = importlib.import_module(name)
+        h.update(name.encode("utf-8"))
+        h.update(Path(mod.__file__).read_bytes())
+    return h.hexdigest()[:12]
+
+
+def _sha(obj: Any) -> str:
+    canon = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def jd_hash(jd) -> str:
+    """Content hash of a JD dict or CompiledJD (same value for both)."""
+    cached = getattr(jd, "content_hash", None)
+    return cached if cached is not None else _sha(jd)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_entries: Optional[int] = None,
+        max_age_s: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, jd_hash TEXT, resume_hash TEXT, version TEXT,"
+            " created REAL, last_used REAL, result TEXT)"
+        )
+        self._version = f"{schema_version()}:{code_version()}"
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.evict()
+
+    # ---- keys -----------------------------------------------------------------
+
+    def key(self, jd, resume_text: str, *, mode: str, cfg=None, embedder: str = "default") -> str:
+        """Hash of everything that determines the result for this candidate."""
+        return _sha({
+            "jd": jd_hash(jd),
+            "resume": _text_hash(resume_text),
+            "mode": mode,
+            "cfg": dict(sorted(vars(cfg).items())) if cfg is not None else {},
+            "embedder": embedder,
+            "version": self._version,
+        })
+
+    # ---- lookups ----------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT result, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.max_age_s is not None and now - row[1] > self.max_age_s):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any], *, jd, resume_text: str) -> None:
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)  # key order kept: hits print byte-identical
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, jd_hash(jd), _text_hash(resume_text), self._version, now, now, payload),
+            )
+            self.writes += 1
+
+    # ---- eviction / compaction ------------------------------------------------
+
+    def evict(self) -> int:
+        """Apply the age and entry-count limits; return entries removed."""
+        removed = 0
+        with self._lock:
+            if self.max_age_s is not None:
+                cur = self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.max_age_s,))
+                removed += cur.rowcount
+            if self.max_entries is not None:
+                cur = self._db.execute(
+                    "DELETE FROM results WHERE key NOT IN"
+                    " (SELECT key FROM results ORDER BY last_used DESC, key LIMIT ?)",
+                    (self.max_entries,),
+                )
+                removed += cur.rowcount
+            self.evictions += removed
+        return removed
+
+    def compact(self) -> int:
+        """Evict, drop entries written by other schema/code versions, and vacuum."""
+        removed = self.evict()
+        with self._lock:
+            cur = self._db.execute("DELETE FROM results WHERE version != ?", (self._version,))
+            removed += cur.rowcount
+            self.evictions += cur.rowcount
+            self._db.execute("VACUUM")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ---- stats --------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def summary(self) -> str:
+        st = self.stats()
+        return (
+            f"[result-store] hits={st['hits']} misses={st['misses']} "
+            f"hit_rate={st['hit_rate']:.1%} writes={st['writes']} evictions={st['evictions']}"
+        )
+
+
+def _lookup(store: ResultStore, jd, text: str, key_args: Dict[str, Any], trace):
+    key = store.key(jd, text, **key_args)
+    hit = store.get(key)
+    if hit is not None and trace is not None:
+        trace.finish("cached")
+    return key, hit
+
+
+def _keep(store: ResultStore, key: str, result, jd, text: str, trace: Trace) -> None:
+    if trace.outcome not in _TRANSIENT_OUTCOMES:
+        store.put(key, result, jd=jd, resume_text=text)
+
+
+def cached_score(
+    store: ResultStore,
+    score: Callable[..., Dict[str, Any]],
+    *,
+    mode: str,
+    cfg=None,
+    embedder: str = "default",
+) -> Callable[..., Dict[str, Any]]:
+    """Wrap ``score(jd, text, trace=...)`` (run_pipeline / run_rules) with the store."""
+    key_args = {"mode": mode, "cfg": cfg, "embedder": embedder}
+
+    def wrapped(jd, text: str, trace: Optional[Trace] = None) -> Dict[str, Any]:
+        key, hit = _lookup(store, jd, text, key_args, trace)
+        if hit is not None:
+            return hit
+        trace = trace or Trace()  # the outcome decides whether the result is kept
+        result = score(jd, text, trace=trace)
+        _keep(store, key, result, jd, text, trace)
+        return result
+
+    return wrapped
+
+
+def cached_ascore(store: ResultStore, ascore, *, mode: str, cfg=None, embedder: str = "default"):
+    """Async twin of ``cached_score`` for ``run_pipeline_async``."""
+    key_args = {"mode": mode, "cfg": cfg, "embedder": embedder}
+
+    async def wrapped(jd, text: str, trace: Optional[Trace] = None) -> Dict[str, Any]:
+        key, hit = _lookup(store, jd, text, key_args, trace)
+        if hit is not None:
+            return hit
+        trace = trace or Trace()
+        result = await ascore(jd, text, trace=trace)
+        _keep(store, key, result, jd, text, trace)
+        return result
+
+    return wrapped
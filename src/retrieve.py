@@ -1,42 +1,190 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Tuple
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Tuple, Union, TYPE_CHECKING
 import sys
+import threading
 import uuid
+import weakref
 
-import chromadb
-from chromadb.config import Settings
+from compiled_jd import CompiledJD
+
+if TYPE_CHECKING:  # chromadb is heavy; import it only when a collection is built
+    import chromadb
 
 # If you rely on sentence-transformers, ensure it's installed.
 # The tests typically use the default embedding function or a simple one.
 
 
+def create_client() -> chromadb.Client:
+    """In-memory Chroma client (create once per process and reuse it)."""
+    import chromadb
+    from chromadb.config import Settings
+
+    return chromadb.Client(Settings(
+        anonymized_telemetry=False,
+        # Defaults to sqlite in-memory if you don't set a path/persist dir
+    ))
+
+
+def default_embedding_function():
+    """Chroma's default embedder; the model loads lazily on first use, so share one instance."""
+    from chromadb.utils import embedding_functions
+    return embedding_functions.DefaultEmbeddingFunction()
+
+
+BACKENDS = ("chroma", "numpy")
+
+
 def build_resume_collection(
     resume_lines: List[str],
     collection_name: str | None = None,
-) -> Tuple[chromadb.Client, Any]:
+    *,
+    backend: str = "chroma",
+    client: chromadb.Client | None = None,
+    embedding_function=None,
+) -> Tuple[chromadb.Client | None, Any]:
     """
-    Create a Chroma collection and add each resume line as a separate document.
+    Create a collection and add each resume line as a separate document.
+
+    backend="chroma" (default) builds a Chroma collection, the option for large
+    corpora. backend="numpy" builds an in-process exact-search NumpyCollection
+    (no client; returns ``(None, coll)``). Both expose ``name``, ``count()`` and
+    ``query(...)`` with Chroma's result shape, so retrieve_for_requirements works
+    on either.
+
+    Pass ``client``/``embedding_function`` to reuse warm instances across calls;
+    otherwise a fresh client and Chroma's default embedder are used.
     """
-    client = chromadb.Client(Settings(
-        anonymized_telemetry=False,
-        # Defaults to sqlite in-memory if you don't set a path/persist dir
-    ))
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown retrieval backend {backend!r}; expected one of {BACKENDS}")
 
     name = collection_name or f"resume_v0"
+    ids = [f"res-{i:04d}" for i in range(len(resume_lines))]
+    metadatas = [{"idx": i, "id": f"res-{i:04d}"} for i in range(len(resume_lines))]
+
+    if backend == "numpy":
+        from numpy_backend import NumpyCollection
+        ef = embedding_function or default_embedding_function()
+        return None, NumpyCollection(name, resume_lines, ids, metadatas, ef)
+
+    client = client or create_client()
+
     # If a collection with this name exists and get_or_create=False, Chroma will raise.
     # For tests/pipeline runs, pass a unique name to avoid collisions.
+    extra: Dict[str, Any] = {}
+    if embedding_function is not None:
+        extra["embedding_function"] = embedding_function
     coll = client.create_collection(
         name=name,
         metadata={"hnsw:space": "cosine"},
+        **extra,
     )
 
     # Add documents
-    ids = [f"res-{i:04d}" for i in range(len(resume_lines))]
-    metadatas = [{"idx": i, "id": f"res-{i:04d}"} for i in range(len(resume_lines))]
     coll.add(documents=resume_lines, ids=ids, metadatas=metadatas)
     return client, coll
 
 
+# ---- Pooled collections for long-running processes -------------------------
+# A collection per candidate never gives its memory back: Chroma's in-process
+# store keeps per-collection state even after delete_collection. Instead,
+# resume_collection leases a collection from a small per-(client, embedder)
+# pool and refills it in place; the pool only grows to the number of
+# candidates retrieved concurrently.
+
+class _CollectionPool:
+    def __init__(self, client, embedding_function) -> None:
+        self.client = client
+        self.embedding_function = embedding_function
+        self.free: List[Tuple[Any, int]] = []  # (collection, rows it holds)
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> Tuple[Any, int]:
+        with self._lock:
+            if self.free:
+                return self.free.pop()
+            self.created += 1
+        extra: Dict[str, Any] = {}
+        if self.embedding_function is not None:
+            extra["embedding_function"] = self.embedding_function
+        coll = self.client.create_collection(
+            name=f"resume_pool_{uuid.uuid4().hex}", metadata={"hnsw:space": "cosine"}, **extra
+        )
+        return coll, 0
+
+    def give(self, coll, rows: int) -> None:
+        with self._lock:
+            self.free.append((coll, rows))
+
+
+_POOLS: "weakref.WeakKeyDictionary[Any, Dict[int, _CollectionPool]]" = weakref.WeakKeyDictionary()
+_POOLS_LOCK = threading.Lock()
+_SHARED_CLIENT = None
+
+
+def _shared_client():
+    global _SHARED_CLIENT
+    with _POOLS_LOCK:
+        if _SHARED_CLIENT is None:
+            _SHARED_CLIENT = create_client()
+        return _SHARED_CLIENT
+
+
+def collection_pool(client, embedding_function=None) -> _CollectionPool:
+    """The pool resume_collection uses for ``client`` and ``embedding_function``."""
+    key = id(embedding_function)
+    with _POOLS_LOCK:
+        pools = _POOLS.setdefault(client, {})
+        pool = pools.get(key)
+        if pool is None or pool.embedding_function is not embedding_function:
+            pool = pools[key] = _CollectionPool(client, embedding_function)
+        return pool
+
+
+def _refill(coll, held: int, resume_lines: List[str]) -> None:
+    n = len(resume_lines)
+    if n:
+        coll.upsert(
+            documents=resume_lines,
+            ids=[f"res-{i:04d}" for i in range(n)],
+            metadatas=[{"idx": i, "id": f"res-{i:04d}"} for i in range(n)],
+        )
+    if held > n:
+        coll.delete(ids=[f"res-{i:04d}" for i in range(n, held)])
+
+
+@contextmanager
+def resume_collection(
+    resume_lines: List[str],
+    *,
+    backend: str = "chroma",
+    client: chromadb.Client | None = None,
+    embedding_function=None,
+) -> Iterator[Any]:
+    """A collection holding exactly ``resume_lines`` for the duration of a ``with`` block.
+
+    Same ids, metadata and query results as ``build_resume_collection``, but
+    for Chroma the collection is leased from a pool and handed back on exit,
+    so a process scoring any number of candidates holds a bounded number of
+    collections. Without ``client`` a process-wide in-memory client is used.
+    The numpy backend just builds a NumpyCollection (freed with its last
+    reference).
+    """
+    if backend != "chroma":
+        yield build_resume_collection(resume_lines, backend=backend, embedding_function=embedding_function)[1]
+        return
+    pool = collection_pool(client or _shared_client(), embedding_function)
+    coll, held = pool.take()
+    try:
+        held = max(held, len(resume_lines))  # if the refill fails midway, the next one clears all of it
+        _refill(coll, held, resume_lines)
+        held = len(resume_lines)
+        yield coll
+    finally:
+        pool.give(coll, held)
+
+
 def _normalize_requirement_to_query(rq: str) -> str:
     # For very simple pipeline, the requirement itself is the query;
     # strip leading "Proficiency in ".
@@ -46,27 +194,58 @@ def _normalize_requirement_to_query(rq: str) -> str:
     return t
 
 
+def _hit_order(item: Dict[str, Any]) -> Tuple[float, str]:
+    # Distance first; equal (to 8 dp) distances break ties by stable line id
+    return (round(item["distance"], 8), str(item["id"]))
+
+
 def retrieve_for_requirements(
     collection,
-    requirements: List[str],
+    requirements: Union[List[str], CompiledJD],
     k: int = 3,
     debug: bool = False,
+    embedding_function=None,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
-    For each requirement, run a top-k vector query and return text+distance+meta.
+    Run one batched top-k vector query for all requirements and return
+    {requirement: [{id, text, distance, meta}]}.
+
+    All normalized queries are embedded and searched in a single
+    ``collection.query`` call (duplicates collapse to one row), then fanned
+    back out per requirement. Hits are ordered by (distance, id) so ties are
+    deterministic.
+
+    Given a CompiledJD, its "Proficiency in" requirements and precomputed
+    queries are used; if ``embedding_function`` (the collection's embedder) is
+    also given, the JD's cached query embeddings are sent instead of texts.
     """
     out: Dict[str, List[Dict[str, Any]]] = {}
-    for idx, rq in enumerate(requirements):
-        q = _normalize_requirement_to_query(rq)
-        res = collection.query(
-            query_texts=[q],
-            n_results=k,
-            include=["documents", "distances", "metadatas"],  # no "ids" (Chroma complains)
-        )
-        docs = res.get("documents", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        out[rq] = [
+    cjd = requirements if isinstance(requirements, CompiledJD) else None
+    if cjd is not None:
+        requirements, queries, unique = cjd.query_requirements, cjd.queries, cjd.unique_queries
+    else:
+        queries = [_normalize_requirement_to_query(rq) for rq in requirements]
+        unique = list(dict.fromkeys(queries))
+    if not unique:
+        return out
+    if cjd is not None and embedding_function is not None:
+        query: Dict[str, Any] = {"query_embeddings": cjd.query_embeddings(embedding_function)}
+    else:
+        query = {"query_texts": unique}
+    res = collection.query(
+        n_results=k,
+        include=["documents", "distances", "metadatas"],  # no "ids" (Chroma complains)
+        **query,
+    )
+    row_of = {q: i for i, q in enumerate(unique)}
+    all_docs = res.get("documents") or [[] for _ in unique]
+    all_dists = res.get("distances") or [[] for _ in unique]
+    all_metas = res.get("metadatas") or [[] for _ in unique]
+
+    for idx, (rq, q) in enumerate(zip(requirements, queries)):
+        row = row_of[q]
+        docs, dists, metas = all_docs[row], all_dists[row], all_metas[row]
+        items = [
             {
                 "id": metas[i].get("id", metas[i].get("idx")),  # stable id for tests
                 "text": docs[i],
@@ -75,9 +254,12 @@ def retrieve_for_requirements(
             }
             for i in range(len(docs))
         ]
+        items.sort(key=_hit_order)
+        out[rq] = items
         if debug:
-            print(f"[retrieve] req[{idx}] {rq!r} -> top-{len(docs)}", file=sys.stderr)
-            for i, (d, dist) in enumerate(zip(docs, dists)):
+            print(f"[retrieve] req[{idx}] {rq!r} -> top-{len(items)}", file=sys.stderr)
+            for i, it in enumerate(items):
+                d, dist = it["text"], it["distance"]
                 snippet = (d[:120] + "…") if len(d) > 120 else d
                 print(f"   {i+1:>2}. dist={dist:.4f}  {snippet}", file=sys.stderr)
     return out
@@ -1,14 +1,20 @@
 """
 Minimal JSON schema and validation helpers for the assignment output.
 Stage 1 goal: define a strict schema and a tiny validation API.
+
+Validation is compiled once per process: a hand-written fast path checks the
+fixed AssignmentOutput shape, and the (cached) Draft7Validator only runs when
+the fast path rejects a payload, to produce the detailed error messages.
+jsonschema itself is only imported then, so valid payloads never pay for it.
 """
 from __future__ import annotations
-from typing import Any, Dict, Tuple
+from functools import lru_cache
+from typing import Any, Dict, Tuple, TYPE_CHECKING
+import hashlib
+import json
 
-try:
+if TYPE_CHECKING:
     from jsonschema import Draft7Validator
-except Exception as e:  # pragma: no cover
-    raise RuntimeError("jsonschema is required. Install with `pip install jsonschema`.") from e
 
 
 # ---- Public API -------------------------------------------------------------
@@ -99,13 +105,137 @@ def get_schema() -> Dict[str, Any]:
     return schema
 
 
+# Keywords the providers' strict structured-output mode does not accept; the
+# local validator (and local_repair) still enforce them on every response.
+_STRICT_UNSUPPORTED = ("$schema", "title", "minimum", "maximum", "minItems", "maxItems", "minLength")
+
+
+def _strictify(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strictify(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+    out = {k: _strictify(v) for k, v in node.items() if k not in _STRICT_UNSUPPORTED}
+    if out.get("type") == "object":
+        required = set(out.get("required", []))
+        props = out.get("properties", {})
+        for key, sub in props.items():
+            if key not in required:
+                # strict mode wants every key required; optional ones become nullable
+                sub["type"] = [sub["type"], "null"]
+        out["required"] = list(props)
+        out["additionalProperties"] = False
+    return out
+
+
+@lru_cache(maxsize=1)
+def get_strict_schema() -> Dict[str, Any]:
+    """get_schema() in the form accepted by strict JSON-schema response formats.
+
+    Every property is required (optional ones are nullable) and range/length
+    keywords are dropped. Responses are still validated against get_schema().
+    Cached: do not mutate the returned dict.
+    """
+    return _strictify(get_schema())
+
+
+@lru_cache(maxsize=1)
+def schema_version() -> str:
+    """Short content hash of the schema; changes whenever the schema changes."""
+    canon = json.dumps(get_schema(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()[:12]
+
+
+@lru_cache(maxsize=1)
+def _validator() -> Draft7Validator:
+    # Built once per process; only consulted for payloads the fast path rejects.
+    try:
+        from jsonschema import Draft7Validator
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("jsonschema is required. Install with `pip install jsonschema`.") from e
+    return Draft7Validator(get_schema())
+
+
+# ---- Fast path for the fixed AssignmentOutput shape ------------------------
+# Mirrors get_schema() exactly, including jsonschema's type rules: bool is not
+# an integer, integral floats (e.g. 90.0) are, and arrays must be lists.
+# It may only ever be *stricter* than jsonschema: a payload it rejects is
+# re-checked by the Draft7Validator, which has the final word.
+
+_SCORE_KEYS = ("overallScore", "technicalSkillsScore", "experienceScore", "culturalFitScore")
+_TOP_REQUIRED = frozenset(_SCORE_KEYS + ("matchSummary", "strengthsHighlights", "improvementAreas", "detailedBreakdown"))
+_TOP_ALLOWED = _TOP_REQUIRED | {"redFlags"}
+_BREAKDOWN_KEYS = frozenset(("technicalSkills", "experience", "educationAndCertifications", "culturalFitAndSoftSkills"))
+_REQ_ITEM_KEYS = frozenset(("requirement", "present", "evidence", "gapPercentage", "missingDetail"))
+_RED_FLAG_KEYS = frozenset(("issue", "evidence", "reason"))
+
+
+def _is_int_0_100(v: Any) -> bool:
+    if isinstance(v, bool):
+        return False
+    if isinstance(v, int) or (isinstance(v, float) and v.is_integer()):
+        return 0 <= v <= 100
+    return False
+
+
+def _is_str_list(v: Any, max_items: int) -> bool:
+    return isinstance(v, list) and len(v) <= max_items and all(isinstance(x, str) for x in v)
+
+
+def _is_req_item(it: Any) -> bool:
+    return (
+        isinstance(it, dict)
+        and it.keys() == _REQ_ITEM_KEYS
+        and isinstance(it["requirement"], str) and len(it["requirement"]) >= 1
+        and isinstance(it["present"], bool)
+        and isinstance(it["evidence"], str)
+        and _is_int_0_100(it["gapPercentage"])
+        and isinstance(it["missingDetail"], str)
+    )
+
+
+def _is_red_flag(it: Any) -> bool:
+    return (
+        isinstance(it, dict)
+        and it.keys() == _RED_FLAG_KEYS
+        and all(isinstance(it[k], str) for k in _RED_FLAG_KEYS)
+    )
+
+
+def _fast_is_valid(payload: Any) -> bool:
+    if not isinstance(payload, dict):
+        return False
+    keys = payload.keys()
+    if not (_TOP_REQUIRED <= keys and keys <= _TOP_ALLOWED):
+        return False
+    if not all(_is_int_0_100(payload[k]) for k in _SCORE_KEYS):
+        return False
+    if not isinstance(payload["matchSummary"], str):
+        return False
+    if not (_is_str_list(payload["strengthsHighlights"], 3) and _is_str_list(payload["improvementAreas"], 3)):
+        return False
+    bd = payload["detailedBreakdown"]
+    if not (isinstance(bd, dict) and bd.keys() == _BREAKDOWN_KEYS):
+        return False
+    for k in _BREAKDOWN_KEYS:
+        items = bd[k]
+        if not (isinstance(items, list) and all(_is_req_item(it) for it in items)):
+            return False
+    if "redFlags" in payload:
+        flags = payload["redFlags"]
+        if not (isinstance(flags, list) and all(_is_red_flag(it) for it in flags)):
+            return False
+    return True
+
+
 def validate_json(payload: Dict[str, Any]) -> Tuple[bool, Tuple[str, ...]]:
     """Validate a payload against the schema.
 
     Returns (is_valid, errors) where errors is a tuple of readable messages.
     """
-    validator = Draft7Validator(get_schema())
-    errors = tuple(sorted((e.message for e in validator.iter_errors(payload))))
+    if _fast_is_valid(payload):
+        return (True, ())
+    errors = tuple(sorted((e.message for e in _validator().iter_errors(payload))))
     return (len(errors) == 0, errors)
 
 
@@ -2,7 +2,7 @@
 Rule-based scorer (v0) that produces a schema-valid JSON output without using an LLM.
 
 Inputs:
-  - jd: dict with title/sector/location/description/requirements
+  - jd: dict with title/sector/location/description/requirements (or a CompiledJD)
   - parsed_resume: dict from parse_resume(...) {skills, experience_years, evidence_lines}
   - retrieval_hits: dict from retrieve_for_requirements(...)
 
@@ -12,9 +12,10 @@ Outputs:
 Deterministic and minimal: good for unit tests and as a fallback path.
 """
 from __future__ import annotations
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 import re
 
+from compiled_jd import CompiledJD
 from schema import assert_valid
 
 _SOFT_POSITIVE = [
@@ -84,10 +85,13 @@ def _exp_score(cand_years: float, years_req: int) -> Tuple[int, Dict[str, Any]]:
     return score, breakdown
 
 
-def score_rule_based(jd: Dict[str, Any], parsed_resume: Dict[str, Any], retrieval_hits: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
-    reqs = jd.get("requirements", []) or []
-    tech_reqs = _tech_requirements(reqs)
-    years_req = _extract_years_req(reqs)
+def score_rule_based(jd: Union[Dict[str, Any], CompiledJD], parsed_resume: Dict[str, Any], retrieval_hits: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    if isinstance(jd, CompiledJD):
+        tech_reqs, years_req = jd.tech_requirements, jd.years_required
+    else:
+        reqs = jd.get("requirements", []) or []
+        tech_reqs = _tech_requirements(reqs)
+        years_req = _extract_years_req(reqs)
 
     skills = parsed_resume.get("skills", []) or []
     evidence_lines = parsed_resume.get("evidence_lines", []) or []
@@ -219,3 +223,8 @@ def score_rule_based(jd: Dict[str, Any], parsed_resume: Dict[str, Any], retrieva
     # Validate before returning
     assert_valid(result)
     return result
+
+
+# retrieval_hits is accepted for interface parity but never read; callers use this
+# flag to skip embedding/indexing/querying entirely (see pipeline.run_rules).
+score_rule_based.uses_retrieval = False
@@ -0,0 +1,362 @@
+"""
+Long-lived scoring daemon: a local HTTP/JSON API around run_pipeline / run_rules.
+- Everything expensive is built once and reused by every request: the
+  embedding function (model loads on first use), the Chroma client, the
+  compiled schema validator, the LLM client, and compiled JDs (small LRU keyed
+  by JD hash, so requirement query embeddings are computed once per JD).
+- A fixed pool of ``workers`` threads scores candidates; at most ``queue_size``
+  more wait for a worker. Anything beyond that is refused at once with 503
+  and Retry-After (backpressure) instead of piling up.
+- Endpoints:
+    POST /score    {"jd": {...}, "resume": "...", "id"?: "..."}
+                   → {"id", "result", "outcome", "ms"}
+    POST /batch    {"jd": {...}, "candidates": [{"id", "resume"}, ...]}
+                   → {"results": [{"id", "ok", "result" | "error"}, ...]}  (input order)
+    GET  /healthz  → {"status": "ok", "mode", "workers", "uptime_s"}
+    GET  /metrics  → request/outcome counters, in-flight/queued, latency percentiles,
+                     cache stats
+
+    python src/server.py --port 8765 --mode llm --backend numpy
+"""
+from __future__ import annotations
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import argparse
+import json
+import sys
+import threading
+import time
+
+from compiled_jd import CompiledJD, compile_jd
+from pipeline import PipelineConfig, run_pipeline, run_rules
+from result_store import jd_hash
+from tracing import Trace
+
+__all__ = ["ScoringService", "Overloaded", "make_server", "main"]
+
+_MAX_BODY = 8 * 1024 * 1024
+
+
+class Overloaded(Exception):
+    """All workers busy and the wait queue full."""
+
+
+class ScoringService:
+    """Warm scoring state plus the bounded worker pool (usable without HTTP)."""
+
+    def __init__(
+        self,
+        *,
+        mode: str = "llm",
+        cfg: Optional[PipelineConfig] = None,
+        workers: int = 4,
+        queue_size: int = 16,
+        client=None,
+        vs_client=None,
+        embedding_function=None,
+        llm_cache=None,
+        jd_cache_size: int = 32,
+        debug: bool = False,
+    ) -> None:
+        if mode not in ("llm", "rules"):
+            raise ValueError(f"unknown mode {mode!r}")
+        if workers < 1 or queue_size < 0:
+            raise ValueError("workers must be >= 1 and queue_size >= 0")
+        self.mode = mode
+        self.cfg = cfg or PipelineConfig()
+        self.workers = workers
+        self.queue_size = queue_size
+        self.client = client
+        self.vs_client = vs_client
+        self.embedding_function = embedding_function
+        self.llm_cache = llm_cache
+        self.debug = debug
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="score")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._jds: "OrderedDict[str, CompiledJD]" = OrderedDict()
+        self._jd_cache_size = jd_cache_size
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._running = 0
+        self._admitted = 0
+        self._counts: Counter = Counter()
+        self._outcomes: Counter = Counter()
+        self._latency_ms: Deque[float] = deque(maxlen=1024)
+
+    def warm(self) -> "ScoringService":
+        """Build the shared state now instead of on the first request."""
+        from schema import _validator
+        _validator()
+        retrieves = self.mode == "llm" or self._rules_retrieve()
+        if self.embedding_function is None and retrieves:
+            from retrieve import default_embedding_function
+            self.embedding_function = default_embedding_function()
+            self.embedding_function(["warm-up"])  # loads the model
+        if self.vs_client is None and self.cfg.backend == "chroma" and retrieves:
+            from retrieve import create_client
+            self.vs_client = create_client()
+        if self.client is None and self.mode == "llm":
+            from llm_evaluator import _create_openai_client
+            try:
+                self.client = _create_openai_client()
+            except Exception as e:  # no key: every request falls back to rules, as in the CLI
+                print(f"[server] LLM client unavailable ({e}); LLM requests will fall back to rules", file=sys.stderr)
+        return self
+
+    def _rules_retrieve(self) -> bool:
+        from pipeline import rules_need_retrieval
+        return rules_need_retrieval(self.debug)
+
+    def compiled(self, jd: Dict[str, Any]) -> CompiledJD:
+        key = jd_hash(jd)
+        with self._lock:
+            cjd = self._jds.get(key)
+            if cjd is not None:
+                self._jds.move_to_end(key)
+                return cjd
+        cjd = compile_jd(jd)
+        with self._lock:
+            self._jds[key] = cjd
+            while len(self._jds) > self._jd_cache_size:
+                self._jds.popitem(last=False)
+        return cjd
+
+    # ---- scoring ----------------------------------------------------------------
+
+    def _score(self, cjd: CompiledJD, resume: str, cid: Optional[str]) -> Tuple[Dict[str, Any], Trace]:
+        with self._lock:
+            self._running += 1
+        trace = Trace(cid)
+        try:
+            if self.mode == "rules":
+                result = run_rules(
+                    cjd, resume, cfg=self.cfg, vs_client=self.vs_client, embedding_function=self.embedding_function,
+                    trace=trace, debug=self.debug,
+                )
+            else:
+                result = run_pipeline(
+                    cjd, resume, cfg=self.cfg, client=self.client, vs_client=self.vs_client,
+                    embedding_function=self.embedding_function, llm_cache=self.llm_cache, trace=trace,
+                    debug=self.debug,
+                )
+            return result, trace
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._outcomes[trace.outcome or "error"] += 1
+                self._latency_ms.append(trace.to_record()["total_ms"])
+
+    def _admit(self, n: int) -> None:
+        taken = 0
+        while taken < n and self._slots.acquire(blocking=False):
+            taken += 1
+        if taken < n:
+            for _ in range(taken):
+                self._slots.release()
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise Overloaded(f"{self.workers} workers busy and queue of {self.queue_size} full")
+        with self._lock:
+            self._admitted += n
+
+    def _release(self, _fut=None) -> None:
+        with self._lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    def _submit(self, cjd: CompiledJD, resume: str, cid: Optional[str]):
+        fut = self._pool.submit(self._score, cjd, resume, cid)
+        fut.add_done_callback(self._release)
+        return fut
+
+    def score(self, jd: Dict[str, Any], resume: str, cid: Optional[str] = None) -> Dict[str, Any]:
+        """One candidate; raises Overloaded when no slot is free."""
+        cjd = self.compiled(jd)
+        self._admit(1)
+        result, trace = self._submit(cjd, resume, cid).result()
+        return {"id": cid, "result": result, "outcome": trace.outcome, "ms": trace.total_ms}
+
+    def score_batch(self, jd: Dict[str, Any], candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Several candidates of one JD, scored in parallel; all are admitted or none."""
+        cjd = self.compiled(jd)
+        if len(candidates) > self.workers + self.queue_size:
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise Overloaded(f"batch of {len(candidates)} exceeds workers + queue ({self.workers + self.queue_size})")
+        self._admit(len(candidates))
+        futs = [self._submit(cjd, c["resume"], str(c.get("id", i))) for i, c in enumerate(candidates)]
+        out = []
+        for i, (c, fut) in enumerate(zip(candidates, futs)):
+            cid = str(c.get("id", i))
+            try:
+                result, _ = fut.result()
+                out.append({"id": cid, "ok": True, "result": result})
+            except Exception as e:
+                out.append({"id": cid, "ok": False, "error": f"{type(e).__name__}: {e}"})
+        return out
+
+    # ---- health / metrics -------------------------------------------------------
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok", "mode": self.mode, "workers": self.workers,
+            "uptime_s": round(time.monotonic() - self._started, 3),
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latency_ms)
+            out: Dict[str, Any] = {
+                "requests": dict(self._counts),
+                "outcomes": dict(self._outcomes),
+                "in_flight": self._running,
+                "queued": max(0, self._admitted - self._running),
+                "capacity": self.workers + self.queue_size,
+                "compiled_jds": len(self._jds),
+            }
+        if lat:
+            out["latency_ms"] = {
+                "p50": lat[len(lat) // 2], "p95": lat[min(len(lat) - 1, int(len(lat) * 0.95))], "max": lat[-1],
+                "window": len(lat),
+            }
+        if self.llm_cache is not None:
+            out["llm_cache"] = self.llm_cache.stats()
+        stats = getattr(self.embedding_function, "stats", None)
+        if callable(stats):
+            out["embed_cache"] = stats()
+        return out
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+# ---- HTTP ------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    service: ScoringService  # set on the subclass by make_server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 (BaseHTTPRequestHandler's signature)
+        if self.service.debug:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict[str, Any]:
+        n = int(self.headers.get("Content-Length") or 0)
+        if n > _MAX_BODY:
+            raise ValueError(f"request body over {_MAX_BODY} bytes")
+        obj = json.loads(self.rfile.read(n) or b"{}")
+        if not isinstance(obj, dict) or not isinstance(obj.get("jd"), dict):
+            raise ValueError('expected a JSON object with a "jd" object')
+        return obj
+
+    def do_GET(self) -> None:
+        if self.path == "/healthz":
+            self._send(200, self.service.health())
+        elif self.path == "/metrics":
+            self._send(200, self.service.metrics())
+        else:
+            self._send(404, {"error": f"no route {self.path}"})
+
+    def do_POST(self) -> None:
+        svc = self.service
+        if self.path not in ("/score", "/batch"):
+            self._send(404, {"error": f"no route {self.path}"})
+            return
+        svc.count(self.path.lstrip("/"))
+        try:
+            req = self._body()
+            if self.path == "/score":
+                if not isinstance(req.get("resume"), str):
+                    raise ValueError('expected "resume" text')
+                body = svc.score(req["jd"], req["resume"], req.get("id"))
+            else:
+                cands = req.get("candidates")
+                if not isinstance(cands, list) or not all(isinstance(c, dict) and isinstance(c.get("resume"), str) for c in cands):
+                    raise ValueError('expected "candidates": [{"id", "resume"}, ...]')
+                body = {"results": svc.score_batch(req["jd"], cands)}
+        except Overloaded as e:
+            self._send(503, {"error": str(e)}, {"Retry-After": "1"})
+        except ValueError as e:  # includes JSONDecodeError
+            svc.count("bad_request")
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            svc.count("errors")
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send(200, body)
+
+
+def make_server(service: ScoringService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """HTTP server bound to (host, port); port 0 picks a free port (see ``server_address``)."""
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Scoring daemon: warm models behind a local HTTP/JSON API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--mode", choices=["llm", "rules"], default="llm")
+    p.add_argument("--k", type=int, default=3)
+    p.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    p.add_argument("--model", default="gpt-4o-mini")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--deadline", type=float, default=None, help="LLM latency SLA in seconds (see main.py --deadline)")
+    p.add_argument("--structured-output", dest="structured_output", action="store_true")
+    p.add_argument("--evidence-table", dest="evidence_table", action="store_true")
+    p.add_argument("--token-budget", dest="token_budget", type=int, default=None)
+    p.add_argument("--workers", type=int, default=4, help="Candidates scored concurrently (default: 4)")
+    p.add_argument("--queue", type=int, default=16, help="Candidates that may wait for a worker before 503 (default: 16)")
+    p.add_argument("--llm-cache", dest="llm_cache", default=None, help="Directory for the on-disk LLM response cache")
+    p.add_argument("--embed-cache", dest="embed_cache", default=None, help="Directory for the persistent embedding cache")
+    p.add_argument("--debug", action="store_true")
+    args = p.parse_args(argv)
+
+    cfg = PipelineConfig(
+        k=args.k, model=args.model, seed=args.seed, backend=args.backend, deadline_s=args.deadline,
+        structured_output=args.structured_output, evidence_table=args.evidence_table, token_budget=args.token_budget,
+    )
+    llm_cache = embedding_function = None
+    if args.llm_cache and args.mode == "llm":
+        from llm_cache import LLMCache
+        llm_cache = LLMCache(args.llm_cache)
+    if args.embed_cache:
+        from embed_cache import CachedEmbeddingFunction
+        from retrieve import default_embedding_function
+        embedding_function = CachedEmbeddingFunction(default_embedding_function(), path=args.embed_cache)
+    service = ScoringService(
+        mode=args.mode, cfg=cfg, workers=args.workers, queue_size=args.queue, llm_cache=llm_cache,
+        embedding_function=embedding_function, debug=args.debug,
+    ).warm()
+    server = make_server(service, args.host, args.port)
+    print(f"[server] listening on http://{args.host}:{server.server_address[1]} (mode={args.mode})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""
+Multi-pattern skill matcher (Aho-Corasick).
+- Compiled once per JD from the normalized skill names; a line is scanned in a
+  single pass whatever the number of skills.
+- The automaton is flattened into a DFA over the patterns' alphabet, so the
+  scan is one dict lookup per character (characters that appear in no pattern
+  send the scan back to the root).
+- Reports every pattern found in the text, overlapping ones included.
+- ``word_boundary=True`` only keeps matches not flanked by word characters
+  (off by default: parse_resume keeps its substring semantics).
+- Below ~64 patterns, per-pattern ``in`` checks (C speed) beat a Python-level
+  character scan, so ``matches``/``first`` use them there; the result is the same.
+- ``first`` is what parse_resume needs (the first skill in pattern order): the
+  substring path stops at the first hit instead of collecting every match.
+"""
+from __future__ import annotations
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+__all__ = ["SkillMatcher", "compile_skill_matcher"]
+
+
+# Pattern count below which substring checks win. bench_skill_matcher.py (400
+# lines) has the automaton behind the per-skill loop up to 40 skills and ahead
+# from 64 on.
+_SMALL = 64
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class SkillMatcher:
+    def __init__(self, patterns: Sequence[str], *, word_boundary: bool = False) -> None:
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.word_boundary = word_boundary
+        # "" is a substring of everything; it never enters the automaton
+        self._always: Set[int] = {i for i, p in enumerate(self.patterns) if not p}
+        self._index: Dict[str, int] = {}
+        for i, p in enumerate(self.patterns):
+            self._index.setdefault(p, i)  # a repeated pattern reports its first index
+        self._small = len(self.patterns) < _SMALL and not word_boundary
+
+        # 1) trie
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[int, ...]] = [()]
+        for idx, pat in enumerate(self.patterns):
+            if not pat:
+                continue
+            state = 0
+            for ch in pat:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (idx,)
+
+        # 2) failure links (BFS) folded into full DFA rows; missing key = root
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            r = queue.popleft()
+            out[r] += out[fail[r]]  # fail[r] is shallower, so already complete
+            row = dict(delta[fail[r]])
+            row.update(goto[r])
+            delta[r] = row
+            for ch, s in goto[r].items():
+                fail[s] = delta[fail[r]].get(ch, 0)
+                queue.append(s)
+        self._delta = delta
+        self._out = out
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """All (start, pattern index) occurrences in ``text``, in scan order."""
+        delta, out, pats = self._delta, self._out, self.patterns
+        hits: List[Tuple[int, int]] = []
+        state = 0
+        for end, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            for idx in out[state]:
+                start = end - len(pats[idx]) + 1
+                if self.word_boundary and not self._bounded(text, start, end):
+                    continue
+                hits.append((start, idx))
+        return hits
+
+    def matches(self, text: str) -> Set[int]:
+        """Indices of every pattern occurring in ``text``."""
+        if self.word_boundary:
+            return {idx for _, idx in self.find(text)}
+        if len(self.patterns) < _SMALL:
+            return {i for i, p in enumerate(self.patterns) if p in text}
+        delta, out = self._delta, self._out
+        found = set(self._always)
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def first(self, text: str) -> Optional[int]:
+        """Lowest index of a pattern occurring in ``text`` (None if none does)."""
+        if self._small:
+            for p in self.patterns:
+                if p in text:
+                    return self._index[p]
+            return None
+        if self.word_boundary:
+            return min((idx for _, idx in self.find(text)), default=None)
+        found = self.matches(text)
+        return min(found) if found else None
+
+    @staticmethod
+    def _bounded(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else ""
+        after = text[end + 1] if end + 1 < len(text) else ""
+        return not (before and _is_word_char(before)) and not (after and _is_word_char(after))
+
+
+@lru_cache(maxsize=64)
+def compile_skill_matcher(patterns: Tuple[str, ...], word_boundary: bool = False) -> SkillMatcher:
+    """Matcher for a JD's skill set, compiled once and reused across resumes."""
+    return SkillMatcher(patterns, word_boundary=word_boundary)
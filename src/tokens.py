@@ -0,0 +1,173 @@
+"""
+Offline token accounting for LLM mode (no tokenizer download, no network).
+- estimate_tokens approximates a BPE tokenizer: the text is split the way
+  GPT-style pre-tokenizers do (letter runs, digit runs, punctuation runs,
+  whitespace) and each piece is charged by length. Good to roughly +/-15% on
+  English and JSON; use it for budgets and cost estimates, not billing.
+- section_tokens splits a build_prompt() prompt into its sections.
+- fit_to_budget trims a prompt's inputs until it fits a token budget:
+  lowest-ranked retrieval hits first (keeping each requirement's best hit),
+  then the longest evidence lines, then the remaining hits.
+- TokenTally sums the per-candidate token counters of trace records (batch
+  runs) and prices them.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+
+__all__ = ["estimate_tokens", "section_tokens", "fit_to_budget", "TokenTally"]
+
+_PIECE = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]+|_+")
+
+
+def estimate_tokens(text: str) -> int:
+    n = 0
+    for m in _PIECE.finditer(text):
+        piece = m.group()
+        ch = piece[0]
+        if ch.isalpha():
+            n += 1 + (len(piece) - 1) // 6  # common words are one token
+        elif ch.isdigit():
+            n += (len(piece) + 2) // 3  # digits are grouped by three
+        elif ch.isspace():
+            n += piece != " "  # a single space merges into the next word
+        else:
+            n += (len(piece) + 1) // 2  # '": "', '},{', ... merge in pairs
+    return n
+
+
+def section_tokens(prompt: str) -> Dict[str, int]:
+    """Estimated tokens per prompt section (SYSTEM, JSON_SCHEMA, JOB, ...)."""
+    out: Dict[str, int] = {}
+    for block in prompt.split("\n\n"):
+        header = block.split(":\n", 1)[0] if ":\n" in block else "OTHER"
+        out[header] = out.get(header, 0) + estimate_tokens(block)
+    return out
+
+
+def _ranked(hits: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    # Same per-requirement order as the prompt: (distance, id)
+    return {
+        req: sorted(items or [], key=lambda h: (round(float(h.get("distance", 0.0)), 8), str(h.get("id", ""))))
+        for req, items in hits.items()
+    }
+
+
+def _trim_steps(parsed: Dict[str, Any], hits: Dict[str, List[Dict[str, Any]]]) -> List[Tuple[str, Any]]:
+    ranked = _ranked(hits)
+    ordered = []
+    for req in sorted(ranked):
+        for rank, h in enumerate(ranked[req]):
+            ordered.append((rank, float(h.get("distance", 0.0)), req, str(h.get("id", "")), h))
+    ordered.sort(key=lambda x: (x[0], x[1], x[2], x[3]), reverse=True)  # worst first
+    lines = sorted(set(parsed.get("evidence_lines", []) or []), key=lambda ln: (-len(ln), ln))
+    return (
+        [("hit", (req, h)) for rank, _, req, _, h in ordered if rank > 0]
+        + [("line", ln) for ln in lines]
+        + [("hit", (req, h)) for rank, _, req, _, h in ordered if rank == 0]
+    )
+
+
+def _apply(parsed, hits, steps):
+    drop_hits = {id(v[1]) for kind, v in steps if kind == "hit"}
+    drop_lines = {v for kind, v in steps if kind == "line"}
+    p = dict(parsed, evidence_lines=[ln for ln in parsed.get("evidence_lines", []) or [] if ln not in drop_lines])
+    h = {req: [x for x in items or [] if id(x) not in drop_hits] for req, items in hits.items()}
+    return p, h
+
+
+def fit_to_budget(
+    build: Callable[[Dict[str, Any], Dict[str, Any]], str],
+    parsed: Dict[str, Any],
+    hits: Dict[str, List[Dict[str, Any]]],
+    budget: int,
+) -> Tuple[str, Dict[str, Any]]:
+    """Return (prompt, stats) with the fewest trims that bring ``build(parsed, hits)``
+    within ``budget`` estimated tokens.
+
+    stats: tokens, trimmed_hits, trimmed_lines, over_budget (True when even the
+    fully trimmed prompt is too long; it is returned anyway). Token count only
+    falls as more is trimmed, so the cut-off is found by bisection.
+    """
+    prompt = build(parsed, hits)
+    tokens = estimate_tokens(prompt)
+    stats = {"tokens": tokens, "trimmed_hits": 0, "trimmed_lines": 0, "over_budget": False}
+    if tokens <= budget:
+        return prompt, stats
+
+    steps = _trim_steps(parsed, hits)
+    cache: Dict[int, Tuple[str, int]] = {0: (prompt, tokens)}
+
+    def at(n: int) -> Tuple[str, int]:
+        if n not in cache:
+            p = build(*_apply(parsed, hits, steps[:n]))
+            cache[n] = (p, estimate_tokens(p))
+        return cache[n]
+
+    lo, hi = 0, len(steps)  # at(lo) is over budget; find the smallest n that fits
+    if at(hi)[1] > budget:
+        lo = hi
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if at(mid)[1] <= budget:
+            hi = mid
+        else:
+            lo = mid
+    n = hi
+    prompt, tokens = at(n)
+    stats.update(
+        tokens=tokens,
+        trimmed_hits=sum(1 for kind, _ in steps[:n] if kind == "hit"),
+        trimmed_lines=sum(1 for kind, _ in steps[:n] if kind == "line"),
+        over_budget=tokens > budget,
+    )
+    return prompt, stats
+
+
+# USD per 1M (input, output) tokens; list prices when written, override with --token-prices
+_PRICES_PER_1M = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+class TokenTally:
+    """Sums token counters from trace records (use as / chain into a trace sink)."""
+
+    def __init__(self, model: str = "", prices: Optional[Tuple[float, float]] = None) -> None:
+        self.prices = prices or _PRICES_PER_1M.get(model)
+        self.candidates = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.trimmed = 0
+        self.cache_hits = 0  # candidates answered entirely from the LLM cache
+
+    def add(self, record: Dict[str, Any]) -> None:
+        c = record.get("counters", {})
+        if "prompt_tokens" not in c:
+            return  # stored-result / rules-only candidates make no LLM call
+        repair_paid = c.get("repair_attempted") and not c.get("repair_cache_hit")
+        if c.get("llm_cache_hit") and not repair_paid:
+            self.cache_hits += 1
+            return
+        self.candidates += 1
+        if not c.get("llm_cache_hit"):
+            self.input_tokens += c["prompt_tokens"]
+            self.output_tokens += c.get("completion_tokens", 0)
+        if repair_paid:
+            self.input_tokens += c.get("repair_input_tokens", 0)
+            self.output_tokens += c.get("repair_output_tokens", 0)
+        self.trimmed += bool(c.get("trimmed_hits") or c.get("trimmed_lines"))
+
+    @property
+    def cost(self) -> Optional[float]:
+        if self.prices is None:
+            return None
+        return (self.input_tokens * self.prices[0] + self.output_tokens * self.prices[1]) / 1e6
+
+    def summary(self) -> str:
+        cost = f" est_cost=${self.cost:.4f}" if self.cost is not None else ""
+        return (
+            f"[tokens] candidates={self.candidates} input~{self.input_tokens} output~{self.output_tokens}"
+            f" trimmed={self.trimmed} cache_hits={self.cache_hits}{cost}"
+        )
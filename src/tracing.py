@@ -0,0 +1,120 @@
+"""
+Per-candidate stage timings for the pipeline.
+- Trace records one span per stage (monotonic start offset + duration + status),
+  a few counters (vectors indexed, prompt chars, repair attempted, fallback
+  taken, ...) and the final outcome.
+- NULL_TRACE is the default everywhere: its spans are a shared no-op context
+  manager, so an untraced run pays one attribute lookup per stage.
+- TraceWriter appends one JSON record per candidate (``--trace FILE``).
+
+Results themselves stay schema-exact; traces travel alongside them.
+"""
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+import json
+import threading
+import time
+
+__all__ = ["Trace", "NULL_TRACE", "TraceWriter"]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000.0, 3)
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, candidate_id: Optional[str] = None) -> None:
+        self.candidate_id = candidate_id
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, Any] = {}
+        self.outcome: Optional[str] = None
+        self.total_ms: Optional[float] = None
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            end = time.perf_counter()
+            self.spans.append({"stage": stage, "start_ms": _ms(start - self._t0), "ms": _ms(end - start), "status": status})
+
+    def set(self, name: str, value: Any) -> None:
+        self.counters[name] = value
+
+    def child(self) -> "Trace":
+        """Separate span/counter buffer on the same clock (for work running on another thread)."""
+        c = Trace(self.candidate_id)
+        c._t0 = self._t0
+        return c
+
+    def absorb(self, child: "Trace") -> None:
+        """Merge what ``child`` has recorded so far (spans kept in start order)."""
+        self.spans.extend(list(child.spans))
+        self.spans.sort(key=lambda s: s["start_ms"])
+        self.counters.update(dict(child.counters))
+
+    def finish(self, outcome: str) -> None:
+        self.outcome = outcome
+        self.total_ms = _ms(time.perf_counter() - self._t0)
+
+    def stage_ms(self) -> Dict[str, float]:
+        """Total milliseconds per stage name (a stage may run more than once)."""
+        out: Dict[str, float] = {}
+        for s in self.spans:
+            out[s["stage"]] = round(out.get(s["stage"], 0.0) + s["ms"], 3)
+        return out
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            "id": self.candidate_id,
+            "outcome": self.outcome,
+            "total_ms": self.total_ms if self.total_ms is not None else _ms(time.perf_counter() - self._t0),
+            "spans": self.spans,
+            "counters": self.counters,
+        }
+
+
+class _NullTrace:
+    enabled = False
+    _SPAN = nullcontext()
+
+    def span(self, stage: str):
+        return self._SPAN
+
+    def set(self, name: str, value: Any) -> None:
+        pass
+
+    def child(self) -> "_NullTrace":
+        return self
+
+    def absorb(self, child: Any) -> None:
+        pass
+
+    def finish(self, outcome: str) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class TraceWriter:
+    """Appends trace records as JSONL (flushed per record; safe across threads)."""
+
+    def __init__(self, out: TextIO) -> None:
+        self.out = out
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.out.write(line)
+            self.out.flush()
@@ -0,0 +1,135 @@
+"""Shared test doubles: an offline embedder and scripted LLM clients."""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+
+class HashEmbedding:
+    """Deterministic offline bag-of-words embedder (no model download; picklable for worker processes)."""
+
+    def __call__(self, input):
+        out = []
+        for text in input:
+            vec = [0.0] * 64
+            for tok in text.lower().replace(",", " ").replace(".", " ").split():
+                vec[int(hashlib.md5(tok.encode()).hexdigest(), 16) % 64] += 1.0
+            vec[0] += 0.5  # never all-zero
+            out.append(vec)
+        return out
+
+    def embed_query(self, input):
+        return self(input)
+
+    @staticmethod
+    def name():
+        return "test-hash"
+
+
+class CountingEmbedding(HashEmbedding):
+    """``HashEmbedding`` that records every text it embeds in ``seen``."""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, input):
+        self.seen.extend(input)
+        return super().__call__(input)
+
+
+def valid_result(score=80):
+    """A schema-valid AssignmentOutput."""
+    return {
+        "overallScore": score,
+        "technicalSkillsScore": 90,
+        "experienceScore": 85,
+        "culturalFitScore": 65,
+        "matchSummary": "ok",
+        "strengthsHighlights": ["A"],
+        "improvementAreas": ["B"],
+        "detailedBreakdown": {
+            "technicalSkills": [],
+            "experience": [],
+            "educationAndCertifications": [],
+            "culturalFitAndSoftSkills": [],
+        },
+    }
+
+
+def valid_json(score=80):
+    return json.dumps(valid_result(score))
+
+
+def _content(answer):
+    # an int is the overallScore of a valid result, a dict is sent as JSON, a str as is
+    if isinstance(answer, int):
+        return valid_json(answer)
+    return answer if isinstance(answer, str) else json.dumps(answer)
+
+
+def response(content):
+    """A chat-completions response carrying ``content``."""
+    return type("r", (), {"choices": [type("c", (), {"message": type("m", (), {"content": content})})]})
+
+
+class FakeLLM:
+    """OpenAI-compatible client answering with ``answers`` in order (see ``_content``).
+
+    Raises once they run out. ``answers`` may also be a callable, asked for the
+    answer to each request with the create() kwargs. ``gate`` (if set) holds every request until released;
+    ``started`` is released as each request arrives. Each request takes ``delay``
+    seconds; ``requests`` records the create() kwargs.
+    """
+
+    def __init__(self, answers=(), *, gate=None, delay: float = 0.0):
+        self.answers = answers if callable(answers) else list(answers)
+        self.calls = 0
+        self.requests = []
+        self.gate = gate
+        self.started = threading.Semaphore(0)
+        outer = self
+
+        class _Comps:
+            def create(self, *args, **kwargs):
+                outer.calls += 1
+                outer.requests.append(kwargs)
+                outer.started.release()
+                if outer.gate is not None:
+                    outer.gate.wait(5)
+                time.sleep(delay)
+                return response(_content(outer._next_answer(kwargs)))
+
+        self.chat = type("chat", (), {"completions": _Comps()})()
+
+    def _next_answer(self, request):
+        if callable(self.answers):
+            return self.answers(request)
+        if not self.answers:
+            raise RuntimeError("no more fake responses")
+        return self.answers.pop(0)
+
+
+class AsyncFakeLLM(FakeLLM):
+    """Async ``FakeLLM``; each request takes ``delay`` seconds. ``max_in_flight``
+    is the peak number of concurrent requests."""
+
+    def __init__(self, answers=(), delay: float = 0.01):
+        super().__init__(answers)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        outer = self
+
+        class _Comps:
+            async def create(self, *args, **kwargs):
+                outer.calls += 1
+                outer.requests.append(kwargs)
+                outer.in_flight += 1
+                outer.max_in_flight = max(outer.max_in_flight, outer.in_flight)
+                try:
+                    await asyncio.sleep(delay)
+                    return response(_content(outer._next_answer(kwargs)))
+                finally:
+                    outer.in_flight -= 1
+
+        self.chat = type("chat", (), {"completions": _Comps()})()
@@ -0,0 +1,133 @@
+import io
+import json
+
+from batch import iter_candidates, run_batch, run_batch_multi, run_batch_parallel
+from fakes import HashEmbedding
+from pipeline import PipelineConfig, run_rules
+from retrieve import create_client
+
+
+def _jd():
+    return {
+        "title": "Program Manager",
+        "sector": "Operations & Supply Chain",
+        "location": "Hybrid – Cairo",
+        "description": "We are hiring a PM...",
+        "requirements": ["Proficiency in Lean", "1+ years of relevant experience"],
+    }
+
+
+def _resume(i):
+    return (
+        f"Program Manager at Company {i} (2017-05 to 20{19 + i % 3}-11)\n"
+        f"Delivered {i} projects using SAP, Lean with measurable KPIs.\n"
+        "Collaborated with 7 stakeholders to ship on schedule. Six Sigma exposure.\n"
+    )
+
+
+def _fake_score(jd, text):
+    if "boom" in text:
+        raise ValueError("scorer exploded")
+    return {"overallScore": len(text)}
+
+
+def test_iter_candidates_from_directory_sorted_by_name(tmp_path):
+    (tmp_path / "b.txt").write_text("resume b", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("resume a", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+    got = list(iter_candidates(tmp_path))
+    assert got == [("a", "resume a", None), ("b", "resume b", None)]
+
+
+def test_iter_candidates_from_jsonl_reports_bad_records(tmp_path):
+    fp = tmp_path / "pool.jsonl"
+    fp.write_text(
+        json.dumps({"id": "c1", "resume": "text one"}) + "\n"
+        + "\n"
+        + "{not json\n"
+        + json.dumps({"candidate_id": 7, "resume_text": "text two"}) + "\n"
+        + json.dumps({"id": "c3"}) + "\n",
+        encoding="utf-8",
+    )
+    got = list(iter_candidates(fp))
+    assert got[0] == ("c1", "text one", None)
+    assert got[1][0] == "line-3" and got[1][1] is None and "invalid JSON" in got[1][2]
+    assert got[2] == ("7", "text two", None)
+    assert got[3][0] == "c3" and got[3][1] is None
+
+
+def test_run_batch_streams_ndjson_and_tracks_failures():
+    cands = [("c1", "abc", None), ("c2", "boom", None), ("c3", None, "unreadable"), ("c4", "abcdef", None)]
+    out = io.StringIO()
+    stats = run_batch(_jd(), iter(cands), _fake_score, out)
+
+    records = [json.loads(ln) for ln in out.getvalue().splitlines()]
+    assert [r["id"] for r in records] == ["c1", "c2", "c3", "c4"]
+    assert records[0] == {"id": "c1", "ok": True, "result": {"overallScore": 3}}
+    assert records[1]["ok"] is False and "scorer exploded" in records[1]["error"]
+    assert records[2] == {"id": "c3", "ok": False, "error": "unreadable"}
+
+    assert (stats.total, stats.ok, stats.failed) == (4, 2, 2)
+    assert [cid for cid, _ in stats.failures] == ["c2", "c3"]
+    assert "4 candidates" in stats.summary()
+
+
+def test_parallel_rules_output_is_byte_identical_to_serial():
+    jd = _jd()
+    jd["requirements"] = ["Proficiency in Six Sigma"] + jd["requirements"]
+    cands = [(f"c{i}", _resume(i), None) for i in range(7)] + [("bad", None, "unreadable")]
+    cfg = PipelineConfig(k=2)
+
+    vs_client, ef = create_client(), HashEmbedding()
+    serial = io.StringIO()
+    run_batch(jd, iter(cands), lambda j, t: run_rules(j, t, cfg=cfg, vs_client=vs_client, embedding_function=ef), serial)
+
+    parallel = io.StringIO()
+    stats = run_batch_parallel(jd, iter(cands), parallel, workers=2, chunk_size=3, cfg=cfg, embedding_factory=HashEmbedding)
+
+    assert parallel.getvalue() == serial.getvalue()
+    assert (stats.total, stats.ok, stats.failed) == (8, 7, 1)
+
+
+def test_trace_sink_gets_one_record_per_scored_candidate():
+    jd = _jd()
+    cands = [(f"c{i}", _resume(i), None) for i in range(5)] + [("bad", None, "unreadable")]
+    serial: list = []
+    run_batch(jd, iter(cands), lambda j, t, trace=None: run_rules(j, t, trace=trace), io.StringIO(), trace_sink=serial.append)
+    parallel: list = []
+    run_batch_parallel(jd, iter(cands), io.StringIO(), workers=2, chunk_size=2, trace_sink=parallel.append)
+
+    for records in (serial, parallel):
+        assert [r["id"] for r in records] == [f"c{i}" for i in range(5)]
+        assert all(r["outcome"] == "rules_fast" and [s["stage"] for s in r["spans"]] == ["parse", "score"] for r in records)
+
+    failing: list = []
+    run_batch(jd, iter([("x", "boom", None)]), lambda j, t, trace=None: _fake_score(j, t), io.StringIO(), trace_sink=failing.append)
+    assert failing[0]["outcome"] == "error" and "scorer exploded" in failing[0]["counters"]["error"]
+
+
+def test_run_batch_multi_scores_windows_in_input_order():
+    windows = []
+
+    def score_many(jd, cands, traces):
+        windows.append([cid for cid, _ in cands])
+        if "boom" in {cid for cid, _ in cands}:
+            raise RuntimeError("request failed")
+        for cid in traces:
+            traces[cid].finish("llm")
+        return {cid: {"overallScore": len(text)} for cid, text in cands if cid != "lost"}
+
+    cands = [("a", "x", None), ("bad", None, "unreadable"), ("lost", "z", None),
+             ("b", "xy", None), ("c", "xyz", None), ("d", "w", None), ("boom", "q", None)]
+    out, records = io.StringIO(), []
+    stats = run_batch_multi(_jd(), iter(cands), score_many, out, window=3, trace_sink=records.append)
+    lines = [json.loads(ln) for ln in out.getvalue().splitlines()]
+
+    assert windows == [["a", "lost"], ["b", "c", "d"], ["boom"]]
+    assert [ln["id"] for ln in lines] == ["a", "bad", "lost", "b", "c", "d", "boom"]
+    assert [ln["ok"] for ln in lines] == [True, False, False, True, True, True, False]
+    assert lines[3]["result"] == {"overallScore": 2}
+    assert lines[2]["error"] == "no result returned" and "request failed" in lines[6]["error"]
+    assert (stats.ok, stats.failed) == (4, 3)
+    assert [r["id"] for r in records] == ["a", "lost", "b", "c", "d", "boom"]
+    assert [r["outcome"] for r in records] == ["llm", "error", "llm", "llm", "llm", "error"]
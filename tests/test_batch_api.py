@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+
+from batch_api import export_requests, import_results
+from fakes import CountingEmbedding, FakeLLM, HashEmbedding, valid_result
+from llm_cache import LLMCache
+from pipeline import PipelineConfig, run_pipeline
+from tracing import Trace
+
+
+def _jd():
+    return {
+        "title": "Program Manager",
+        "sector": "Operations & Supply Chain",
+        "location": "Hybrid – Cairo",
+        "description": "We are hiring a PM...",
+        "requirements": ["Proficiency in Lean", "1+ years of relevant experience"],
+    }
+
+
+def _candidates(n=5):
+    return [(f"c{i}", f"Analyst at Firm{i} (2018-01 to 2022-06)\nApplied Lean to {i + 2} projects.\n", None)
+            for i in range(n)] + [("broken", None, "unreadable file")]
+
+
+_CFG = PipelineConfig(k=2, model="dummy", backend="numpy")
+
+
+def _export(tmp_path, **kwargs):
+    req, man = io.StringIO(), io.StringIO()
+    stats = export_requests(_jd(), _candidates(), req, man, cfg=_CFG, embedding_function=HashEmbedding(), **kwargs)
+    (tmp_path / "manifest.jsonl").write_text(man.getvalue(), encoding="utf-8")
+    return stats, [json.loads(ln) for ln in req.getvalue().splitlines()]
+
+
+def _answer(custom_id, content=None, status=200, error=None):
+    body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+    return {"id": "batch_req_" + custom_id, "custom_id": custom_id,
+            "response": None if error else {"status_code": status, "body": body}, "error": error}
+
+
+def _import(tmp_path, rows, **kwargs):
+    (tmp_path / "results.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+    out, traces = io.StringIO(), []
+    stats = import_results(_jd(), tmp_path / "manifest.jsonl", tmp_path / "results.jsonl", out,
+                           trace_sink=traces.append, **kwargs)
+    return stats, [json.loads(ln) for ln in out.getvalue().splitlines()], {t["id"]: t for t in traces}
+
+
+def test_export_writes_one_request_per_readable_candidate_with_stable_ids(tmp_path):
+    stats, requests = _export(tmp_path)
+    assert (stats.total, stats.ok, stats.failed) == (6, 5, 1)
+    assert len({r["custom_id"] for r in requests}) == 5
+    r = requests[0]
+    assert r["method"] == "POST" and r["url"] == "/v1/chat/completions"
+    assert r["body"]["model"] == "dummy" and r["body"]["response_format"] == {"type": "json_object"}
+    assert "JSON_SCHEMA:" in r["body"]["messages"][1]["content"]
+
+    _, again = _export(tmp_path)
+    assert [x["custom_id"] for x in again] == [x["custom_id"] for x in requests]
+
+
+def test_duplicate_candidates_are_rejected_before_any_retrieval():
+    cands = _candidates(2)[:2]
+    once, twice = CountingEmbedding(), CountingEmbedding()
+    export_requests(_jd(), cands, io.StringIO(), io.StringIO(), cfg=_CFG, embedding_function=once)
+    req, man = io.StringIO(), io.StringIO()
+    stats = export_requests(_jd(), cands + cands, req, man, cfg=_CFG, embedding_function=twice)
+    assert stats.failed == 2 and all("duplicate" in err for _, err in stats.failures)
+    assert once.seen and twice.seen == once.seen  # the duplicates were never embedded
+    assert len(req.getvalue().splitlines()) == 2
+
+
+def test_import_validates_repairs_and_falls_back_per_candidate(tmp_path):
+    _, requests = _export(tmp_path)
+    ids = [r["custom_id"] for r in requests]
+    rows = [
+        _answer(ids[0], json.dumps(valid_result(70))),
+        _answer(ids[1], json.dumps(dict(valid_result(71), overallScore="71"))),  # local repair
+        _answer(ids[2], json.dumps({"overallScore": 72})),  # unrepairable without an LLM call
+        _answer(ids[3], error={"code": "server_error", "message": "boom"}),
+        # ids[4]: missing from the output
+    ]
+    stats, records, traces = _import(tmp_path, rows[::-1], repair=False)
+    assert (stats.total, stats.ok) == (5, 5)
+    assert [r["id"] for r in records] == ["c0", "c1", "c2", "c3", "c4"]
+    assert [r["result"]["overallScore"] for r in records[:2]] == [70, 71]
+    assert [traces[f"c{i}"]["outcome"] for i in range(5)] == [
+        "llm", "llm_local_repaired", "fallback_invalid", "fallback_error", "fallback_missing",
+    ]
+    assert not any(t["counters"]["repair_attempted"] for t in traces.values())
+
+
+def test_import_stores_responses_for_later_synchronous_runs(tmp_path):
+    cache = LLMCache(tmp_path / "cache")
+    _, requests = _export(tmp_path, llm_cache=cache)
+    _import(tmp_path, [_answer(r["custom_id"], json.dumps(valid_result(77))) for r in requests], llm_cache=cache)
+
+    offline, trace = FakeLLM(), Trace()
+    out = run_pipeline(_jd(), _candidates()[0][1], cfg=_CFG, client=offline, llm_cache=cache,
+                       embedding_function=HashEmbedding(), trace=trace)
+    assert out["overallScore"] == 77 and trace.outcome == "llm" and offline.calls == 0
+
+
+def test_import_rejects_manifest_for_another_jd(tmp_path):
+    _export(tmp_path)
+    (tmp_path / "results.jsonl").write_text("", encoding="utf-8")
+    other = dict(_jd(), title="Data Engineer")
+    with pytest.raises(ValueError, match="different JD"):
+        import_results(other, tmp_path / "manifest.jsonl", tmp_path / "results.jsonl", io.StringIO())
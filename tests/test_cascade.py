@@ -0,0 +1,82 @@
+import io
+import json
+
+import pytest
+
+from cascade import promote, run_cascade
+from fakes import FakeLLM, HashEmbedding
+from pipeline import PipelineConfig, run_pipeline
+
+
+_JD = {
+    "title": "Quality Lead",
+    "sector": "Manufacturing",
+    "location": "Cairo",
+    "description": "Lead process improvement",
+    "requirements": ["Proficiency in Six Sigma", "Proficiency in Lean", "3+ years of relevant experience"],
+}
+
+_POOL = [
+    ("none", "Designer (2018-01 to 2022-01)\nFigma prototypes\n", None),
+    ("both", "Quality Engineer (2014-01 to 2021-01)\nLed Six Sigma projects\nRolled out Lean across two plants\n", None),
+    ("broken", None, "UnicodeDecodeError: bad bytes"),
+    ("sigma", "Analyst (2015-01 to 2021-01)\nSix Sigma green belt\n", None),
+    ("lean", "Planner (2020-01 to 2021-01)\nLean kaizen events\n", None),
+]
+
+
+def _llm(provider):
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy")
+    emb = HashEmbedding()
+    return lambda jd, text, trace=None: run_pipeline(
+        jd, text, cfg=cfg, client=provider, embedding_function=emb, trace=trace
+    )
+
+
+def _run(provider, **kwargs):
+    out, traces = io.StringIO(), []
+    stats = run_cascade(
+        _JD, iter(_POOL), _llm(provider), out, rules_cfg=PipelineConfig(k=2, backend="numpy"),
+        trace_sink=traces.append, **kwargs
+    )
+    return stats, [json.loads(line) for line in out.getvalue().splitlines()], traces
+
+
+def test_promote_top_n_and_threshold():
+    scores = [40, 90, 70, 90, 10]
+    assert promote(scores, top_n=2) == [1, 3]
+    assert promote(scores, min_score=70) == [1, 3, 2]
+    assert promote(scores, top_n=2, min_score=95) == []
+    with pytest.raises(ValueError):
+        promote(scores)
+
+
+def test_only_the_top_reach_the_llm_and_ranking_keeps_provenance():
+    provider = FakeLLM([55, 95])  # the LLM reverses the rules order of the top two
+    stats, records, traces = _run(provider, top_n=2)
+    assert provider.calls == 2
+
+    rules_scores = {r["id"]: r["rules_score"] for r in records if r["ok"]}
+    top2 = sorted(rules_scores, key=lambda c: -rules_scores[c])[:2]
+    assert [r["rank"] for r in records if r["ok"]] == [1, 2, 3, 4]
+    llm = [r for r in records if r.get("stage") == "llm"]
+    assert sorted(r["id"] for r in llm) == sorted(top2)
+    assert [r["result"]["overallScore"] for r in llm] == [95, 55]
+    assert all(r["outcome"] == "llm" for r in llm)
+    rest = [r for r in records if r.get("stage") == "rules"]
+    assert [r["rules_score"] for r in rest] == sorted((r["rules_score"] for r in rest), reverse=True)
+    assert all(r["outcome"] == "rules" and r["result"]["overallScore"] == r["rules_score"] for r in rest)
+    assert records[-1] == {"id": "broken", "ok": False, "error": "UnicodeDecodeError: bad bytes"}
+
+    assert (stats.total, stats.ok, stats.failed, stats.screened, stats.promoted) == (5, 4, 1, 4, 2)
+    assert stats.avoided == 2 and stats.llm_requests == 2
+    assert "avoided 2 LLM calls (50%)" in stats.summary()
+    stages = {t["id"]: t["counters"]["cascade_stage"] for t in traces}  # unreadable candidates have no trace
+    assert stages == {c: "llm" if c in top2 else "rules" for c in rules_scores}
+
+
+def test_threshold_promotes_nobody_when_the_pool_is_weak():
+    provider = FakeLLM([])
+    stats, records, _ = _run(provider, min_score=101)
+    assert provider.calls == 0 and stats.promoted == 0 and stats.avoided == 4
+    assert all(r["stage"] == "rules" for r in records if r["ok"])
@@ -0,0 +1,89 @@
+import pickle
+
+from compiled_jd import CompiledJD, compile_jd
+from fakes import CountingEmbedding
+from parse_resume import parse_resume
+from pipeline import PipelineConfig, _collection_lines, run_pipeline, run_rules
+from prompt import build_prompt
+from retrieve import build_resume_collection, retrieve_for_requirements
+from schema import get_schema
+from scorer import score_rule_based
+
+
+def _jd():
+    return {
+        "title": "Program Manager",
+        "sector": "Operations & Supply Chain",
+        "location": "Hybrid – Cairo",
+        "description": "We are hiring a PM...",
+        "requirements": [
+            "Proficiency in Six Sigma",
+            "Proficiency in Lean",
+            "proficiency in lean",
+            "3+ years of relevant experience",
+            "Evidence of ownership",
+        ],
+    }
+
+
+def _resumes():
+    return [
+        "Program Manager (2017-05 to 2019-11)\nDelivered 5 projects using SAP, Lean with measurable KPIs.\n"
+        "Collaborated with 7 stakeholders. Six Sigma exposure.\n",
+        "Analyst (2020-01 to 2021-01)\nBuilt dashboards.\nLed a small team.\n",
+    ]
+
+
+def test_compiled_jd_gives_identical_stage_outputs():
+    jd, cjd = _jd(), CompiledJD(_jd())
+    ef = CountingEmbedding()
+    for text in _resumes():
+        parsed = parse_resume(text, jd["requirements"])
+        assert parse_resume(text, cjd) == parsed
+
+        lines = parsed["evidence_lines"] + ["filler line one", "filler line two"]
+        _, coll = build_resume_collection(lines, "cjd", backend="numpy", embedding_function=ef)
+        plain_reqs = [r for r in jd["requirements"] if r.lower().startswith("proficiency in ")]
+        hits = retrieve_for_requirements(coll, plain_reqs, k=2)
+        assert retrieve_for_requirements(coll, cjd, k=2) == hits
+        assert retrieve_for_requirements(coll, cjd, k=2, embedding_function=ef) == hits
+
+        assert score_rule_based(cjd, parsed, hits) == score_rule_based(jd, parsed, hits)
+        assert build_prompt(cjd, parsed, hits, get_schema()) == build_prompt(jd, parsed, hits, get_schema())
+
+
+def test_query_embeddings_are_computed_once_per_embedder():
+    cjd = compile_jd(_jd())
+    ef = CountingEmbedding()
+    cfg = PipelineConfig(k=2, backend="numpy")
+    outs = [run_rules(cjd, t, cfg=cfg, embedding_function=ef, fast=False) for t in _resumes() * 3]
+    line_texts = sum(len(_collection_lines(parse_resume(t, cjd), t)) for t in _resumes() * 3)
+    assert len(ef.seen) == line_texts + len(cjd.unique_queries)
+    assert outs == [run_rules(_jd(), t, cfg=cfg, embedding_function=CountingEmbedding(), fast=False) for t in _resumes() * 3]
+
+
+def test_run_pipeline_accepts_compiled_jd():
+    class _NoClient:
+        chat = None  # any LLM call fails -> rule-based fallback
+
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy")
+    text = _resumes()[0]
+    a = run_pipeline(_jd(), text, cfg=cfg, client=_NoClient(), embedding_function=CountingEmbedding())
+    b = run_pipeline(compile_jd(_jd()), text, cfg=cfg, client=_NoClient(), embedding_function=CountingEmbedding())
+    assert a == b
+
+
+def test_compile_jd_is_idempotent_and_picklable():
+    cjd = compile_jd(_jd())
+    assert compile_jd(cjd) is cjd
+    cjd.query_embeddings(CountingEmbedding())
+    clone = pickle.loads(pickle.dumps(cjd))
+    assert clone.job_block == cjd.job_block and clone.skill_targets == ("lean", "six sigma")
+    assert clone.years_required == 3 and clone.unique_queries == ["Six Sigma", "Lean", "lean"]
+
+
+def test_from_text_matches_parse_job_text():
+    from jd_text import parse_job_text
+
+    text = "Data Analyst\nRequirements:\n- Proficiency in SQL\n- 2+ years of relevant experience\n"
+    assert CompiledJD.from_text(text).job_block == CompiledJD(parse_job_text(text)).job_block
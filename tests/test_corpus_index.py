@@ -0,0 +1,53 @@
+from corpus_index import CandidateIndex, resume_lines
+from fakes import HashEmbedding
+
+
+_JD = {
+    "title": "Quality Lead",
+    "sector": "Manufacturing",
+    "location": "Cairo",
+    "description": "Lead process improvement",
+    "requirements": ["Proficiency in Six Sigma", "Proficiency in Lean", "3+ years of relevant experience"],
+}
+
+_RESUMES = {
+    "both": "Quality Engineer (2016-01 to 2021-01)\nLed Six Sigma projects\nRolled out Lean across two plants\n",
+    "sigma": "Analyst (2019-01 to 2021-01)\nSix Sigma green belt\nBuilt dashboards in Excel\n",
+    "none": "Designer (2018-01 to 2022-01)\nFigma prototypes\nUser interviews\n",
+}
+
+
+def _index(tmp_path):
+    return CandidateIndex(tmp_path / "idx", embedding_function=HashEmbedding())
+
+
+def test_search_ranks_candidates_by_requirement_evidence(tmp_path):
+    index = _index(tmp_path)
+    assert index.add_many(_RESUMES.items()) == 3
+    assert index.line_count() == sum(len(resume_lines(t)) for t in _RESUMES.values())
+
+    rows = index.search(_JD, top_n=3)
+    assert [r["id"] for r in rows][:2] == ["both", "sigma"]
+    assert rows[0]["evidence"]["Proficiency in Lean"]["line"] == "Rolled out Lean across two plants"
+    assert rows[0]["score"] > rows[1]["score"]
+    assert [r["id"] for r in index.search(_JD, top_n=1)] == ["both"]
+
+
+def test_incremental_add_update_and_remove_persist(tmp_path):
+    index = _index(tmp_path)
+    index.add_many(_RESUMES.items())
+    assert index.add("sigma", _RESUMES["sigma"]) is False  # unchanged: skipped
+    assert index.add("none", "Operations lead\nLean kaizen events\nSix Sigma black belt\n") is True
+    assert index.remove("both") is True and index.remove("both") is False
+
+    reopened = _index(tmp_path)
+    assert reopened.candidate_ids() == ["none", "sigma"]
+    assert "both" not in reopened
+    assert reopened.search(_JD, top_n=1)[0]["id"] == "none"
+    assert reopened.line_count() == 6
+
+
+def test_same_candidate_twice_in_one_call_keeps_the_last(tmp_path):
+    index = _index(tmp_path)
+    index.add_many([("a", "Lean\nSix Sigma\n"), ("a", "Figma only\n")])
+    assert index.line_count() == 1 and index.candidate_ids() == ["a"]
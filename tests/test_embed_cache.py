@@ -0,0 +1,65 @@
+import numpy as np
+
+from embed_cache import CachedEmbeddingFunction, EmbeddingCache, embedding_model_id
+from fakes import CountingEmbedding
+from retrieve import build_resume_collection, retrieve_for_requirements
+
+
+_LINES = [
+    "Delivered 5 projects using SAP, Lean with measurable KPIs.",
+    "Collaborated with 7 stakeholders to ship on schedule. Six Sigma exposure.",
+    "Improved reliability by 30%.",
+]
+
+
+def test_only_novel_texts_reach_the_embedder():
+    inner = CountingEmbedding()
+    ef = CachedEmbeddingFunction(inner)
+    first = ef(["a", "b", "a"])
+    assert inner.seen == ["a", "b"]
+    second = ef(["b", "c"])
+    assert inner.seen == ["a", "b", "c"]
+    np.testing.assert_array_equal(first[1], second[0])
+    st = ef.stats()
+    assert (st["memory_hits"], st["misses"]) == (1, 4)
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    inner = CountingEmbedding()
+    CachedEmbeddingFunction(inner, path=tmp_path)(["x", "yy"])
+
+    fresh_inner = CountingEmbedding()
+    ef = CachedEmbeddingFunction(fresh_inner, path=tmp_path)
+    vecs = ef(["yy", "x", "zzz"])
+    assert fresh_inner.seen == ["zzz"]
+    np.testing.assert_array_equal(vecs[0], np.asarray(inner(["yy"])[0], dtype=np.float32))
+    assert ef.stats()["disk_hits"] == 2
+    assert (tmp_path / "test-hash" / "vectors.f32").stat().st_size == 3 * 64 * 4
+
+
+def test_model_id_partitions_the_disk_tier(tmp_path):
+    EmbeddingCache("model-a", tmp_path).put_many(["t"], [[1.0, 2.0]])
+    assert EmbeddingCache("model-b", tmp_path).get_many(["t"]) == [None]
+    got = EmbeddingCache("model-a", tmp_path).get_many(["t"])[0]
+    np.testing.assert_array_equal(got, np.array([1.0, 2.0], dtype=np.float32))
+    assert embedding_model_id(CountingEmbedding()) == "test-hash"
+
+
+def test_memory_tier_is_bounded():
+    cache = EmbeddingCache("m", memory_entries=2)
+    cache.put_many(["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    assert [v is None for v in cache.get_many(["a", "b", "c"])] == [True, False, False]
+
+
+def test_shared_by_collection_build_and_queries_on_both_backends():
+    for backend in ("numpy", "chroma"):
+        inner = CountingEmbedding()
+        ef = CachedEmbeddingFunction(inner)
+        reqs = ["Proficiency in Lean", "Proficiency in Six Sigma"]
+        for i in range(2):
+            _, coll = build_resume_collection(
+                _LINES, collection_name=f"t_embcache_{backend}_{i}", backend=backend, embedding_function=ef
+            )
+            retrieve_for_requirements(coll, reqs, k=2)
+        # second candidate re-used every line and query embedding
+        assert sorted(inner.seen) == sorted(_LINES + ["Lean", "Six Sigma"]), backend
@@ -0,0 +1,103 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeLLM
+from llm_cache import LLMCache
+from llm_evaluator import LLMConfig, generate_scores, repair_json
+
+
+def _msgs(prompt="P"):
+    return [{"role": "user", "content": prompt}]
+
+
+def test_key_depends_on_prompt_and_sampling_params():
+    base = {"model": "m", "temperature": 0.0, "top_p": 1.0, "seed": 42}
+    k = LLMCache.key("score", _msgs(), base)
+    assert k == LLMCache.key("score", _msgs(), dict(base))
+    assert k != LLMCache.key("score", _msgs("Q"), base)
+    assert k != LLMCache.key("repair", _msgs(), base)
+    for field, value in [("model", "m2"), ("temperature", 0.5), ("top_p", 0.9), ("seed", 7)]:
+        assert k != LLMCache.key("score", _msgs(), {**base, field: value})
+
+
+def test_memory_then_disk_tier_and_counters(tmp_path):
+    c1 = LLMCache(tmp_path, memory_entries=2)
+    assert c1.get("ab" * 32) is None
+    c1.put("ab" * 32, '{"x": 1}')
+    assert c1.get("ab" * 32) == '{"x": 1}'
+
+    c2 = LLMCache(tmp_path)  # fresh process: memory tier empty
+    assert c2.get("ab" * 32) == '{"x": 1}'
+    assert c2.get("ab" * 32) == '{"x": 1}'
+    st = c2.stats()
+    assert (st["disk_hits"], st["memory_hits"], st["misses"]) == (1, 1, 0)
+    assert c1.stats()["misses"] == 1
+
+
+def test_max_age_applies_to_the_memory_tier(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("llm_cache.time", SimpleNamespace(time=lambda: now[0]))
+    cache = LLMCache(tmp_path, max_age_s=60)
+    cache.put("ab" * 32, "v")
+    now[0] += 59
+    assert cache.get("ab" * 32) == "v"
+    now[0] += 2  # a long-running process outlives the entry
+    assert cache.get("ab" * 32) is None
+    st = cache.stats()
+    assert (st["memory_hits"], st["disk_hits"], st["misses"]) == (1, 0, 1)
+
+
+def test_eviction_by_count_bytes_and_age(tmp_path):
+    cache = LLMCache(tmp_path)
+    keys = [f"{i:02d}" + "0" * 62 for i in range(5)]
+    for i, k in enumerate(keys):
+        cache.put(k, "v" * 10)
+        fp = tmp_path / k[:2] / f"{k}.json"
+        os.utime(fp, (1000 + i, 1000 + i))  # deterministic age order
+
+    cache.max_entries = 3
+    assert cache.evict() == 2
+    assert sorted(p.stem for p in tmp_path.glob("*/*.json")) == keys[2:]
+
+    cache.max_entries = None
+    one = (tmp_path / keys[4][:2] / f"{keys[4]}.json").stat().st_size
+    cache.max_bytes = one
+    assert cache.evict() == 2
+    assert [p.stem for p in tmp_path.glob("*/*.json")] == [keys[4]]
+
+    cache.max_bytes = None
+    cache.max_age_s = 60  # utime'd to 1970 → expired
+    assert cache.evict() == 1
+    assert LLMCache(tmp_path).get(keys[4]) is None
+
+
+def test_generate_scores_hit_costs_no_api_call(tmp_path):
+    cache = LLMCache(tmp_path)
+    cfg = LLMConfig(model="dummy")
+    first = FakeLLM([{"overallScore": 5}])
+    assert generate_scores("PROMPT", cfg=cfg, client=first, cache=cache) == {"overallScore": 5}
+    assert first.calls == 1
+
+    second = FakeLLM([{"overallScore": 9}])
+    assert generate_scores("PROMPT", cfg=cfg, client=second, cache=LLMCache(tmp_path)) == {"overallScore": 5}
+    assert second.calls == 0
+
+    # A different seed is a different request
+    assert generate_scores("PROMPT", cfg=LLMConfig(model="dummy", seed=1), client=second, cache=cache) == {"overallScore": 9}
+    assert second.calls == 1
+
+
+def test_repair_cached_and_non_json_not_cached(tmp_path):
+    cache = LLMCache(tmp_path)
+    client = FakeLLM([{"fixed": True}])
+    for _ in range(3):
+        assert repair_json("{}", ["err"], client=client, cache=cache) == {"fixed": True}
+    assert client.calls == 1
+
+    junk = FakeLLM(["not json"] * 2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            generate_scores("OTHER", client=junk, cache=cache)
+    assert junk.calls == 2
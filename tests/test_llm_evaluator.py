@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from fakes import AsyncFakeLLM, FakeLLM
+from llm_evaluator import LLMConfig, agenerate_scores, arepair_json, generate_scores
+
+
+def test_generate_scores_sends_json_mode_and_seed():
+    fake = FakeLLM([{"overallScore": 1}])
+    out = generate_scores("PROMPT", cfg=LLMConfig(model="dummy", seed=7), client=fake)
+    assert out == {"overallScore": 1}
+    kw = fake.requests[0]
+    assert kw["model"] == "dummy" and kw["seed"] == 7 and kw["temperature"] == 0.0
+    assert kw["response_format"] == {"type": "json_object"}
+
+
+def test_agenerate_scores_matches_sync_request():
+    sync_fake = FakeLLM([{"a": 1}])
+    async_fake = AsyncFakeLLM([{"a": 1}])
+    cfg = LLMConfig(model="dummy")
+    assert generate_scores("P", cfg=cfg, client=sync_fake) == asyncio.run(agenerate_scores("P", cfg=cfg, client=async_fake))
+    assert sync_fake.requests == async_fake.requests
+
+
+def test_semaphore_bounds_in_flight_requests():
+    n = 12
+    fake = AsyncFakeLLM([{"i": i} for i in range(n)])
+
+    async def go():
+        sem = asyncio.Semaphore(3)
+        return await asyncio.gather(*(agenerate_scores(f"P{i}", client=fake, semaphore=sem) for i in range(n)))
+
+    out = asyncio.run(go())
+    assert len(out) == n
+    assert fake.max_in_flight == 3
+
+
+def test_async_errors_raise_runtime_error():
+    with pytest.raises(RuntimeError, match="non-JSON"):
+        asyncio.run(agenerate_scores("P", client=AsyncFakeLLM(["not json"])))
+    with pytest.raises(RuntimeError, match="Repair attempt failed"):
+        asyncio.run(arepair_json("{}", ["x"], client=AsyncFakeLLM([])))
+
+
+def test_structured_output_sends_strict_schema_and_drops_nulls():
+    from schema import get_strict_schema
+
+    fake = FakeLLM([{"overallScore": 1, "redFlags": None}])
+    out = generate_scores("PROMPT", cfg=LLMConfig(model="dummy", structured_output=True), client=fake)
+    assert out == {"overallScore": 1}
+    fmt = fake.requests[0]["response_format"]
+    assert fmt["type"] == "json_schema" and fmt["json_schema"]["strict"] is True
+    assert fmt["json_schema"]["schema"] == get_strict_schema()
@@ -0,0 +1,106 @@
+import copy
+
+from fakes import FakeLLM, HashEmbedding
+from local_repair import repair_locally
+from pipeline import run_pipeline, PipelineConfig
+from schema import validate_json
+from tracing import Trace
+
+
+def _valid():
+    return {
+        "overallScore": 80,
+        "technicalSkillsScore": 90,
+        "experienceScore": 85,
+        "culturalFitScore": 65,
+        "matchSummary": "ok",
+        "strengthsHighlights": ["A"],
+        "improvementAreas": ["B"],
+        "detailedBreakdown": {
+            "technicalSkills": [{
+                "requirement": "Proficiency in Lean",
+                "present": True,
+                "evidence": "Lean",
+                "gapPercentage": 0,
+                "missingDetail": "met",
+            }],
+            "experience": [],
+            "educationAndCertifications": [],
+            "culturalFitAndSoftSkills": [],
+        },
+    }
+
+
+def _with(**changes):
+    obj = _valid()
+    obj.update(changes)
+    return obj
+
+
+def test_valid_payload_is_untouched():
+    obj = _valid()
+    fixed, fixes = repair_locally(obj)
+    assert fixed == obj and fixes == []
+
+
+def test_mechanical_failures_are_repaired():
+    tech = _valid()["detailedBreakdown"]["technicalSkills"][0]
+    corpus = [
+        _with(overallScore="85"),
+        _with(overallScore="85%"),
+        _with(experienceScore=72.6),
+        _with(culturalFitScore=140),
+        _with(technicalSkillsScore=-3),
+        _with(strengthsHighlights=["a", "b", "c", "d", "e"]),
+        _with(improvementAreas="single string"),
+        _with(strengthsHighlights=["a", None]),
+        _with(reasoning="extra key"),
+        _with(redFlags=None),
+        _with(matchSummary=42),
+        _with(detailedBreakdown={"technicalSkills": [dict(tech, gapPercentage="20", present="true", note="x")]}),
+        _with(detailedBreakdown={}),
+    ]
+    for obj in corpus:
+        assert not validate_json(obj)[0]
+        original = copy.deepcopy(obj)
+        fixed, fixes = repair_locally(obj)
+        assert fixes and validate_json(fixed) == (True, ()), (obj, fixed)
+        assert obj == original  # input not modified
+
+
+def test_values_are_coerced_and_clamped():
+    fixed, _ = repair_locally(_with(overallScore="85.4", culturalFitScore=140, experienceScore=-1.2))
+    assert (fixed["overallScore"], fixed["culturalFitScore"], fixed["experienceScore"]) == (85, 100, 0)
+    fixed, _ = repair_locally(_with(strengthsHighlights=["a", "b", "c", "d"]))
+    assert fixed["strengthsHighlights"] == ["a", "b", "c"]
+
+
+def test_scalars_are_never_invented():
+    for obj in (
+        {k: v for k, v in _valid().items() if k != "overallScore"},
+        {k: v for k, v in _valid().items() if k != "matchSummary"},
+        _with(overallScore=True),
+        _with(overallScore="high"),
+    ):
+        fixed, _ = repair_locally(obj)
+        assert not validate_json(fixed)[0]
+
+
+def _run(responses):
+    client, tr = FakeLLM(responses), Trace()
+    jd = {"title": "PM", "requirements": ["1+ years of relevant experience"]}
+    out = run_pipeline(jd, "Program Manager (2019-01 to 2021-01)\n", cfg=PipelineConfig(k=1, backend="numpy"), client=client,
+                       embedding_function=HashEmbedding(), trace=tr)
+    return out, client.calls, tr
+
+
+def test_pipeline_skips_llm_repair_when_local_repair_suffices():
+    out, calls, tr = _run([_with(overallScore="91", notes="x")])
+    assert calls == 1 and out["overallScore"] == 91 and "notes" not in out
+    assert tr.outcome == "llm_local_repaired" and tr.counters["repair_attempted"] is False
+    assert tr.counters["local_fixes"] == 2
+
+    # a missing score can't be repaired locally: the LLM repair still runs
+    missing = {k: v for k, v in _valid().items() if k != "experienceScore"}
+    out, calls, tr = _run([missing, _valid()])
+    assert calls == 2 and tr.outcome == "llm_repaired"
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from fakes import HashEmbedding
+from numpy_backend import NumpyCollection
+from retrieve import build_resume_collection, retrieve_for_requirements
+
+
+_RESUME_LINES = [
+    "Delivered 5 projects using Scheduling, ERP, Oracle with measurable KPIs.",
+    "Improved reliability by 30%.",
+    "Collaborated with 10 stakeholders to ship on schedule.",
+    "Delivered 5 projects using Project Planning, SAP, Lean with measurable KPIs.",
+    "Collaborated with 7 stakeholders to ship on schedule. Six Sigma exposure.",
+]
+
+_REQS = ["Proficiency in Six Sigma", "Proficiency in Lean", "Proficiency in Oracle"]
+
+
+class _TableEmbedding:
+    """Fixed vectors per text, for exact-distance assertions."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __call__(self, input):
+        return [self.table[t] for t in input]
+
+
+def _coll(lines, ef):
+    ids = [f"res-{i:04d}" for i in range(len(lines))]
+    metas = [{"idx": i, "id": ids[i]} for i in range(len(lines))]
+    return NumpyCollection("t", lines, ids, metas, ef)
+
+
+def test_exact_cosine_topk_and_tie_order():
+    table = {"a": [1.0, 0.0], "b": [0.0, 1.0], "c": [1.0, 0.0], "d": [1.0, 1.0], "q": [2.0, 0.0]}
+    coll = _coll(["a", "b", "c", "d"], _TableEmbedding(table))
+    res = coll.query(query_texts=["q"], n_results=3)
+    # a and c tie at distance 0 → line order; d at 1 - 1/sqrt(2)
+    assert res["ids"] == [["res-0000", "res-0002", "res-0003"]]
+    assert res["distances"][0][:2] == [0.0, 0.0]
+    assert abs(res["distances"][0][2] - (1 - 1 / np.sqrt(2))) < 1e-6
+
+
+def test_k_larger_than_collection_and_query_embeddings():
+    table = {"a": [1.0, 0.0], "b": [0.0, 1.0]}
+    coll = _coll(["a", "b"], _TableEmbedding(table))
+    res = coll.query(query_embeddings=[[0.0, 3.0], [1.0, 0.1]], n_results=10)
+    assert res["documents"] == [["b", "a"], ["a", "b"]]
+    assert coll.count() == 2
+
+
+def test_matches_brute_force_on_random_vectors():
+    rng = np.random.default_rng(0)
+    docs = [f"d{i}" for i in range(40)]
+    table = {d: rng.normal(size=8).tolist() for d in docs}
+    table.update({f"q{j}": rng.normal(size=8).tolist() for j in range(5)})
+    coll = _coll(docs, _TableEmbedding(table))
+    res = coll.query(query_texts=[f"q{j}" for j in range(5)], n_results=4)
+    m = np.array([table[d] for d in docs])
+    m /= np.linalg.norm(m, axis=1, keepdims=True)
+    for j in range(5):
+        q = np.array(table[f"q{j}"])
+        dist = 1 - m @ (q / np.linalg.norm(q))
+        assert res["metadatas"][j] == [{"idx": int(i), "id": f"res-{int(i):04d}"} for i in np.argsort(dist)[:4]]
+
+
+def test_numpy_backend_agrees_with_chroma_backend():
+    ef = HashEmbedding()
+    _, chroma_coll = build_resume_collection(_RESUME_LINES, collection_name="t_np_vs_chroma", embedding_function=ef)
+    client, np_coll = build_resume_collection(_RESUME_LINES, backend="numpy", embedding_function=ef)
+    assert client is None and np_coll.count() == len(_RESUME_LINES)
+
+    a = retrieve_for_requirements(chroma_coll, _REQS, k=3)
+    b = retrieve_for_requirements(np_coll, _REQS, k=3)
+    for req in _REQS:
+        assert [x["id"] for x in a[req]] == [x["id"] for x in b[req]]
+        assert [round(x["distance"], 5) for x in a[req]] == [round(x["distance"], 5) for x in b[req]]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        build_resume_collection(_RESUME_LINES, backend="faiss")
@@ -1,33 +1,14 @@
+import asyncio
 import json
+import os
+import subprocess
+import sys
+import time
 import pytest
 
-from pipeline import run_pipeline, PipelineConfig
-
-
-class _FakeChoice:
-    def __init__(self, content: str):
-        self.message = type("m", (), {"content": content})
-
-
-class _FakeResp:
-    def __init__(self, content: str):
-        self.choices = [_FakeChoice(content)]
-
-
-class _FakeClient:
-    def __init__(self, responses):
-        self._responses = list(responses)
-        class _Chat:
-            def __init__(self, outer):
-                class _Comps:
-                    def __init__(self, outer):
-                        self._outer = outer
-                    def create(self, *args, **kwargs):
-                        if not outer._responses:
-                            raise RuntimeError("no more fake responses")
-                        return _FakeResp(outer._responses.pop(0))
-                self.completions = _Comps(outer)
-        self.chat = _Chat(self)
+from fakes import AsyncFakeLLM, FakeLLM, HashEmbedding, valid_json, valid_result
+from pipeline import pack_candidates, run_pipeline, run_pipeline_async, run_pipeline_multi, run_rules, PipelineConfig
+from tracing import Trace
 
 
 def _jd():
@@ -72,7 +53,7 @@ def test_happy_path_valid_json(monkeypatch):
             "culturalFitAndSoftSkills": []
         }
     })
-    fake = _FakeClient([valid_json])
+    fake = FakeLLM([valid_json])
     out = run_pipeline(_jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy"), client=fake)
     assert isinstance(out, dict)
     assert all(k in out for k in ["overallScore", "technicalSkillsScore"])  # schema keys present
@@ -96,7 +77,7 @@ def test_invalid_then_repaired(monkeypatch):
             "culturalFitAndSoftSkills": []
         }
     })
-    fake = _FakeClient([bad, repaired])
+    fake = FakeLLM([bad, repaired])
     out = run_pipeline(_jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy"), client=fake)
     assert out["overallScore"] == 80
 
@@ -105,9 +86,288 @@ def test_double_failure_falls_back_to_rule_based():
     # Two junk responses trigger fallback to rule-based (which should be schema-valid)
     junk1 = "not json"
     junk2 = json.dumps({"not": "valid per schema"})
-    fake = _FakeClient([junk1, junk2])
+    fake = FakeLLM([junk1, junk2])
     out = run_pipeline(_jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy"), client=fake)
     # We can't assert exact numbers, but it must be schema-like
     assert isinstance(out, dict)
     assert all(k in out for k in ["overallScore", "technicalSkillsScore", "experienceScore", "culturalFitScore"])  # schema keys present
 
+
+def _run_async(client, **kwargs):
+    return asyncio.run(run_pipeline_async(
+        _jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy"), client=client,
+        embedding_function=HashEmbedding(), **kwargs
+    ))
+
+
+def test_async_happy_path_valid_json():
+    out = _run_async(AsyncFakeLLM([valid_json(88)]))
+    assert out["overallScore"] == 88
+
+
+def test_async_invalid_then_repaired():
+    fake = AsyncFakeLLM([json.dumps({"overallScore": 50}), valid_json(80)])
+    assert _run_async(fake)["overallScore"] == 80
+    assert fake.calls == 2
+
+
+def test_async_double_failure_matches_sync_fallback():
+    ef = HashEmbedding()
+    sync_out = run_pipeline(
+        _jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy"),
+        client=FakeLLM(["not json", "{}"]), embedding_function=ef,
+    )
+    async_out = _run_async(AsyncFakeLLM(["not json", "{}"]))
+    assert async_out == sync_out
+
+
+def test_async_gathered_candidates_each_get_their_own_result():
+    fake = AsyncFakeLLM([valid_json(i) for i in range(6)], delay=0.05)
+
+    async def go():
+        sem = asyncio.Semaphore(6)
+        ef = HashEmbedding()
+        return await asyncio.gather(*(
+            run_pipeline_async(_jd(), _resume_text(), cfg=PipelineConfig(k=2), client=fake, semaphore=sem, embedding_function=ef)
+            for _ in range(6)
+        ))
+
+    outs = asyncio.run(go())
+    assert sorted(o["overallScore"] for o in outs) == list(range(6))
+
+
+def test_rules_fast_path_matches_full_retrieval_path():
+    for text in (_resume_text(), "Six Sigma only\n", "No matching skills here.\nAnother line.\n"):
+        full = run_rules(_jd(), text, cfg=PipelineConfig(k=2), embedding_function=HashEmbedding(), fast=False)
+        fast = run_rules(_jd(), text, cfg=PipelineConfig(k=2))
+        assert fast == full
+
+
+def test_rules_fast_path_does_not_import_chromadb():
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    code = (
+        "import sys; sys.path.insert(0, %r)\n"
+        "from pipeline import run_rules\n"
+        "out = run_rules({'requirements': ['Proficiency in Lean']}, 'Lean projects (2019-01 to 2020-01)')\n"
+        "print(out['technicalSkillsScore'], 'chromadb' in sys.modules)\n"
+    ) % src
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert res.stdout.split() == ["100", "False"]
+
+
+def test_numpy_backend_pipeline_happy_path():
+    fake = FakeLLM([valid_json(77)])
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy")
+    out = run_pipeline(_jd(), _resume_text(), cfg=cfg, client=fake, embedding_function=HashEmbedding())
+    assert out["overallScore"] == 77
+
+
+def _stages(trace):
+    return [s["stage"] for s in trace.spans]
+
+
+def test_trace_records_stages_counters_and_outcome():
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy")
+    ef = HashEmbedding()
+
+    ok = Trace("c1")
+    run_pipeline(_jd(), _resume_text(), cfg=cfg, client=FakeLLM([valid_json(77)]), embedding_function=ef, trace=ok)
+    assert _stages(ok) == ["parse", "collection", "retrieve", "prompt", "llm", "validate"]
+    assert ok.outcome == "llm"
+    assert ok.counters["vectors"] > 0 and ok.counters["prompt_chars"] > 0
+    assert ok.counters["repair_attempted"] is False and ok.counters["fallback"] is False
+    assert all(s["ms"] >= 0 and s["status"] == "ok" for s in ok.spans)
+
+    fb = Trace("c2")
+    run_pipeline(_jd(), _resume_text(), cfg=cfg, client=FakeLLM(["{}", "{}"]), embedding_function=ef, trace=fb)
+    assert _stages(fb)[-5:] == ["validate", "local_repair", "repair", "validate", "fallback"]
+    assert fb.outcome == "fallback_invalid" and fb.counters["repair_attempted"] and fb.counters["fallback"]
+
+    err = Trace("c3")
+    run_pipeline(_jd(), _resume_text(), cfg=cfg, client=FakeLLM([]), embedding_function=ef, trace=err)
+    llm_span = next(s for s in err.spans if s["stage"] == "llm")
+    assert llm_span["status"] == "error" and err.outcome == "fallback_error"
+    assert "no more fake responses" in err.counters["error"]
+
+    record = json.loads(json.dumps(ok.to_record()))
+    assert record["id"] == "c1" and record["total_ms"] >= sum(ok.stage_ms().values()) - 1e-3
+
+
+def test_trace_on_async_and_rules_paths():
+    tr = Trace()
+    _run_async(AsyncFakeLLM([json.dumps({"overallScore": 50}), valid_json(80)]), trace=tr)
+    assert tr.outcome == "llm_repaired" and "repair" in _stages(tr)
+
+    fast, full = Trace(), Trace()
+    run_rules(_jd(), _resume_text(), trace=fast)
+    run_rules(_jd(), _resume_text(), cfg=PipelineConfig(backend="numpy"), embedding_function=HashEmbedding(), fast=False, trace=full)
+    assert (_stages(fast), fast.outcome) == (["parse", "score"], "rules_fast")
+    assert (_stages(full), full.outcome) == (["parse", "collection", "retrieve", "score"], "rules")
+
+
+def test_deadline_returns_rules_when_llm_is_slow():
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy", deadline_s=0.1)
+    client = FakeLLM([99], delay=1.0)
+    tr = Trace()
+    t0 = time.perf_counter()
+    out = run_pipeline(_jd(), _resume_text(), cfg=cfg, client=client, embedding_function=HashEmbedding(), trace=tr)
+    assert time.perf_counter() - t0 < 0.8
+    rules = run_rules(_jd(), _resume_text(), cfg=cfg, embedding_function=HashEmbedding(), fast=False)
+    assert out == rules
+    assert tr.outcome == "deadline_rules"
+    assert tr.counters["hedge_winner"] == "rules" and tr.counters["llm_abandoned"] is True
+    assert "rules" in _stages(tr)
+    assert 0 < client.requests[0]["timeout"] <= 0.1  # abandoned request ends at the deadline
+
+
+def test_deadline_llm_wins_when_fast_enough():
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy", deadline_s=5.0)
+    tr = Trace()
+    out = run_pipeline(
+        _jd(), _resume_text(), cfg=cfg, client=FakeLLM([91], delay=0.01),
+        embedding_function=HashEmbedding(), trace=tr,
+    )
+    assert out["overallScore"] == 91
+    assert tr.outcome == "llm" and tr.counters["hedge_winner"] == "llm"
+    assert {"rules", "llm", "validate"} <= set(_stages(tr))
+
+
+def test_async_deadline_cancels_in_flight_request():
+    cancelled = []
+
+    class _Hanging:
+        class chat:
+            class completions:
+                @staticmethod
+                async def create(*args, **kwargs):
+                    try:
+                        await asyncio.sleep(5)
+                    except asyncio.CancelledError:
+                        cancelled.append(True)
+                        raise
+
+    tr = Trace()
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy", deadline_s=0.05)
+    out = asyncio.run(run_pipeline_async(
+        _jd(), _resume_text(), cfg=cfg, client=_Hanging(), embedding_function=HashEmbedding(), trace=tr
+    ))
+    assert cancelled == [True]
+    assert tr.outcome == "deadline_rules" and out["overallScore"] >= 0
+
+
+def _schema_aware_client():
+    """Stand-in provider: free-form JSON mode returns a draft with a missing
+    score (needs an LLM repair); a strict json_schema response format returns
+    only schema-shaped output, as constrained decoding does."""
+
+    def answer(request):
+        good = dict(valid_result(84), redFlags=None)
+        if request["response_format"]["type"] == "json_schema":
+            return good
+        if len(client.requests) % 2:  # first try: draft; then: the repair
+            good.pop("experienceScore")
+        good.pop("redFlags")
+        return good
+
+    client = FakeLLM(answer)
+    return client
+
+
+def test_structured_output_shrinks_prompt_and_avoids_repairs():
+    results = {}
+    for structured in (False, True):
+        cfg = PipelineConfig(k=2, model="dummy", backend="numpy", structured_output=structured)
+        client, traces = _schema_aware_client(), []
+        for i in range(4):
+            tr = Trace(f"c{i}")
+            out = run_pipeline(_jd(), _resume_text(), cfg=cfg, client=client, embedding_function=HashEmbedding(), trace=tr)
+            assert out["overallScore"] == 84 and "redFlags" not in out
+            traces.append(tr)
+        results[structured] = (client, traces)
+
+    free_client, free = results[False]
+    strict_client, strict = results[True]
+    assert [t.outcome for t in free] == ["llm_repaired"] * 4 and len(free_client.requests) == 8
+    assert [t.outcome for t in strict] == ["llm"] * 4 and len(strict_client.requests) == 4
+    assert strict_client.requests[0]["response_format"]["json_schema"]["strict"] is True
+    prompt_of = lambda req: req["messages"][1]["content"]  # noqa: E731
+    assert "JSON_SCHEMA" in prompt_of(free_client.requests[0])
+    assert "JSON_SCHEMA" not in prompt_of(strict_client.requests[0])
+    saved = free[0].counters["prompt_chars"] - strict[0].counters["prompt_chars"]
+    assert saved > 2000
+
+
+def _is_multi(messages):
+    return "result per candidate" in messages[0]["content"]
+
+
+def _multi_run(handler, n=4, **cfg_kwargs):
+    cfg = PipelineConfig(k=2, model="dummy", backend="numpy", candidates_per_request=cfg_kwargs.pop("per_request", 4), **cfg_kwargs)
+    client = FakeLLM(lambda request: handler(request["messages"]))
+    cands = [(f"c{i}", _resume_text()) for i in range(n)]
+    traces = {cid: Trace(cid) for cid, _ in cands}
+    out = run_pipeline_multi(_jd(), cands, cfg=cfg, client=client, embedding_function=HashEmbedding(), traces=traces)
+    return out, client, traces
+
+
+def test_multi_candidate_request_shares_schema_and_job():
+    def handler(messages):
+        assert _is_multi(messages)
+        return json.dumps({"results": {f"c{i}": json.loads(valid_json(60 + i)) for i in range(4)}})
+
+    out, client, traces = _multi_run(handler)
+    assert len(client.requests) == 1
+    prompt = client.requests[0]["messages"][1]["content"]
+    assert prompt.count("JSON_SCHEMA:") == 1 and prompt.count("JOB:") == 1 and prompt.count("\n\nCANDIDATE ") == 4
+    assert {cid: r["overallScore"] for cid, r in out.items()} == {"c0": 60, "c1": 61, "c2": 62, "c3": 63}
+    assert all(t.outcome == "llm" and t.counters["batch_size"] == 4 for t in traces.values())
+
+    single = Trace()
+    run_pipeline(_jd(), _resume_text(), cfg=PipelineConfig(k=2, model="dummy", backend="numpy"),
+                 client=FakeLLM([valid_json()]), embedding_function=HashEmbedding(), trace=single)
+    assert traces["c0"].counters["prompt_tokens"] < single.counters["prompt_tokens"] * 0.6
+
+
+def test_multi_candidate_failures_split_out_per_candidate():
+    def handler(messages):
+        if _is_multi(messages):
+            results = {
+                "c0": json.loads(valid_json(70)),
+                "c1": dict(json.loads(valid_json(71)), overallScore="71"),  # local repair
+                "c2": {k: v for k, v in json.loads(valid_json(72)).items() if k != "matchSummary"},  # LLM repair
+            }  # c3 missing: asked on its own
+            return json.dumps({"results": results})
+        if "did not validate" in messages[1]["content"]:
+            return valid_json(82)
+        return valid_json(93)
+
+    out, client, traces = _multi_run(handler)
+    assert [t.outcome for t in traces.values()] == ["llm", "llm_local_repaired", "llm_repaired", "llm"]
+    assert [out[f"c{i}"]["overallScore"] for i in range(4)] == [70, 71, 82, 93]
+    assert len(client.requests) == 3 and traces["c3"].counters["batch_missing"] is True
+
+
+def test_multi_candidate_request_error_falls_back_for_all():
+    def handler(messages):
+        raise RuntimeError("provider down")
+
+    out, client, traces = _multi_run(handler, n=3)
+    assert len(client.requests) == 1 and len(out) == 3
+    assert all(t.outcome == "fallback_error" and t.counters["fallback"] for t in traces.values())
+
+
+def test_multi_candidate_packing_adapts_to_token_budget():
+    assert pack_candidates(100, [50, 50, 50, 50, 50], max_n=10, budget=220) == [[0, 1], [2, 3], [4]]
+    assert pack_candidates(100, [50, 50, 50], max_n=2, budget=10**6) == [[0, 1], [2]]
+    assert pack_candidates(100, [500, 10], max_n=4, budget=200) == [[0], [1]]
+
+    def handler(messages):
+        if not _is_multi(messages):
+            return valid_json(50)
+        ids = [ln.split()[1].rstrip(":") for ln in messages[1]["content"].splitlines() if ln.startswith("CANDIDATE ")]
+        return json.dumps({"results": {cid: json.loads(valid_json(50)) for cid in ids}})
+
+    _, roomy, _ = _multi_run(handler, n=6, per_request=6, request_token_budget=100000)
+    _, tight, traces = _multi_run(handler, n=6, per_request=6, request_token_budget=2000)
+    assert len(roomy.requests) == 1 and 1 < len(tight.requests) < 6
+    assert all(t.outcome == "llm" for t in traces.values())
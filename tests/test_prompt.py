@@ -80,4 +80,46 @@ def test_prompt_includes_retrieval_hits_sorted_by_distance_then_id():
     retrieval_block = prompt.split("RETRIEVAL:\n", 1)[1].split("\n\nTASK:", 1)[0]
     first_idx = retrieval_block.index("res-0003")
     second_idx = retrieval_block.index("res-0000")
-    assert first_idx < second_idx
\ No newline at end of file
+    assert first_idx < second_idx
+
+
+def test_prompt_without_inline_schema_keeps_other_sections():
+    full = build_prompt(_sample_jd(), _sample_parsed(), _sample_retrieval(), get_schema())
+    compact = build_prompt(_sample_jd(), _sample_parsed(), _sample_retrieval(), get_schema(), inline_schema=False)
+    assert "JSON_SCHEMA" not in compact and "overallScore" not in compact
+    assert len(compact) < len(full) - len(json.dumps(get_schema(), sort_keys=True))
+    assert full.split("JOB:")[1].split("TASK:")[0] == compact.split("JOB:")[1].split("TASK:")[0]
+
+
+def _section(prompt, header):
+    return json.loads(prompt.split(header + ":\n")[1].split("\n\n")[0])
+
+
+def test_evidence_table_lists_each_line_once_and_resolves_to_full_layout():
+    parsed, hits = _sample_parsed(), _sample_retrieval()
+    hits["Proficiency in Six Sigma"].append(dict(hits["Proficiency in Lean"][0], distance=0.5))  # shared line
+    full = build_prompt(_sample_jd(), parsed, hits, get_schema())
+    compact = build_prompt(_sample_jd(), parsed, hits, get_schema(), evidence_table=True)
+
+    table = _section(compact, "EVIDENCE")
+    assert list(table) == [f"E{i}" for i in range(1, len(table) + 1)]
+    assert len(set(table.values())) == len(table)
+    for text in table.values():
+        assert compact.count(json.dumps(text, ensure_ascii=False)) == 1
+    assert len(compact) < len(full)
+
+    full_parsed, compact_parsed = _section(full, "PARSED_RESUME"), _section(compact, "PARSED_RESUME")
+    assert [table[e] for e in compact_parsed["evidence_lines"]] == full_parsed["evidence_lines"]
+    full_ret, compact_ret = _section(full, "RETRIEVAL"), _section(compact, "RETRIEVAL")
+    assert list(full_ret) == list(compact_ret)
+    for req in full_ret:
+        assert [table[h["line"]] for h in compact_ret[req]] == [h["text"] for h in full_ret[req]]
+
+
+def test_evidence_table_is_deterministic_under_input_order():
+    parsed, hits = _sample_parsed(), _sample_retrieval()
+    shuffled_parsed = dict(parsed, evidence_lines=list(reversed(parsed["evidence_lines"])))
+    shuffled_hits = {k: list(reversed(v)) for k, v in reversed(list(hits.items()))}
+    a = build_prompt(_sample_jd(), parsed, hits, get_schema(), evidence_table=True)
+    b = build_prompt(_sample_jd(), shuffled_parsed, shuffled_hits, get_schema(), evidence_table=True)
+    assert a == b
@@ -0,0 +1,128 @@
+import asyncio
+import io
+import sqlite3
+
+from batch import run_batch
+from pipeline import PipelineConfig, run_rules
+from result_store import ResultStore, cached_ascore, cached_score
+
+
+def _jd(years=1):
+    return {
+        "title": "Program Manager",
+        "sector": "Operations",
+        "location": "Cairo",
+        "description": "PM role",
+        "requirements": ["Proficiency in Lean", f"{years}+ years of relevant experience"],
+    }
+
+
+class _CountingRules:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, jd, text, trace=None):
+        self.calls.append(text)
+        return run_rules(jd, text, trace=trace)
+
+
+def _resumes(edit=None):
+    out = [(f"c{i}", f"Manager at Co {i} (2018-01 to 2021-0{i + 1})\nDelivered Lean projects.\n", None) for i in range(4)]
+    if edit is not None:
+        cid, text, _ = out[edit]
+        out[edit] = (cid, text + "Led 3 stakeholders.\n", None)
+    return out
+
+
+def _batch(store, jd, cands, score):
+    out = io.StringIO()
+    run_batch(jd, iter(cands), cached_score(store, score, mode="rules", cfg=PipelineConfig()), out)
+    return out.getvalue()
+
+
+def test_rerun_only_rescores_new_or_edited_resumes(tmp_path):
+    store = ResultStore(tmp_path / "results.db")
+    score = _CountingRules()
+    first = _batch(store, _jd(), _resumes(), score)
+    assert len(score.calls) == 4
+
+    assert _batch(store, _jd(), _resumes(), score) == first
+    assert len(score.calls) == 4 and store.stats()["hits"] == 4
+
+    _batch(store, _jd(), _resumes(edit=2), score)
+    assert len(score.calls) == 5 and "Led 3 stakeholders" in score.calls[-1]
+
+    _batch(store, _jd(years=5), _resumes(), score)  # JD changed: everyone is re-scored
+    assert len(score.calls) == 9
+    store.close()
+
+    reopened = ResultStore(tmp_path / "results.db")  # durable across processes/runs
+    _batch(reopened, _jd(), _resumes(), score)
+    assert len(score.calls) == 9 and len(reopened) == 9
+
+
+def test_config_and_mode_are_part_of_the_key(tmp_path):
+    store = ResultStore(tmp_path / "r.db")
+    keys = {
+        store.key(_jd(), "x", mode="rules", cfg=PipelineConfig()),
+        store.key(_jd(), "x", mode="llm", cfg=PipelineConfig()),
+        store.key(_jd(), "x", mode="rules", cfg=PipelineConfig(k=5)),
+        store.key(_jd(), "x", mode="rules", cfg=PipelineConfig(), embedder="other"),
+    }
+    assert len(keys) == 4
+
+
+def test_error_fallbacks_are_not_stored(tmp_path):
+    store = ResultStore(tmp_path / "r.db")
+
+    def flaky(jd, text, trace=None):
+        trace.finish("fallback_error")
+        return {"overallScore": 1}
+
+    wrapped = cached_score(store, flaky, mode="llm")
+    wrapped(_jd(), "resume")
+    wrapped(_jd(), "resume")
+    assert len(store) == 0 and store.stats()["hits"] == 0
+
+
+def test_async_wrapper_hits_the_same_store(tmp_path):
+    store = ResultStore(tmp_path / "r.db")
+    calls = []
+
+    async def ascore(jd, text, trace=None):
+        calls.append(text)
+        trace.finish("llm")
+        return {"overallScore": len(text)}
+
+    wrapped = cached_ascore(store, ascore, mode="llm")
+    assert asyncio.run(wrapped(_jd(), "abc")) == asyncio.run(wrapped(_jd(), "abc")) == {"overallScore": 3}
+    assert calls == ["abc"]
+
+
+def test_eviction_by_count_age_and_compaction(tmp_path):
+    path = tmp_path / "r.db"
+    store = ResultStore(path)
+    for i in range(5):
+        store.put(store.key(_jd(), f"r{i}", mode="rules"), {"i": i}, jd=_jd(), resume_text=f"r{i}")
+    store.get(store.key(_jd(), "r0", mode="rules"))  # r0 becomes most recently used
+    store.close()
+
+    bounded = ResultStore(path, max_entries=2)
+    assert len(bounded) == 2
+    assert bounded.get(bounded.key(_jd(), "r0", mode="rules")) == {"i": 0}
+    bounded.close()
+
+    db = sqlite3.connect(str(path))
+    db.execute("UPDATE results SET version = 'old', created = 0")
+    db.commit()
+    db.close()
+    aged = ResultStore(path, max_age_s=3600)
+    assert len(aged) == 0
+
+    fresh = ResultStore(path)
+    fresh.put("k", {"a": 1}, jd=_jd(), resume_text="x")
+    db = sqlite3.connect(str(path))
+    db.execute("INSERT INTO results VALUES ('stale', '', '', 'old', 1e18, 1e18, '{}')")
+    db.commit()
+    db.close()
+    assert fresh.compact() == 1 and len(fresh) == 1
@@ -1,6 +1,7 @@
 import math
 import pytest
 
+from fakes import HashEmbedding
 from retrieve import build_resume_collection, retrieve_for_requirements
 
 
@@ -58,3 +59,99 @@ def test_determinism_same_inputs_same_results():
         d1 = [round(x["distance"], 8) for x in out1[req]]
         d2 = [round(x["distance"], 8) for x in out2[req]]
         assert d1 == d2
+
+
+class _RecordingCollection:
+    """Stand-in collection: distance = position of the doc in a fixed ranking per query."""
+
+    def __init__(self, ranking):
+        self.ranking = ranking  # query -> [(doc, distance, meta)]
+        self.calls = []
+
+    def query(self, query_texts, n_results, include):
+        self.calls.append(list(query_texts))
+        rows = [self.ranking[q][:n_results] for q in query_texts]
+        return {
+            "documents": [[d for d, _, _ in r] for r in rows],
+            "distances": [[x for _, x, _ in r] for r in rows],
+            "metadatas": [[m for _, _, m in r] for r in rows],
+        }
+
+
+def _ranking():
+    return {
+        "Six Sigma": [
+            ("six sigma line", 0.1, {"idx": 4, "id": "res-0004"}),
+            ("tie b", 0.5, {"idx": 2, "id": "res-0002"}),
+            ("tie a", 0.5, {"idx": 1, "id": "res-0001"}),
+        ],
+        "Lean": [("lean line", 0.2, {"idx": 3, "id": "res-0003"})],
+    }
+
+
+def test_single_batched_query_for_all_requirements():
+    coll = _RecordingCollection(_ranking())
+    reqs = ["Proficiency in Six Sigma", "Proficiency in Lean", "proficiency in Lean"]
+    out = retrieve_for_requirements(coll, reqs, k=3)
+    # One query call; the duplicate normalized query is embedded once
+    assert coll.calls == [["Six Sigma", "Lean"]]
+    assert set(out) == set(reqs)
+    assert [x["id"] for x in out["Proficiency in Lean"]] == ["res-0003"]
+    assert out["Proficiency in Lean"] == out["proficiency in Lean"]
+    assert set(out["Proficiency in Lean"][0]) == {"id", "text", "distance", "meta"}
+
+
+def test_equal_distances_break_ties_by_id():
+    out = retrieve_for_requirements(_RecordingCollection(_ranking()), ["Proficiency in Six Sigma"], k=3)
+    assert [x["id"] for x in out["Proficiency in Six Sigma"]] == ["res-0004", "res-0001", "res-0002"]
+
+
+def test_no_requirements_makes_no_query():
+    coll = _RecordingCollection({})
+    assert retrieve_for_requirements(coll, [], k=3) == {}
+    assert coll.calls == []
+
+
+def test_pooled_collection_is_refilled_in_place_with_fresh_results():
+    from retrieve import create_client, resume_collection
+
+    client, ef = create_client(), HashEmbedding()
+    _, fresh = build_resume_collection(_RESUME_LINES[:3], collection_name="t_pool_fresh", embedding_function=ef)
+    expected = retrieve_for_requirements(fresh, _REQS, k=2)
+    names = set()
+    for lines in (_RESUME_LINES, _RESUME_LINES[:3]):  # shrinking drops the surplus rows
+        with resume_collection(lines, client=client, embedding_function=ef) as coll:
+            names.add(coll.name)
+            assert coll.count() == len(lines)
+            if len(lines) == 3:
+                assert retrieve_for_requirements(coll, _REQS, k=2) == expected
+    assert len(names) == 1
+
+
+def test_memory_stays_bounded_over_many_candidates():
+    import os
+    from pipeline import PipelineConfig, run_rules
+    from retrieve import collection_pool, create_client
+
+    if not os.path.exists("/proc/self/statm"):
+        pytest.skip("needs /proc to read RSS")
+
+    def rss_mb():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+    client, ef, cfg = create_client(), HashEmbedding(), PipelineConfig(k=3)
+    jd = {"requirements": ["Proficiency in Lean", "Proficiency in SAP", "1+ years of relevant experience"]}
+
+    def score(n):
+        lines = "\n".join(f"Line {i}: delivered {n} Lean and SAP projects" for i in range(10 + n % 30))
+        run_rules(jd, lines, cfg=cfg, vs_client=client, embedding_function=ef, fast=False)
+
+    for n in range(50):  # warm-up: allocator and pool reach steady state
+        score(n)
+    before = rss_mb()
+    for n in range(50, 350):
+        score(n)
+    # one collection per candidate used to add ~2.5 MB each (~750 MB here)
+    assert rss_mb() - before < 40
+    assert collection_pool(client, ef).created == 1
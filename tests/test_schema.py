@@ -1,5 +1,11 @@
+import copy
+import json
+
 import pytest
-from schema import get_schema, validate_json, assert_valid
+from jsonschema import Draft7Validator
+
+from schema import _fast_is_valid, assert_valid, get_schema, validate_json
+
 
 def _valid_payload():
     return {
@@ -110,3 +116,123 @@ def test_assert_valid_raises_on_invalid():
     bad["overallScore"] = -1
     with pytest.raises(AssertionError):
         assert_valid(bad)
+
+
+# ---- fast path vs jsonschema equivalence -----------------------------------
+
+_ITEM_PATHS = [("detailedBreakdown", k, 0) for k in ("technicalSkills", "experience", "educationAndCertifications", "culturalFitAndSoftSkills")]
+
+
+def _set(payload, path, value):
+    node = payload
+    for p in path[:-1]:
+        node = node[p]
+    node[path[-1]] = value
+
+
+def _delete(payload, path):
+    node = payload
+    for p in path[:-1]:
+        node = node[p]
+    del node[path[-1]]
+
+
+def _mutations():
+    """(label, path, value) triples: one value set at one path (valid edge cases and violations)."""
+    values = [0, 100, -1, 101, 50.0, 50.5, True, False, None, "50", [], {}, 10**20]
+    for key in ("overallScore", "technicalSkillsScore", "experienceScore", "culturalFitScore"):
+        for v in values:
+            yield f"{key}={v!r}", (key,), v
+    for path in _ITEM_PATHS:
+        for v in values:
+            yield f"{path}.gap={v!r}", path + ("gapPercentage",), v
+        for v in (True, False, 0, 1, None, "yes"):
+            yield f"{path}.present={v!r}", path + ("present",), v
+        for v in ("", "x", 1, None):
+            yield f"{path}.requirement={v!r}", path + ("requirement",), v
+        for v in ("", 0, None, []):
+            yield f"{path}.evidence={v!r}", path + ("evidence",), v
+            yield f"{path}.missingDetail={v!r}", path + ("missingDetail",), v
+        for v in ([], {}, None, "x", (), [1], [[]]):
+            yield f"{path[:2]}={v!r}", path[:2], v
+    for key in ("matchSummary",):
+        for v in ("", "x", 1, None, ["x"]):
+            yield f"{key}={v!r}", (key,), v
+    for key in ("strengthsHighlights", "improvementAreas"):
+        for v in ([], ["a"], ["a", "b", "c"], ["a", "b", "c", "d"], [1], ["a", None], "a", None, ("a",)):
+            yield f"{key}={v!r}", (key,), v
+    for v in ([], None, {}, [{}], [{"issue": "i", "evidence": "e", "reason": "r", "x": 1}],
+              [{"issue": "i", "evidence": "e"}], [{"issue": 1, "evidence": "e", "reason": "r"}], "x"):
+        yield f"redFlags={v!r}", ("redFlags",), v
+    for v in ({}, [], None, "x"):
+        yield f"detailedBreakdown={v!r}", ("detailedBreakdown",), v
+    for path in [("extra",), ("detailedBreakdown", "extra"), _ITEM_PATHS[0] + ("extra",), ("redFlags", 0, "extra")]:
+        yield f"extra key at {path}", path, 1
+
+
+def _corpus():
+    """(label, payload) pairs: the valid payload, every mutation, and missing keys."""
+    base = _valid_payload()
+    yield "base", base
+    for label, path, value in _mutations():
+        p = copy.deepcopy(base)
+        _set(p, path, value)
+        yield label, p
+    for key in list(_valid_payload()):
+        p = _valid_payload()
+        del p[key]
+        yield f"missing {key}", p
+    for key in list(_valid_payload()["detailedBreakdown"]):
+        p = _valid_payload()
+        _delete(p, ("detailedBreakdown", key))
+        yield f"missing detailedBreakdown.{key}", p
+    for key in ("requirement", "present", "evidence", "gapPercentage", "missingDetail"):
+        p = _valid_payload()
+        _delete(p, _ITEM_PATHS[1] + (key,))
+        yield f"missing item.{key}", p
+    for other in (None, [], "x", 1, True):
+        yield f"payload={other!r}", other
+
+
+def test_fast_path_agrees_with_jsonschema_on_corpus():
+    reference = Draft7Validator(get_schema())
+    labels = set()
+    for label, payload in _corpus():
+        labels.add(label)
+        expected = reference.is_valid(payload)
+        assert _fast_is_valid(payload) == expected, label
+        ok, errs = validate_json(payload)
+        assert ok == expected, label
+        assert errs == tuple(sorted(e.message for e in reference.iter_errors(payload))), label
+    assert len(labels) > 200
+
+
+def test_rule_based_outputs_take_the_fast_path():
+    from parse_resume import parse_resume
+    from scorer import score_rule_based
+
+    jd = {"title": "PM", "requirements": ["Proficiency in Lean", "3+ years of relevant experience"]}
+    for text in ("", "Program Manager (2019-01 to 2021-01)\nUsed Lean daily.\n"):
+        out = score_rule_based(jd, parse_resume(text, jd["requirements"]), {})
+        assert _fast_is_valid(out)
+
+
+def test_strict_schema_requires_every_key_and_forbids_extras():
+    from schema import get_strict_schema
+
+    def objects(node):
+        if isinstance(node, dict):
+            if node.get("type") == "object" or "object" in (node.get("type") or []):
+                yield node
+            for v in node.values():
+                yield from objects(v)
+        elif isinstance(node, list):
+            for v in node:
+                yield from objects(v)
+
+    strict = get_strict_schema()
+    for obj in objects(strict):
+        assert obj["additionalProperties"] is False
+        assert sorted(obj["required"]) == sorted(obj["properties"])
+    assert strict["properties"]["redFlags"]["type"] == ["array", "null"]
+    assert "maximum" not in json.dumps(strict) and "maximum" in json.dumps(get_schema())
@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fakes import FakeLLM, HashEmbedding
+from pipeline import PipelineConfig
+from server import ScoringService, make_server
+
+
+_JD = {
+    "title": "Program Manager",
+    "sector": "Operations",
+    "location": "Cairo",
+    "description": "PM role",
+    "requirements": ["Proficiency in Lean", "1+ years of relevant experience"],
+}
+_RESUME = "Program Manager at Crestel (2017-05 to 2019-11)\nDelivered 5 projects using Lean.\n"
+
+
+@pytest.fixture
+def serve():
+    running = []
+
+    def start(**kwargs):
+        svc = ScoringService(
+            cfg=PipelineConfig(k=2, model="dummy", backend="numpy"), embedding_function=HashEmbedding(), **kwargs
+        ).warm()
+        srv = make_server(svc, port=0)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        running.append((srv, svc))
+        return svc, f"http://127.0.0.1:{srv.server_address[1]}"
+
+    yield start
+    for srv, svc in running:
+        srv.shutdown()
+        srv.server_close()
+        svc.close()
+
+
+def _call(url, body=None):
+    data = None if body is None else json.dumps(body).encode()
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_score_batch_health_and_metrics(serve):
+    provider = FakeLLM([77] * 4)
+    svc, url = serve(client=provider, workers=2)
+    status, body = _call(url + "/score", {"jd": _JD, "resume": _RESUME, "id": "a"})
+    assert status == 200 and body["outcome"] == "llm" and body["result"]["overallScore"] == 77
+
+    status, body = _call(url + "/batch", {"jd": _JD, "candidates": [{"id": f"c{i}", "resume": _RESUME} for i in range(3)]})
+    assert status == 200 and [r["id"] for r in body["results"]] == ["c0", "c1", "c2"]
+    assert all(r["ok"] for r in body["results"]) and provider.calls == 4
+
+    assert _call(url + "/healthz")[1]["status"] == "ok"
+    metrics = _call(url + "/metrics")[1]
+    assert metrics["outcomes"] == {"llm": 4} and metrics["compiled_jds"] == 1
+    assert metrics["requests"] == {"score": 1, "batch": 1} and metrics["in_flight"] == 0
+    assert _call(url + "/score", {"resume": "x"})[0] == 400
+
+
+def test_rules_mode_needs_no_llm_client(serve):
+    _, url = serve(mode="rules")
+    status, body = _call(url + "/score", {"jd": _JD, "resume": _RESUME})
+    assert status == 200 and body["outcome"] in ("rules", "rules_fast")
+
+
+def test_full_pool_and_queue_answer_503(serve):
+    gate = threading.Event()
+    provider = FakeLLM([77] * 2, gate=gate)
+    svc, url = serve(client=provider, workers=1, queue_size=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_call(url + "/score", {"jd": _JD, "resume": _RESUME})))
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+    assert provider.started.acquire(timeout=5)
+    deadline = time.monotonic() + 5
+    while svc.metrics()["queued"] < 1 and time.monotonic() < deadline:  # one running, one queued
+        time.sleep(0.01)
+    status, body = _call(url + "/score", {"jd": _JD, "resume": _RESUME})
+    assert status == 503 and "queue" in body["error"]
+    assert _call(url + "/batch", {"jd": _JD, "candidates": [{"resume": _RESUME}] * 3})[0] == 503
+    gate.set()
+    for t in threads:
+        t.join(10)
+    assert sorted(s for s, _ in results) == [200, 200]
+    assert svc.metrics()["requests"]["rejected"] == 2
@@ -0,0 +1,86 @@
+import random
+import re
+
+from parse_resume import parse_resume
+from skill_matcher import SkillMatcher, compile_skill_matcher
+
+
+def _random_case(rng, n_patterns):
+    pats = ["".join(rng.choice("ab c+") for _ in range(rng.randint(0, 4))) for _ in range(n_patterns)]
+    text = "".join(rng.choice("abc +d") for _ in range(rng.randint(0, 30)))
+    return pats, text
+
+
+def test_matches_equal_substring_checks_small_and_large_sets():
+    rng = random.Random(7)
+    for n in (1, 3, 6, 63, 64, 80):  # both sides of the small-set shortcut
+        for _ in range(300):
+            pats, text = _random_case(rng, n)
+            m = SkillMatcher(pats)
+            assert m.matches(text) == {i for i, p in enumerate(pats) if p in text}, (pats, text)
+
+
+def test_first_is_the_lowest_matching_index():
+    rng = random.Random(5)
+    for n in (1, 3, 6, 63, 64, 80):  # both sides of the small-set shortcut
+        for _ in range(200):
+            pats, text = _random_case(rng, n)
+            expected = min((i for i, p in enumerate(pats) if p in text), default=None)
+            assert SkillMatcher(pats).first(text) == expected, (pats, text)
+    assert SkillMatcher(["sql", "java"], word_boundary=True).first("javascript and sql") == 0
+    assert SkillMatcher(["java"], word_boundary=True).first("javascript") is None
+
+
+def test_find_reports_every_overlapping_occurrence():
+    rng = random.Random(11)
+    for _ in range(500):
+        pats, text = _random_case(rng, 5)
+        expected = sorted(
+            (mm.start(), i) for i, p in enumerate(pats) if p for mm in re.finditer("(?=%s)" % re.escape(p), text)
+        )
+        assert sorted(SkillMatcher(pats).find(text)) == expected
+    assert SkillMatcher(["java", "javascript", "script"]).find("javascript") == [(0, 0), (0, 1), (4, 2)]
+
+
+def test_word_boundary_mode():
+    m = SkillMatcher(["java", "c++", "sql"], word_boundary=True)
+    assert m.matches("javascript, c++ and mysql") == {1}
+    assert m.matches("java/sql") == {0, 2}
+    assert SkillMatcher(["java"]).matches("javascript") == {0}
+
+
+def test_compiled_matcher_is_reused_per_skill_set():
+    assert compile_skill_matcher(("lean", "sap")) is compile_skill_matcher(("lean", "sap"))
+
+
+def _legacy_parse(text, skills):
+    # Pre-matcher loop from parse_resume: first sorted skill contained in the line
+    norm = lambda s: re.sub(r"\s+", " ", s.strip().lower())
+    targets = sorted({norm(s) for s in skills})
+    evidence, present = [], set()
+    for ln in [ln.strip() for ln in text.splitlines() if ln.strip()]:
+        for t in targets:
+            if t in norm(ln):
+                evidence.append(ln)
+                present.add(t)
+                break
+    return evidence, sorted(present)
+
+
+def test_parse_resume_keeps_legacy_evidence_and_skill_credit():
+    rng = random.Random(3)
+    vocab = ["SAP", "Lean", "Six Sigma", "Java", "JavaScript", "SQL", "Power BI", "Excel", "C++"]
+    filler = "delivered projects with stakeholders using tools on schedule".split()
+    for n_skills in (2, 5, len(vocab)):
+        for _ in range(50):
+            skills = rng.sample(vocab, n_skills)
+            lines = []
+            for _ in range(rng.randint(1, 12)):
+                words = rng.sample(filler, 4) + rng.sample(vocab, rng.randint(0, 3))
+                rng.shuffle(words)
+                lines.append("  ".join(words))
+            text = "\n".join(lines)
+            out = parse_resume(text, [f"Proficiency in {s}" for s in skills])
+            evidence, present = _legacy_parse(text, skills)
+            assert out["evidence_lines"] == evidence
+            assert sorted(s.lower() for s in out["skills"]) == present
@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.join(os.path.dirname(__file__), "..")
+_HEAVY = ["chromadb", "openai", "jsonschema", "asyncio", "multiprocessing"]
+
+
+def _loaded_after(body):
+    code = (
+        "import contextlib, io, json, sys\n"
+        "sys.path.insert(0, 'src')\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    try:\n"
+        "        %s\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+        "print(json.dumps([m for m in %r if m in sys.modules]))\n"
+    ) % (body, _HEAVY)
+    res = subprocess.run([sys.executable, "-c", code], cwd=_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.splitlines()[-1])
+
+
+def test_import_and_help_load_no_heavy_dependencies():
+    assert _loaded_after("import main") == []
+    assert _loaded_after("import main; main.main(['--help'])") == []
+
+
+def test_rules_run_loads_no_heavy_dependencies():
+    argv = ["--jd", "jd.json", "--resume", "resume.txt", "--mode", "rules"]
+    assert _loaded_after("import main; main.main(%r)" % argv) == []
+
@@ -0,0 +1,126 @@
+import io
+import json
+
+from batch import run_batch
+from fakes import FakeLLM, HashEmbedding
+from llm_cache import LLMCache
+from pipeline import PipelineConfig, run_pipeline
+from prompt import build_prompt
+from schema import get_schema
+from tokens import TokenTally, estimate_tokens, fit_to_budget, section_tokens
+from tracing import Trace
+
+
+def _jd():
+    return {
+        "title": "Program Manager",
+        "requirements": ["Proficiency in Lean", "Proficiency in SAP", "Proficiency in Six Sigma"],
+    }
+
+
+def _parsed():
+    return {
+        "skills": ["Lean", "SAP"],
+        "experience_years": 3.0,
+        "evidence_lines": [
+            "Delivered 5 projects using Lean.",
+            "Rolled out SAP across four regional warehouses with a team of twelve analysts and contractors.",
+            "Six Sigma exposure.",
+        ],
+    }
+
+
+def _hits():
+    lines = ["Delivered 5 projects using Lean.", "Rolled out SAP across warehouses.", "Six Sigma exposure.", "Other."]
+    return {
+        req: [{"id": f"res-{i}", "text": lines[i], "distance": 0.1 * (i + 1) + 0.01 * j, "metadata": {}} for i in range(3)]
+        for j, req in enumerate(_jd()["requirements"])
+    }
+
+
+def _build(p, h):
+    return build_prompt(_jd(), p, h, get_schema())
+
+
+def test_estimate_tokens_is_offline_and_roughly_bpe_sized():
+    assert estimate_tokens("") == 0
+    assert 8 <= estimate_tokens("The quick brown fox jumps over the lazy dog.") <= 12
+    prompt = _build(_parsed(), _hits())
+    assert 2.5 <= len(prompt) / estimate_tokens(prompt) <= 5.0
+    sections = section_tokens(prompt)
+    assert list(sections) == ["SYSTEM", "JSON_SCHEMA", "JOB", "PARSED_RESUME", "RETRIEVAL", "TASK"]
+    assert abs(sum(sections.values()) - estimate_tokens(prompt)) <= len(sections)
+
+
+def test_fit_to_budget_leaves_prompts_within_budget_alone():
+    prompt, stats = fit_to_budget(_build, _parsed(), _hits(), 10**6)
+    assert prompt == _build(_parsed(), _hits())
+    assert stats == {"tokens": estimate_tokens(prompt), "trimmed_hits": 0, "trimmed_lines": 0, "over_budget": False}
+
+
+def test_fit_to_budget_trims_lowest_ranked_hits_then_longest_lines():
+    full = estimate_tokens(_build(_parsed(), _hits()))
+    prompt, stats = fit_to_budget(_build, _parsed(), _hits(), full - 30)
+    assert stats["tokens"] <= full - 30 and not stats["over_budget"]
+    assert stats["trimmed_hits"] >= 1 and stats["trimmed_lines"] == 0
+    retrieval = json.loads(prompt.split("RETRIEVAL:\n")[1].split("\n\n")[0])
+    assert all(hits and hits[0]["id"] == "res-0" for hits in retrieval.values())  # best hits kept
+
+    # every rank>0 hit goes before any line; the longest line goes first
+    best_only = {req: hits[:1] for req, hits in _hits().items()}
+    budget = estimate_tokens(_build(_parsed(), best_only)) - 5
+    prompt, stats = fit_to_budget(_build, _parsed(), _hits(), budget)
+    assert (stats["trimmed_hits"], stats["trimmed_lines"]) == (6, 1)
+    assert "Rolled out SAP across four regional" not in prompt and "Six Sigma exposure" in prompt
+    assert fit_to_budget(_build, _parsed(), _hits(), budget) == (prompt, stats)  # deterministic
+
+
+def test_fit_to_budget_reports_when_nothing_left_to_trim():
+    prompt, stats = fit_to_budget(_build, _parsed(), _hits(), 10)
+    assert stats["over_budget"] is True
+    assert stats["trimmed_hits"] == 9 and stats["trimmed_lines"] == 3
+    assert "Delivered 5 projects" not in prompt
+
+
+_RESUME = "Delivered 5 projects using Lean.\nRolled out SAP across four regional warehouses.\nSix Sigma exposure.\n"
+
+
+def _score(cfg, llm_cache=None):
+    return lambda jd, text, trace=None: run_pipeline(
+        jd, text, cfg=cfg, client=FakeLLM([70]), embedding_function=HashEmbedding(), llm_cache=llm_cache,
+        trace=trace,
+    )
+
+
+def test_pipeline_traces_token_counts_and_applies_budget():
+    free, tight = Trace(), Trace()
+    _score(PipelineConfig(k=3, backend="numpy"))(_jd(), _RESUME, trace=free)
+    _score(PipelineConfig(k=3, backend="numpy", token_budget=free.counters["prompt_tokens"] - 20))(_jd(), _RESUME, trace=tight)
+    assert free.counters["prompt_sections"]["JSON_SCHEMA"] > 0
+    assert free.counters["prompt_tokens"] == sum(free.counters["prompt_sections"].values())
+    assert free.counters["completion_tokens"] > 0 and "trimmed_hits" not in free.counters
+    assert tight.counters["trimmed_hits"] > 0 and tight.counters["over_budget"] is False
+    assert tight.counters["prompt_tokens"] < free.counters["prompt_tokens"]
+
+
+def test_token_tally_aggregates_batch_traces():
+    tally = TokenTally("gpt-4o-mini")
+    cands = [(f"c{i}", _RESUME, None) for i in range(3)]
+    run_batch(_jd(), iter(cands), _score(PipelineConfig(k=2, backend="numpy")), io.StringIO(), trace_sink=tally.add)
+    assert tally.candidates == 3 and tally.input_tokens > 0 and tally.output_tokens > 0
+    assert tally.cost == (tally.input_tokens * 0.15 + tally.output_tokens * 0.60) / 1e6
+    assert "[tokens] candidates=3" in tally.summary()
+    assert TokenTally("unknown-model").cost is None
+
+
+def test_token_tally_skips_llm_cache_hits(tmp_path):
+    cache = LLMCache(tmp_path)
+    score = _score(PipelineConfig(k=2, backend="numpy"), llm_cache=cache)
+    cold, warm = TokenTally("gpt-4o-mini"), TokenTally("gpt-4o-mini")
+    run_batch(_jd(), iter([("c0", _RESUME, None)]), score, io.StringIO(), trace_sink=cold.add)
+    traces = []
+    run_batch(_jd(), iter([("c0", _RESUME, None)]), score, io.StringIO(), trace_sink=lambda r: (traces.append(r), warm.add(r)))
+    assert cold.candidates == 1 and cold.input_tokens > 0 and cold.cache_hits == 0
+    assert traces[0]["counters"]["llm_cache_hit"] is True and traces[0]["counters"]["prompt_tokens"] > 0
+    assert (warm.candidates, warm.input_tokens, warm.output_tokens, warm.cache_hits) == (0, 0, 0, 1)
+    assert warm.cost == 0 and "cache_hits=1" in warm.summary()